@@ -0,0 +1,191 @@
+"""Benchmarks inference cost and denoising quality of the trained .keras models
+
+Every model runs over the same replay test set, the results are ranked by
+denoising error and models that no other model beats in both speed and
+error are marked as the Pareto front. Every model is measured in its own
+process, so memory and TensorFlow state of one model never carry over to the
+next. The replay set is written by `make_replay.py`. Run from the
+`RNN_model` folder:
+
+    python make_replay.py --clean data/EEG_all_epochs.npy --noise data/EOG_all_epochs.npy
+    python benchmark.py --noisy data/Test_noisy.npy --clean data/Test_clean.npy
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psutil
+import tensorflow as tf
+
+
+def denoising_metrics(denoised: np.ndarray, clean: np.ndarray) -> dict:
+    """Computes the EEGdenoiseNet temporal metrics against clean references
+
+    Args:
+        denoised (np.ndarray): Model output with shape (n_segments, n_samples)
+        clean (np.ndarray): Clean references with the same shape
+
+    Returns:
+        metrics (dict): Mean correlation coefficient and relative RMSE over segments
+    """
+    rrmse = np.sqrt(np.mean((denoised - clean) ** 2, axis=1)) / np.sqrt(
+        np.mean(clean**2, axis=1)
+    )
+
+    denoised = denoised - denoised.mean(axis=1, keepdims=True)
+    reference = clean - clean.mean(axis=1, keepdims=True)
+    correlation = (denoised * reference).sum(axis=1) / np.sqrt(
+        (denoised**2).sum(axis=1) * (reference**2).sum(axis=1)
+    )
+
+    return {"correlation": float(np.mean(correlation)), "rrmse": float(np.mean(rrmse))}
+
+
+def benchmark_model(
+    path: str, noisy: np.ndarray, clean: np.ndarray, batch_size: int, repeats: int
+) -> dict:
+    """Measures load time, memory, CPU throughput and denoising quality of one model
+
+    Memory is the resident set growth of the calling process, use `isolated`
+    to run it in a fresh process.
+
+    Args:
+        path (str): Path to the .keras model
+        noisy (np.ndarray): Noisy inputs with shape (n_segments, n_samples, 1)
+        clean (np.ndarray): Clean references with shape (n_segments, n_samples)
+        batch_size (int): Inference batch size
+        repeats (int): Timed passes over the replay set after one warm-up pass
+
+    Returns:
+        row (dict): Benchmark results of the model
+    """
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    model = tf.keras.models.load_model(path)
+    load_time = time.perf_counter() - start
+
+    # Warm-up pass traces the graph, its output is the one that gets scored
+    denoised = model.predict(noisy, batch_size=batch_size, verbose=0)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(noisy, batch_size=batch_size, verbose=0)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    memory = (process.memory_info().rss - rss_before) / 2**20
+
+    return {
+        "model": os.path.basename(path),
+        "load_s": round(load_time, 3),
+        "memory_mb": round(memory, 1),
+        "segments_per_s": round(len(noisy) / elapsed, 1),
+        "ms_per_segment": round(1e3 * elapsed / len(noisy), 4),
+        **denoising_metrics(denoised.reshape(clean.shape), clean),
+    }
+
+
+def configure(threads: int = None) -> None:
+    """Runs TensorFlow on the CPU only, as on the experiment machines
+
+    Args:
+        threads (int): Intra-op threads, None keeps the TensorFlow default
+    """
+    tf.config.set_visible_devices([], "GPU")
+    tf.keras.utils.disable_interactive_logging()
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+
+
+def isolated(
+    path: str,
+    noisy: np.ndarray,
+    clean: np.ndarray,
+    batch_size: int,
+    repeats: int,
+    threads: int = None,
+) -> dict:
+    """Runs `benchmark_model` in a new process that exits after the model
+
+    Args:
+        path (str): Path to the .keras model
+        noisy (np.ndarray): Noisy inputs with shape (n_segments, n_samples, 1)
+        clean (np.ndarray): Clean references with shape (n_segments, n_samples)
+        batch_size (int): Inference batch size
+        repeats (int): Timed passes over the replay set after one warm-up pass
+        threads (int): Intra-op threads, None keeps the TensorFlow default
+
+    Returns:
+        row (dict): Benchmark results of the model
+    """
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=configure,
+        initargs=(threads,),
+    ) as pool:
+        return pool.submit(
+            benchmark_model, path, noisy, clean, batch_size, repeats
+        ).result()
+
+
+def rank(results: pd.DataFrame) -> pd.DataFrame:
+    """Ranks models by denoising error and marks the speed-error Pareto front
+
+    Args:
+        results (pd.DataFrame): One row per model
+
+    Returns:
+        ranked (pd.DataFrame): Rows sorted by RRMSE with `rank` and `pareto` columns
+    """
+    ranked = results.sort_values("rrmse").reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+
+    speed = ranked["ms_per_segment"].to_numpy()
+    error = ranked["rrmse"].to_numpy()
+    dominated = (
+        (speed[None, :] <= speed[:, None])
+        & (error[None, :] <= error[:, None])
+        & ((speed[None, :] < speed[:, None]) | (error[None, :] < error[:, None]))
+    ).any(axis=1)
+    ranked["pareto"] = ~dominated
+
+    return ranked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--models", nargs="+", default=sorted(glob.glob("models/*.keras"))
+    )
+    parser.add_argument("--noisy", default="data/Test_noisy.npy")
+    parser.add_argument("--clean", default="data/Test_clean.npy")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", default="model_benchmark.csv")
+    args = parser.parse_args()
+
+    noisy = np.load(args.noisy)[: args.limit].astype(np.float32)
+    clean = np.load(args.clean)[: args.limit].astype(np.float32)
+    noisy = noisy.reshape(len(noisy), -1, 1)
+
+    results = pd.DataFrame(
+        [
+            isolated(path, noisy, clean, args.batch_size, args.repeats, args.threads)
+            for path in args.models
+        ]
+    )
+    ranked = rank(results)
+    ranked.to_csv(args.output, index=False)
+
+    print(ranked.to_string(index=False))
@@ -0,0 +1,190 @@
+"""Exports the trained .keras models to TFLite and reports accuracy against Keras
+
+Each model is converted to a float32 reference, a float16 and an int8
+dynamic-range variant, written next to the source model, and the outputs of
+every variant are compared with the Keras model on the replay test set.
+Variants whose correlation or RRMSE moves further from the Keras model than
+their tolerance are reported and make the script exit with an error. Run
+from the `RNN_model` folder:
+
+    python export_tflite.py --models models/b20-LRsch.keras --variants float16 int8
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from benchmark import denoising_metrics
+
+VARIANTS = ("float32", "float16", "int8")
+# Largest accepted change of correlation and RRMSE against the Keras model
+TOLERANCES = {"float32": 1e-4, "float16": 1e-3, "int8": 1e-2}
+
+
+def convert(model: tf.keras.Model, variant: str) -> bytes:
+    """Converts a Keras model to a TFLite flatbuffer
+
+    Args:
+        model (tf.keras.Model): Trained model
+        variant (str): "float32", "float16" weights, or "int8" dynamic-range quantized weights
+
+    Returns:
+        flatbuffer (bytes): Serialized TFLite model
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    # Recurrent layers that have no builtin kernel fall back to TensorFlow ops
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    converter._experimental_lower_tensor_list_ops = False
+
+    if variant in ("float16", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+
+    return converter.convert()
+
+
+def run_tflite(path: str, x: np.ndarray, batch_size: int, num_threads: int) -> tuple:
+    """Runs a TFLite model with batched invocations, as `Processing` does
+
+    Args:
+        path (str): Path to the .tflite model
+        x (np.ndarray): Inputs with shape (n_segments, n_samples, 1)
+        batch_size (int): Segments per invocation
+        num_threads (int): Interpreter threads
+
+    Returns:
+        y (np.ndarray): Outputs with shape (n_segments, n_samples)
+        ms_per_segment (float): Inference time per segment in milliseconds
+    """
+    interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+
+    interpreter.resize_tensor_input(input_details["index"], [batch_size, *x.shape[1:]])
+    interpreter.allocate_tensors()
+
+    n_batches = -(-len(x) // batch_size)
+    padded = np.zeros((n_batches * batch_size, *x.shape[1:]), dtype=np.float32)
+    padded[: len(x)] = x
+    outputs = []
+
+    start = time.perf_counter()
+    for batch in padded.reshape(n_batches, batch_size, *x.shape[1:]):
+        interpreter.set_tensor(input_details["index"], batch)
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_details["index"]))
+    elapsed = time.perf_counter() - start
+
+    return np.concatenate(outputs)[: len(x)], 1e3 * elapsed / len(x)
+
+
+def compare(reference: np.ndarray, output: np.ndarray, clean: np.ndarray) -> dict:
+    """Measures how far a TFLite variant is from the Keras model
+
+    Args:
+        reference (np.ndarray): Keras model outputs
+        output (np.ndarray): TFLite variant outputs
+        clean (np.ndarray): Clean references of the replay set
+
+    Returns:
+        deltas (dict): Output differences and denoising metric changes
+    """
+    keras_metrics = denoising_metrics(reference, clean)
+    tflite_metrics = denoising_metrics(output, clean)
+
+    return {
+        "max_abs_diff": float(np.max(np.abs(output - reference))),
+        "rrmse_vs_keras": denoising_metrics(output, reference)["rrmse"],
+        "correlation": tflite_metrics["correlation"],
+        "correlation_delta": tflite_metrics["correlation"]
+        - keras_metrics["correlation"],
+        "rrmse": tflite_metrics["rrmse"],
+        "rrmse_delta": tflite_metrics["rrmse"] - keras_metrics["rrmse"],
+    }
+
+
+def within_tolerance(deltas: dict, variant: str) -> bool:
+    """Checks the denoising metric changes of a variant against its tolerance
+
+    Args:
+        deltas (dict): Output of `compare`
+        variant (str): TFLite variant the deltas were measured for
+
+    Returns:
+        accepted (bool): True if neither correlation nor RRMSE moved more than `TOLERANCES[variant]`
+    """
+    tolerance = TOLERANCES[variant]
+
+    return (
+        abs(deltas["correlation_delta"]) <= tolerance
+        and abs(deltas["rrmse_delta"]) <= tolerance
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--models", nargs="+", default=sorted(glob.glob("models/*.keras"))
+    )
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS))
+    parser.add_argument("--noisy", default="data/Test_noisy.npy")
+    parser.add_argument("--clean", default="data/Test_clean.npy")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="tflite_accuracy.csv")
+    args = parser.parse_args()
+
+    tf.keras.utils.disable_interactive_logging()
+
+    noisy = np.load(args.noisy)[: args.limit].astype(np.float32)
+    clean = np.load(args.clean)[: args.limit].astype(np.float32)
+    noisy = noisy.reshape(len(noisy), -1, 1)
+
+    rows = []
+    for model_path in args.models:
+        model = tf.keras.models.load_model(model_path)
+        reference = model.predict(noisy, batch_size=args.batch_size).reshape(
+            clean.shape
+        )
+
+        for variant in args.variants:
+            path = f"{os.path.splitext(model_path)[0]}-{variant}.tflite"
+            with open(path, "wb") as file:
+                file.write(convert(model, variant))
+
+            output, ms_per_segment = run_tflite(
+                path, noisy, args.batch_size, args.threads
+            )
+            deltas = compare(reference, output.reshape(clean.shape), clean)
+            rows.append(
+                {
+                    "model": os.path.basename(model_path),
+                    "variant": variant,
+                    "size_kb": round(os.path.getsize(path) / 1024, 1),
+                    "ms_per_segment": round(ms_per_segment, 4),
+                    **deltas,
+                    "within_tolerance": within_tolerance(deltas, variant),
+                }
+            )
+
+    report = pd.DataFrame(rows)
+    report.to_csv(args.output, index=False)
+
+    print(report.to_string(index=False))
+
+    failed = report[~report["within_tolerance"]]
+    if len(failed):
+        raise SystemExit(
+            "Outside tolerance: "
+            + ", ".join(f"{row.model} {row.variant}" for row in failed.itertuples())
+        )
@@ -0,0 +1,84 @@
+"""Generates the replay test set that `benchmark.py` and `export_tflite.py` read
+
+The held-out part of the clean EEG and artifact segments, split as in
+`train.py`, is mixed at random signal-to-noise ratios with the same
+preparation as the training pipeline, and the noisy inputs and their clean
+targets are written as two arrays of shape (n_segments, n_samples). The
+mixtures only depend on the seed, so every run writes the same files. Run
+from the `RNN_model` folder:
+
+    python make_replay.py --clean data/EEG_all_epochs.npy --noise data/EOG_all_epochs.npy
+"""
+
+import argparse
+
+import numpy as np
+
+from train import pipeline, segment_dataset, split_indices
+
+
+def make_replay(
+    clean: str,
+    noise: str,
+    val_split: float = 0.2,
+    snr_range: tuple = (-7.0, 2.0),
+    combinations: int = 1,
+    seed: int = 7,
+) -> tuple:
+    """Mixes the held-out segments into a replay test set
+
+    Args:
+        clean (str): Clean EEG segments .npy file with shape (n_segments, n_samples)
+        noise (str): Artifact segments .npy file with shape (n_segments, n_samples)
+        val_split (float): Held-out share of segments, as in `train.py`
+        snr_range (tuple): Lowest and highest SNR in dB
+        combinations (int): Artifacts mixed into every held-out clean segment
+        seed (int): Random seed of the split and of the SNRs
+
+    Returns:
+        noisy (np.ndarray): Standardized noisy inputs with shape (n_segments, n_samples)
+        targets (np.ndarray): Clean targets on the same scale
+    """
+    _, clean_val = split_indices(len(np.load(clean, mmap_mode="r")), val_split, seed)
+    _, noise_val = split_indices(len(np.load(noise, mmap_mode="r")), val_split, seed)
+
+    dataset = pipeline(
+        segment_dataset(clean, clean_val, stream=False),
+        segment_dataset(noise, noise_val, stream=False),
+        snr_range=snr_range,
+        combinations=combinations,
+        batch_size=256,
+        seed=seed,
+    )
+    batches = [(x.numpy()[..., 0], y.numpy()) for x, y in dataset]
+
+    return (
+        np.concatenate([x for x, _ in batches]),
+        np.concatenate([y for _, y in batches]),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clean", default="data/EEG_all_epochs.npy")
+    parser.add_argument("--noise", default="data/EOG_all_epochs.npy")
+    parser.add_argument("--val-split", type=float, default=0.2)
+    parser.add_argument("--snr", type=float, nargs=2, default=[-7.0, 2.0])
+    parser.add_argument("--combinations", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--noisy-output", default="data/Test_noisy.npy")
+    parser.add_argument("--clean-output", default="data/Test_clean.npy")
+    args = parser.parse_args()
+
+    noisy, targets = make_replay(
+        args.clean,
+        args.noise,
+        val_split=args.val_split,
+        snr_range=tuple(args.snr),
+        combinations=args.combinations,
+        seed=args.seed,
+    )
+    np.save(args.noisy_output, noisy)
+    np.save(args.clean_output, targets)
+
+    print(f"Wrote {len(noisy)} replay segments of {noisy.shape[1]} samples")
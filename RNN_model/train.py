@@ -0,0 +1,257 @@
+"""Trains the BiLSTM artifact-removal model from clean EEG and artifact segments on disk
+
+Noisy training segments are mixed on the fly inside a tf.data pipeline, so
+the dataset is never built in memory. Run from the `RNN_model` folder:
+
+    python train.py --clean data/EEG_all_epochs.npy --noise data/EOG_all_epochs.npy
+"""
+
+import argparse
+import datetime
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.keras.callbacks import EarlyStopping, TensorBoard, ModelCheckpoint
+
+from model import RNN_bilstm
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def split_indices(n_segments: int, val_split: float, seed: int) -> tuple:
+    """Splits segment indices into training and validation parts
+
+    Args:
+        n_segments (int): Number of segments in a file
+        val_split (float): Share of segments used for validation
+        seed (int): Random seed
+
+    Returns:
+        train, val (np.ndarray): Segment indices of each part
+    """
+    indices = np.random.default_rng(seed).permutation(n_segments)
+    n_val = int(round(n_segments * val_split))
+
+    return np.sort(indices[n_val:]), np.sort(indices[:n_val])
+
+
+def segment_dataset(path: str, indices: np.ndarray, stream: bool) -> tf.data.Dataset:
+    """Reads segments of a (n_segments, n_samples) .npy file
+
+    Args:
+        path (str): Path to the .npy file
+        indices (np.ndarray): Segments to read
+        stream (bool): Read segments from a memory map on demand instead of loading the file
+
+    Returns:
+        dataset (tf.data.Dataset): float32 segments of shape (n_samples,)
+    """
+    if not stream:
+        segments = np.load(path)[indices].astype(np.float32)
+        return tf.data.Dataset.from_tensor_slices(segments)
+
+    array = np.load(path, mmap_mode="r")
+
+    def read(index):
+        return np.asarray(array[index], dtype=np.float32)
+
+    return (
+        tf.data.Dataset.from_tensor_slices(indices)
+        .map(
+            lambda index: tf.numpy_function(read, [index], tf.float32),
+            num_parallel_calls=AUTOTUNE,
+        )
+        .map(lambda segment: tf.ensure_shape(segment, [array.shape[1]]))
+    )
+
+
+def mix(
+    clean: tf.Tensor, noise: tf.Tensor, snr_range: tuple, seed: tf.Tensor = None
+) -> tuple:
+    """Mixes an artifact into a clean segment at a random signal-to-noise ratio
+
+    Follows the EEGdenoiseNet preparation used for the shipped models: the
+    artifact is scaled to the drawn SNR in dB and both the noisy input and the
+    clean target are divided by the standard deviation of the noisy segment.
+
+    Args:
+        clean (tf.Tensor): Clean EEG segment
+        noise (tf.Tensor): Artifact segment
+        snr_range (tuple): Lowest and highest SNR in dB
+        seed (tf.Tensor): Stateless seed of shape (2,) fixing the drawn SNR, None draws a new one
+
+    Returns:
+        noisy (tf.Tensor): Standardized model input with shape (n_samples, 1)
+        target (tf.Tensor): Clean segment on the same scale
+    """
+    if seed is None:
+        snr = tf.random.uniform([], *snr_range)
+    else:
+        snr = tf.random.stateless_uniform([], seed, *snr_range)
+
+    rms_clean = tf.sqrt(tf.reduce_mean(tf.square(clean)))
+    rms_noise = tf.sqrt(tf.reduce_mean(tf.square(noise)))
+    noisy = clean + noise * rms_clean / (rms_noise * 10 ** (snr / 20))
+
+    std = tf.math.reduce_std(noisy)
+
+    return (noisy / std)[:, tf.newaxis], clean / std
+
+
+def pipeline(
+    clean: tf.data.Dataset,
+    noise: tf.data.Dataset,
+    snr_range: tuple,
+    combinations: int,
+    batch_size: int,
+    shuffle_buffer: int = None,
+    cache: str = None,
+    seed: int = 0,
+) -> tf.data.Dataset:
+    """Builds the mixing pipeline
+
+    Training pipelines pair every clean segment with `combinations` random
+    artifacts and draw new pairs and SNRs every epoch. Validation pipelines
+    (no shuffle buffer) keep the pairs in order and draw every SNR from a
+    stateless seed of its position, so they produce the same mixtures every
+    epoch without holding them in memory and validation loss is comparable
+    across epochs.
+
+    Args:
+        clean (tf.data.Dataset): Clean segments
+        noise (tf.data.Dataset): Artifact segments
+        snr_range (tuple): Lowest and highest SNR in dB
+        combinations (int): Artifacts mixed into every clean segment per epoch
+        batch_size (int): Batch size
+        shuffle_buffer (int): Shuffle buffer size, None for a validation pipeline
+        cache (str): Cache file of the read segments, None reads them again every epoch
+        seed (int): Seed of the validation SNRs
+
+    Returns:
+        dataset (tf.data.Dataset): Batches of (noisy, clean) segments
+    """
+    if cache:
+        clean = clean.cache(f"{cache}.clean")
+        noise = noise.cache(f"{cache}.noise")
+
+    clean = clean.repeat(combinations)
+    noise = noise.repeat()
+
+    if shuffle_buffer is not None:
+        clean = clean.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+        noise = noise.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+
+        dataset = tf.data.Dataset.zip((clean, noise)).map(
+            lambda x, y: mix(x, y, snr_range), num_parallel_calls=AUTOTUNE
+        )
+    else:
+        dataset = (
+            tf.data.Dataset.zip((clean, noise))
+            .enumerate()
+            .map(
+                lambda index, pair: mix(
+                    *pair, snr_range, seed=tf.stack([tf.cast(seed, tf.int64), index])
+                ),
+                num_parallel_calls=AUTOTUNE,
+            )
+        )
+
+    return dataset.batch(batch_size).prefetch(AUTOTUNE)
+
+
+def callbacks(output: str, log_dir: str, patience: int) -> list:
+    """Creates the callbacks used by the training notebook
+
+    Args:
+        output (str): Path of the best .keras checkpoint
+        log_dir (str): TensorBoard log folder
+        patience (int): Epochs without validation improvement before stopping
+
+    Returns:
+        callbacks (list): TensorBoard, early stopping and checkpoint callbacks
+    """
+    log_dir = os.path.join(log_dir, datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+
+    return [
+        TensorBoard(log_dir=log_dir, histogram_freq=1),
+        EarlyStopping(
+            monitor="val_loss",
+            patience=patience,
+            verbose=1,
+            mode="min",
+            restore_best_weights=True,
+        ),
+        ModelCheckpoint(
+            output,
+            monitor="val_loss",
+            save_best_only=True,
+            verbose=1,
+            mode="min",
+            save_weights_only=False,
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clean", default="data/EEG_all_epochs.npy")
+    parser.add_argument("--noise", default="data/EOG_all_epochs.npy")
+    parser.add_argument("--output", default="models/best_model.keras")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=40)
+    parser.add_argument("--learning-rate", type=float, default=0.00005)
+    parser.add_argument("--combinations", type=int, default=10)
+    parser.add_argument("--snr", type=float, nargs=2, default=[-7.0, 2.0])
+    parser.add_argument("--val-split", type=float, default=0.2)
+    parser.add_argument("--shuffle-buffer", type=int, default=10000)
+    parser.add_argument("--patience", type=int, default=3)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--cache", default=None)
+    parser.add_argument("--log-dir", default="logs/fit")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    tf.random.set_seed(args.seed)
+
+    n_clean, datanum = np.load(args.clean, mmap_mode="r").shape
+    n_noise = len(np.load(args.noise, mmap_mode="r"))
+
+    clean_train, clean_val = split_indices(n_clean, args.val_split, args.seed)
+    noise_train, noise_val = split_indices(n_noise, args.val_split, args.seed)
+
+    train = pipeline(
+        segment_dataset(args.clean, clean_train, args.stream),
+        segment_dataset(args.noise, noise_train, args.stream),
+        snr_range=args.snr,
+        combinations=args.combinations,
+        batch_size=args.batch_size,
+        shuffle_buffer=args.shuffle_buffer,
+        cache=f"{args.cache}.train" if args.cache else None,
+    )
+    val = pipeline(
+        segment_dataset(args.clean, clean_val, args.stream),
+        segment_dataset(args.noise, noise_val, args.stream),
+        snr_range=args.snr,
+        combinations=args.combinations,
+        batch_size=args.batch_size,
+        cache=f"{args.cache}.val" if args.cache else None,
+        seed=args.seed,
+    )
+
+    lr_schedule = tf.keras.optimizers.schedules.ExponentialDecay(
+        args.learning_rate, decay_steps=100000, decay_rate=0.96, staircase=True
+    )
+    adam = tf.optimizers.Adam(
+        learning_rate=lr_schedule, beta_1=0.5, beta_2=0.9, epsilon=1e-08
+    )
+
+    model = RNN_bilstm(datanum)
+    model.compile(optimizer=adam, loss="mse", metrics=["mae"])
+    model.fit(
+        train,
+        epochs=args.epochs,
+        validation_data=val,
+        callbacks=callbacks(args.output, args.log_dir, args.patience),
+    )
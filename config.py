@@ -59,6 +59,7 @@ DEV = False
 EXP_NAME = f'exp-{time.strftime("%Y%m%d-%H%M%S")}'
 TRIAL_LEN = 4
 FLICKER_FREQ = 12
+FLICKER_WAVEFORM = "square"
 N_TRIALS = 4
 N_BLOCKS = 1
 
@@ -66,11 +67,36 @@ N_BLOCKS = 1
 CHANNELS_LIST = ["O1", "O2"]
 EVENT_DICT = {"target": 1}
 SAMPLING_FREQ = 250
+RESAMPLE_FREQ = 256
 FREQ_BANDS = {"freq_bands": [1, 40]}
 TMIN = 2
 TMAX = 4
 RECORD = True
+INGESTION_BACKEND = "database"
+ALIGN_CLOCKS = True
+STREAMING = {"window": 512, "hop": 512}
+# Session archive written next to the PsychoPy data file, None disables it
+ARCHIVE = {"chunk_samples": 4096, "compression": "zlib", "dtype": "float32"}
+RESULTS_DB = "../output/results.sqlite"
 PROCESSING_MODE = "bilstm"
+LATENCY_BUDGET = None
+MODE_PREFERENCE = ["bilstm", "ica", "asr", "none"]
+PRECISION = "float32"
+QUALITY_GATE = {
+    "ptp_max": 200e-6,
+    "flat_std": 0.5e-6,
+    "var_max": 1e-8,
+    "line_freq": 50,
+    "line_ratio_max": 0.5,
+    "min_epochs": 2,
+}
+SURROGATES = {"n_surrogates": 1000, "method": "shift", "n_jobs": 1}
+CACHE = {"max_bytes": 256 * 2**20, "directory": None}
+MODEL_PATH = "../RNN_model/models/b20-LRsch.keras"
+
+# Device connection parameters
+CONNECT_TIMEOUT = 30
+CONNECT_BACKOFF = [0.1, 5.0]
 
 # Psychopy parameters
 expName = "ssvep-stimuli"
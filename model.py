@@ -1,6 +1,14 @@
+import inspect
 import logging
+import queue
+import threading
 
-from config import COMMAND
+from concurrent.futures import Future
+
+from pylsl import local_clock
+
+from config import COMMAND, CONNECT_TIMEOUT, CONNECT_BACKOFF
+from utils.connection import ConnectionManager
 
 import baboard.utils.api as API
 from baboard.utils.socket_client import BoardControl
@@ -22,47 +30,150 @@ class Model:
         self.logger = logger
         self.device_names: list[str] = []
         self.marker_names: list[str] = []
+        self._markers: queue.SimpleQueue = queue.SimpleQueue()
+        self._marker_sender: threading.Thread = None
+        self._command_lock = threading.Lock()
         self.get_db()
         self.filename = get_utils_dict().current_save_file
 
-    def init_stimulation(self) -> None:
-        """Initializes and starts stimulation along with device connection and recording."""
+    def init_stimulation(self, devices: dict = None) -> Future:
+        """Initializes stimulation and starts connecting devices in the background.
+
+        Recording starts once the stimulation device is connected, see `wait_connected`.
+
+        Args:
+            devices (dict): Optional `connect_device` command overrides (e.g. port) for each
+                additional device name, connected concurrently with the stimulation device.
+
+        Returns:
+            future (Future): Resolves to the per-device connection results.
+        """
         self.stimulation = API.Stimulation(source_id="sync-stimulus")
         self.stim_name = self.stimulation.info.source_id()
         self.stim_port = self.stimulation.outlet.get_info().uid()
+        # Older Stimulation.annotate versions only take the message and stamp it on send,
+        # their markers are pushed to the outlet directly to keep the flip timestamp
+        parameters = inspect.signature(self.stimulation.annotate).parameters
+        self._annotate_timestamp = next(
+            (name for name in ("timestamp", "time_stamp", "ts") if name in parameters),
+            None,
+        )
+        if self._annotate_timestamp is None:
+            self.logger.info(
+                "Stimulation.annotate takes no timestamp, markers are pushed to the outlet"
+            )
+
+        self._marker_sender = threading.Thread(
+            target=self._send_markers, name="marker-sender", daemon=True
+        )
+        self._marker_sender.start()
 
         self.board_control = BoardControl(logger=self.logger)
         self.commands = self.board_control.get_commands()
         command = self.commands["connect_device"].copy()
         command["port"] = self.stim_port
-        reply = self.board_control.command(command)
 
-        if reply["command"] == "error":
-            self.logger.error(reply["message"])
-            while reply["command"] == "error":
-                reply = self.board_control.command(command)
+        connect_commands = {self.stim_name: command}
+        for name, options in (devices or {}).items():
+            connect_commands[name] = {**self.commands["connect_device"], **options}
 
-        command = self.commands["start_recording"].copy()
-        command.update(COMMAND)
+        self.connection = ConnectionManager(
+            board_control=self.board_control,
+            logger=self.logger,
+            timeout=CONNECT_TIMEOUT,
+            initial_delay=CONNECT_BACKOFF[0],
+            max_delay=CONNECT_BACKOFF[1],
+            command_lock=self._command_lock,
+        )
+        self.connection_results: dict = {}
+        self._connection_error: Exception = None
+        self._connected = threading.Event()
 
-        self.board_control.command(command)
-        self.logger.info(command["message"])
+        future = self.connection.submit(connect_commands)
+        future.add_done_callback(self._on_connected)
+
+        return future
+
+    def _on_connected(self, future: Future) -> None:
+        """Collects connection results and starts recording once the stimulation device is connected.
+
+        Args:
+            future (Future): Finished connection future.
+        """
+        try:
+            self.connection_results = future.result()
+            self.logger.info(
+                "Device connect latency: "
+                + ", ".join(
+                    f"{name}={result['latency']:.2f} s"
+                    for name, result in self.connection_results.items()
+                )
+            )
+
+            if not self.connection_results[self.stim_name]["connected"]:
+                raise ConnectionError(
+                    f"Could not connect stimulation device {self.stim_name}"
+                )
+
+            command = self.commands["start_recording"].copy()
+            command.update(COMMAND)
+
+            self._command(command)
+            self.logger.info(command["message"])
+
+        except Exception as e:
+            self._connection_error = e
+            self.logger.error(f"Device connection failed: {e}")
+
+        finally:
+            self._connected.set()
+
+    def wait_connected(self, timeout: float = None) -> None:
+        """Blocks until devices are connected and recording has started.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait, None waits until done.
+        """
+        if not self._connected.wait(timeout):
+            raise TimeoutError("Devices are still connecting")
+
+        if self._connection_error is not None:
+            raise self._connection_error
 
     def disconnect_stimulation(self) -> None:
         """Disconnects the stimulation device and stops recording."""
+        if self._marker_sender is not None:
+            self._markers.put(None)
+            self._marker_sender.join(timeout=1)
+
+        self.connection.cancel()
+        self._connected.wait()
+
         command = self.commands["disconnect_device"].copy()
         command["device_name"] = self.stim_name
         command["device_type"] = "lsl"
         command["port"] = self.stim_port
         command["callback"] = "dashboard"
-        reply = self.board_control.command(command)
+        reply = self._command(command)
         if reply["command"] == "error":
             self.logger.error(reply["message"])
 
         command = self.commands["stop_recording"].copy()
-        self.board_control.command(command)
+        self._command(command)
         self.logger.info(command["message"])
 
+    def _command(self, command: dict) -> dict:
+        """Sends a Board command, one request/reply pair at a time across threads.
+
+        Args:
+            command (dict): Board command to send.
+
+        Returns:
+            reply (dict): Reply of BrainAccess Board.
+        """
+        with self._command_lock:
+            return self.board_control.command(command)
+
     def get_db(self) -> list[API.ReadDB, bool]:
         """Retrieves the current database configuration.
 
@@ -72,10 +183,38 @@ class Model:
         self.db, self.db_status = API.get_database()
         return self.db, self.db_status
 
-    def annotate(self, msg: str) -> None:
-        """Annotates the current stimulation with a message.
+    def annotate(self, msg: str, timestamp: float = None) -> None:
+        """Queues an annotation of the current stimulation; it is pushed by the marker sender thread.
+
+        Args:
+            msg (str): The annotation message to add.
+            timestamp (float): LSL timestamp of the event, defaults to the time of the call.
+        """
+        self._markers.put((msg, local_clock() if timestamp is None else timestamp))
+
+    def annotate_on_flip(self, win, msg: str) -> None:
+        """Annotates the current stimulation with the time of the next window flip.
 
         Args:
+            win (psychopy.visual.Window): Window whose next flip shows the event.
             msg (str): The annotation message to add.
         """
-        self.stimulation.annotate(msg)
+        win.callOnFlip(self.annotate, msg)
+
+    def _send_markers(self) -> None:
+        """Sends queued annotations through the stimulation until a None sentinel is received."""
+        while True:
+            marker = self._markers.get()
+            if marker is None:
+                break
+
+            msg, timestamp = marker
+            try:
+                if self._annotate_timestamp is not None:
+                    self.stimulation.annotate(
+                        msg, **{self._annotate_timestamp: timestamp}
+                    )
+                else:
+                    self.stimulation.outlet.push_sample([msg], timestamp)
+            except Exception as e:
+                self.logger.error(f"Failed to send annotation '{msg}': {e}")
@@ -19,6 +19,9 @@ def launch_experiment():
         win = setupWindow(expInfo=expInfo)
         inputs = setupInputs(win=win)
 
+        # Devices connect in the background while the window is set up
+        model.wait_connected()
+
         model.logger.info("Hyperscanning session starting")
 
         run(model=model, expInfo=expInfo, thisExp=thisExp, win=win, inputs=inputs)
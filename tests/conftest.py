@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import the `utils` package from the repository root
+sys.path.insert(0, ROOT)
+
+# Scripts of the RNN_model folder, run from inside it
+RNN_MODULES = ("model", "train", "export_tflite", "benchmark", "make_replay")
+
+
+@pytest.fixture
+def rnn_model(monkeypatch):
+    """Imports scripts of the RNN_model folder, whose `model` shadows the root one"""
+    pytest.importorskip("tensorflow")
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "RNN_model"))
+
+    saved = {name: sys.modules.pop(name) for name in RNN_MODULES if name in sys.modules}
+    yield importlib.import_module
+
+    for name in RNN_MODULES:
+        sys.modules.pop(name, None)
+    sys.modules.update(saved)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from utils.alignment import ClockAligner
+from utils.buffers import RingBuffer
+
+JITTER = 1e-3
+# Nominal 250 Hz devices whose clocks run slightly fast and slow
+RATES = {"a": 250.1, "b": 249.9}
+OFFSETS = {"a": 1000.0, "b": 1000.7}
+
+
+def timestamps(device: str, n_samples: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    true = OFFSETS[device] + np.arange(n_samples) / RATES[device]
+    return true + JITTER * rng.standard_normal(n_samples)
+
+
+def signal(times: np.ndarray) -> np.ndarray:
+    return np.stack([np.sin(2 * np.pi * 3 * times), np.cos(2 * np.pi * 5 * times)])
+
+
+@pytest.fixture
+def aligner():
+    aligner = ClockAligner(sfreq=250.0)
+    for seed, device in enumerate(RATES):
+        stamps = timestamps(device, 60 * 250, seed)
+        # Fed in chunks as the samples arrive
+        for start in range(0, len(stamps), 1000):
+            chunk = np.arange(start, min(start + 1000, len(stamps)))
+            aligner.update(device, chunk, stamps[chunk])
+    return aligner
+
+
+def test_fit_recovers_drift_offset_and_jitter(aligner):
+    assert aligner.devices == ["a", "b"]
+
+    for device, rate in RATES.items():
+        _, period = aligner.fit(device)
+        assert 1 / period == pytest.approx(rate, abs=1e-3)
+        assert aligner.error(device) == pytest.approx(JITTER, rel=0.05)
+
+        times = aligner.times(device, np.array([0, 250 * 30]))
+        expected = OFFSETS[device] + np.array([0, 250 * 30]) / rate
+        np.testing.assert_allclose(times, expected, atol=JITTER / 10)
+
+
+def test_positions_invert_times(aligner):
+    indices = np.array([5.0, 1234.5, 14000.0])
+
+    for device in RATES:
+        positions = aligner.positions(device, aligner.times(device, indices))
+        np.testing.assert_allclose(positions, indices, atol=1e-6)
+
+
+def test_resample_onto_shared_timeline(aligner):
+    n_samples = 60 * 250
+    spans = {device: (0, n_samples) for device in RATES}
+    times = aligner.timeline(spans)
+
+    # The shared timeline is what both devices cover
+    assert times[0] == pytest.approx(OFFSETS["b"], abs=JITTER)
+    assert times[-1] <= OFFSETS["a"] + (n_samples - 1) / RATES["a"] + JITTER
+    assert np.allclose(np.diff(times), 1 / 250.0)
+
+    for device, rate in RATES.items():
+        data = signal(OFFSETS[device] + np.arange(n_samples) / rate)
+        aligned = aligner.resample(device, data, 0, times)
+
+        assert aligned.shape == (2, len(times))
+        # Linear interpolation of 3-5 Hz at 250 Hz, plus the fit error
+        np.testing.assert_allclose(aligned, signal(times), atol=1e-2)
+
+
+def test_hour_long_session_matches_direct_fit():
+    aligner = ClockAligner(sfreq=250.0)
+    n_samples = 3600 * 250
+    # LSL clocks count from boot, so timestamps are large
+    stamps = timestamps("a", n_samples) + 5e5
+
+    for start in range(0, n_samples, 250 * 30):
+        chunk = np.arange(start, start + 250 * 30)
+        aligner.update("a", chunk, stamps[chunk])
+
+    indices = np.arange(n_samples, dtype=np.float64)
+    period, intercept = np.polyfit(indices, stamps - stamps[0], 1)
+    residual = stamps - stamps[0] - (intercept + period * indices)
+
+    assert aligner.fit("a")[1] == pytest.approx(period, rel=1e-9)
+    assert aligner.error("a") == pytest.approx(np.sqrt(np.mean(residual**2)), rel=1e-9)
+
+
+def test_update_buffer_reads_only_new_timestamps():
+    buffer = RingBuffer(n_channels=1, capacity=512, dtype=np.float64)
+    try:
+        stamps = timestamps("a", 2000)
+        aligner = ClockAligner(sfreq=250.0)
+        reference = ClockAligner(sfreq=250.0)
+
+        for start in range(0, 2000, 100):
+            buffer.write(stamps[None, start : start + 100])
+            assert aligner.update_buffer("a", buffer) == 100
+        assert aligner.update_buffer("a", buffer) == 0
+
+        reference.update("a", np.arange(2000), stamps)
+        assert aligner.fit("a") == pytest.approx(reference.fit("a"))
+        assert aligner.error("a") == pytest.approx(reference.error("a"))
+    finally:
+        buffer.close()
+        buffer.unlink()
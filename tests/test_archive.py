@@ -0,0 +1,104 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+mne = pytest.importorskip("mne")
+
+from utils.archive import LOG, MANIFEST, ArchiveReader, SessionArchive  # noqa: E402
+
+SFREQ = 256.0
+
+
+def raw(data: np.ndarray, first_samp: int = 0) -> mne.io.RawArray:
+    info = mne.create_info(["a", "b"], SFREQ, ch_types="eeg")
+    return mne.io.RawArray(data, info, first_samp=first_samp, verbose=False)
+
+
+def index(n_events: int) -> types.SimpleNamespace:
+    """Event index with the attributes `SessionArchive.set_events` reads"""
+    return types.SimpleNamespace(
+        event_id={"target": 1},
+        size=n_events,
+        onsets=np.arange(n_events) * 2.0,
+        codes=np.ones(n_events, dtype=int),
+        blocks=np.arange(n_events) // 4,
+        trials=np.arange(n_events) % 4,
+    )
+
+
+@pytest.mark.parametrize("compression", ["zlib", None])
+def test_round_trip(tmp_path, compression):
+    directory = str(tmp_path / "archive")
+    archive = SessionArchive(directory, chunk_samples=100, compression=compression)
+    data = np.arange(2 * 1000, dtype=np.float64).reshape(2, 1000)
+
+    # Every block rebuilds the whole buffer, only new samples are written
+    written = [
+        archive.append_continuous("dev", "raw", raw(data[:, :stop]))
+        for stop in (350, 730, 1000)
+    ]
+    epochs = np.random.default_rng(0).random((6, 2, 64)).astype(np.float32)
+    archive.append_epochs("dev", epochs[:4], SFREQ, -0.1, ["a", "b"], [0] * 4, range(4))
+    archive.append_epochs("dev", epochs[4:], SFREQ, -0.1, ["a", "b"], [1] * 2, range(2))
+
+    assert written == [350, 380, 270]
+
+    reader = ArchiveReader(directory)
+    np.testing.assert_array_equal(reader.read("dev", "raw", 120, 480), data[:, 120:480])
+    # Rows 120-479 lie in chunks 1 to 4
+    assert reader.chunks_read == 4
+
+    np.testing.assert_array_equal(reader.trials("dev", blocks=[1]), epochs[4:])
+    np.testing.assert_array_equal(
+        reader.trials("dev", blocks=[0], trials=[1, 2]), epochs[1:3]
+    )
+
+
+def test_appends_only_add_log_lines(tmp_path):
+    directory = str(tmp_path / "archive")
+    archive = SessionArchive(directory, chunk_samples=100, metadata={"run": 1})
+    header = os.path.getsize(os.path.join(directory, MANIFEST))
+    data = np.zeros((2, 2000))
+
+    lines = []
+    for block in range(1, 5):
+        archive.append_continuous("dev", "raw", raw(data[:, : 500 * block]))
+        archive.set_events("dev", index(4 * block))
+        with open(os.path.join(directory, LOG)) as file:
+            lines.append(file.read().splitlines())
+
+    # The header never grows and earlier log lines are never rewritten
+    assert os.path.getsize(os.path.join(directory, MANIFEST)) == header
+    for before, after in zip(lines, lines[1:]):
+        assert after[: len(before)] == before
+        assert len(after) == len(before) + 2
+
+    # Each events record only holds the events added since the last one
+    assert all(len(line) < 400 for line in lines[-1])
+
+    reader = ArchiveReader(directory)
+    assert reader.metadata == {"run": 1}
+    events = reader.events("dev", blocks=[3])
+    np.testing.assert_array_equal(events["onsets"], np.arange(12, 16) * 2.0)
+    np.testing.assert_array_equal(events["trials"], np.arange(4))
+
+
+def test_interrupted_session_continues(tmp_path):
+    directory = str(tmp_path / "archive")
+    data = np.arange(2 * 600, dtype=np.float64).reshape(2, 600)
+
+    archive = SessionArchive(directory, chunk_samples=100)
+    archive.append_continuous("dev", "raw", raw(data[:, :250]))
+
+    # A record cut short while it was written
+    with open(os.path.join(directory, LOG), "a") as file:
+        file.write('{"op": "rows", "device": "dev", "ki')
+
+    assert ArchiveReader(directory).info("dev", "raw")["rows"] == 250
+
+    archive = SessionArchive(directory)
+    archive.append_continuous("dev", "raw", raw(data))
+
+    np.testing.assert_array_equal(ArchiveReader(directory).read("dev", "raw"), data)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def segments(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = {}
+    for name, n_segments in (("clean", 20), ("noise", 10)):
+        paths[name] = str(tmp_path / f"{name}.npy")
+        np.save(paths[name], rng.standard_normal((n_segments, 64)))
+
+    return paths
+
+
+def test_replay_set_is_reproducible(rnn_model, segments):
+    make_replay = rnn_model("make_replay").make_replay
+
+    noisy, targets = make_replay(segments["clean"], segments["noise"], seed=3)
+    again, _ = make_replay(segments["clean"], segments["noise"], seed=3)
+    other, _ = make_replay(segments["clean"], segments["noise"], seed=4)
+
+    # 20 % of 20 clean segments, one artifact each
+    assert noisy.shape == targets.shape == (4, 64)
+    np.testing.assert_array_equal(noisy, again)
+    assert not np.array_equal(noisy, other)
+    # Inputs are standardized, targets share their scale
+    np.testing.assert_allclose(noisy.std(axis=1), 1, rtol=1e-5)
+
+
+def test_models_are_benchmarked_in_their_own_process(rnn_model, tmp_path):
+    import tensorflow as tf
+
+    benchmark = rnn_model("benchmark")
+
+    model = tf.keras.Sequential(
+        [tf.keras.Input((64, 1)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(64)]
+    )
+    path = str(tmp_path / "dense.keras")
+    model.save(path)
+
+    rng = np.random.default_rng(0)
+    noisy = rng.standard_normal((32, 64, 1)).astype(np.float32)
+    clean = noisy[..., 0]
+
+    row = benchmark.isolated(path, noisy, clean, batch_size=8, repeats=1, threads=1)
+
+    assert row["model"] == "dense.keras"
+    assert row["segments_per_s"] > 0
+    assert np.isfinite(row["memory_mb"])
+    np.testing.assert_allclose(
+        row["rrmse"],
+        benchmark.denoising_metrics(model.predict(noisy, verbose=0), clean)["rrmse"],
+        rtol=1e-5,
+    )
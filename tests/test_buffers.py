@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from utils.buffers import RingBuffer
+
+
+@pytest.fixture
+def buffer():
+    buffer = RingBuffer(n_channels=2, capacity=8, dtype=np.float32)
+    yield buffer
+    buffer.close()
+    buffer.unlink()
+
+
+def samples(start: int, stop: int) -> np.ndarray:
+    return np.stack([np.arange(start, stop), -np.arange(start, stop)]).astype(np.float32)
+
+
+def test_wrap_around_keeps_windows_contiguous(buffer):
+    for start in range(0, 30, 3):
+        buffer.write(samples(start, start + 3))
+
+    assert buffer.written == 30
+    assert buffer.first == 22
+
+    window = buffer.view(23, 30)
+    np.testing.assert_array_equal(window, samples(23, 30))
+    assert not window.flags.writeable
+    # Zero-copy: the window is a view into the shared block
+    assert np.shares_memory(window, buffer._data)
+
+    np.testing.assert_array_equal(buffer.latest(100), samples(22, 30))
+
+
+def test_chunk_larger_than_capacity_keeps_newest(buffer):
+    buffer.write(samples(0, 20))
+
+    assert buffer.written == 20
+    np.testing.assert_array_equal(buffer.view(12, 20), samples(12, 20))
+
+
+def test_overwritten_samples_are_rejected(buffer):
+    buffer.write(samples(0, 12))
+
+    with pytest.raises(IndexError):
+        buffer.view(3, 10)
+    with pytest.raises(IndexError):
+        buffer.view(10, 13)
+
+
+def test_other_handles_read_the_same_memory(buffer):
+    buffer.write(samples(0, 5))
+
+    with RingBuffer.attach(buffer.name) as reader:
+        assert reader.dtype == np.float32
+        np.testing.assert_array_equal(reader.view(0, 5), samples(0, 5))
+
+        buffer.write(samples(5, 10))
+        assert reader.written == 10
+        np.testing.assert_array_equal(reader.view(2, 10), samples(2, 10))
@@ -0,0 +1,63 @@
+import numpy as np
+
+from utils.cache import ArrayCache
+
+
+def epochs(seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((2, 4, 3, 100))
+
+
+def test_key_follows_contents_and_parameters():
+    data = epochs()
+    key = ArrayCache.key(data, stage="sync", band=[1, 40], parameter="coh")
+
+    assert key == ArrayCache.key(
+        data.copy(), stage="sync", band=[1, 40], parameter="coh"
+    )
+    assert key == ArrayCache.key(data, parameter="coh", band=[1, 40], stage="sync")
+    assert key != ArrayCache.key(epochs(1), stage="sync", band=[1, 40], parameter="coh")
+    assert key != ArrayCache.key(data, stage="sync", band=[8, 12], parameter="coh")
+    assert key != ArrayCache.key(data, stage="sync", band=[1, 40], parameter="plv")
+    assert key != ArrayCache.key(
+        data.astype(np.float32), stage="sync", band=[1, 40], parameter="coh"
+    )
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = ArrayCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(10.0)
+
+    for band in ([1, 40], [1, 40], [8, 12]):
+        cache.get_or_compute(ArrayCache.key(epochs(), band=band), compute)
+
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_memory_budget_evicts_least_recently_used():
+    cache = ArrayCache(max_bytes=2 * 80)
+
+    for name in "abc":
+        cache.put(name, np.zeros(10))
+    cache.get("b")
+    cache.put("d", np.zeros(10))
+
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+    assert cache.stats()["bytes"] == 160
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    value = np.arange(12.0).reshape(3, 4)
+    ArrayCache(directory=str(tmp_path)).put("entry", value)
+
+    loaded = ArrayCache(max_bytes=0, directory=str(tmp_path)).get("entry")
+
+    np.testing.assert_array_equal(loaded, value)
+    assert isinstance(loaded, np.memmap)
@@ -0,0 +1,96 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pytest
+
+mne = pytest.importorskip("mne")
+
+from utils.catalog import INDEX, RecordingCatalog  # noqa: E402
+
+CHANNELS = ["O1", "O2", "Fp1", "Fp2", "Cz"]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    rng = np.random.default_rng(0)
+    info = mne.create_info(CHANNELS, 250.0, ch_types="eeg")
+
+    for name in ("s2_SSVEP_train", "s0_SSVEP_train", "s1_SSVEP_test", "s3_Artifact"):
+        raw = mne.io.RawArray(rng.standard_normal((5, 250 * 30)), info, verbose=False)
+        raw.set_annotations(mne.Annotations([1, 5, 9], [0, 0, 0], ["stim"] * 3))
+        raw.save(tmp_path / f"{name}-raw.fif", verbose=False)
+
+    # Recordings in sub-folders are not part of the catalog
+    os.makedirs(tmp_path / "nested")
+    raw.save(tmp_path / "nested" / "s4_SSVEP_train-raw.fif", verbose=False)
+
+    return str(tmp_path)
+
+
+def test_index_is_reused(directory, monkeypatch):
+    catalog = RecordingCatalog(directory, pattern="*SSVEP*")
+    assert len(catalog) == 3
+
+    described = []
+    monkeypatch.setattr(
+        RecordingCatalog,
+        "describe",
+        staticmethod(lambda path: described.append(path) or {}),
+    )
+    assert RecordingCatalog(directory, pattern="*SSVEP*").scan() == 0
+    assert described == []
+
+
+def test_paths_keep_glob_order(directory):
+    catalog = RecordingCatalog(directory, pattern="*SSVEP_train*")
+
+    assert catalog.paths == glob.glob(os.path.join(directory, "*SSVEP_train*"))
+
+
+def test_patterns_share_one_index(directory):
+    ssvep = RecordingCatalog(directory, pattern="*SSVEP*")
+    artifact = RecordingCatalog(directory, pattern="*Artifact*")
+
+    with open(os.path.join(directory, INDEX)) as file:
+        assert len(json.load(file)) == 4
+
+    os.remove(ssvep.paths[0])
+    ssvep.scan()
+
+    with open(os.path.join(directory, INDEX)) as file:
+        index = json.load(file)
+    assert len(index) == 3
+    assert [os.path.basename(path) for path in artifact.paths] == [
+        "s3_Artifact-raw.fif"
+    ]
+    assert os.path.relpath(artifact.paths[0], directory) in index
+
+
+def test_load_reads_only_the_requested_part(directory):
+    catalog = RecordingCatalog(directory, pattern="*Artifact*")
+    path = catalog.paths[0]
+
+    raw = catalog.load(path, picks=["O1", "O2"], tmin=2, tmax=10)
+    reference = mne.io.read_raw(path, preload=True, verbose=False)
+    reference.pick(["O1", "O2"]).crop(2, 10)
+
+    np.testing.assert_array_equal(raw.get_data(), reference.get_data())
+    events, event_id = catalog.events(path)
+    assert event_id == {"stim": 1}
+    assert len(events) == 3
+
+
+def test_segments_match_cropping(directory):
+    catalog = RecordingCatalog(directory, pattern="*Artifact*")
+    path = catalog.paths[0]
+
+    segments = list(catalog.segments(path, 2, picks=["O1"]))
+    reference = mne.io.read_raw(path, preload=True, verbose=False).pick(["O1"])
+
+    assert len(segments) == 14
+    assert catalog.n_segments(path, 2) == 14
+    np.testing.assert_array_equal(
+        segments[3].get_data(), reference.get_data()[:, 1500:2000]
+    )
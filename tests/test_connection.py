@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+from utils.connection import ConnectionManager
+
+
+class SlowBoard:
+    """Board client whose connect command takes a fixed time and fails a given number of times"""
+
+    def __init__(self, delay: float, failures: dict = None) -> None:
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def command(self, command: dict) -> dict:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+        time.sleep(self.delay)
+
+        with self._lock:
+            self.active -= 1
+            name = command["device_name"]
+            if self.failures.get(name, 0) > 0:
+                self.failures[name] -= 1
+                return {"command": "error", "message": "busy"}
+
+        return {"command": "connect_device", "message": "ok"}
+
+
+def manager(board: SlowBoard, **kwargs) -> ConnectionManager:
+    return ConnectionManager(board, logging.getLogger("test"), **kwargs)
+
+
+def test_commands_are_serialised_while_retries_overlap():
+    board = SlowBoard(delay=0.01, failures={"a": 1, "b": 1, "c": 1})
+    commands = {name: {"device_name": name} for name in ("a", "b", "c")}
+
+    start = time.monotonic()
+    results = manager(board, initial_delay=0.3).connect(commands)
+    elapsed = time.monotonic() - start
+
+    assert all(result["connected"] for result in results.values())
+    # Request/reply pairs share one socket and never interleave
+    assert board.peak == 1
+    # The three retry delays run concurrently
+    assert elapsed < 0.6
+
+
+def test_shared_command_lock_blocks_connections():
+    board = SlowBoard(delay=0.01)
+    lock = threading.Lock()
+    connection = manager(board, command_lock=lock)
+
+    with lock:
+        future = connection.submit({"a": {"device_name": "a"}})
+        time.sleep(0.1)
+        assert board.peak == 0
+
+    assert future.result(timeout=2)["a"]["connected"]
+
+
+def test_submit_returns_before_connecting_and_retries():
+    board = SlowBoard(delay=0.05, failures={"a": 2})
+    connection = manager(board, initial_delay=0.01)
+
+    future = connection.submit({"a": {"device_name": "a"}})
+    assert not future.done()
+
+    results = future.result(timeout=5)
+    assert results["a"]["connected"]
+    assert results["a"]["attempts"] == 3
+    assert connection.status()["a"]["attempts"] == 3
+
+
+def test_cancel_stops_retrying():
+    board = SlowBoard(delay=0.01, failures={"a": 1000})
+    connection = manager(board, timeout=30, initial_delay=0.5)
+
+    future = connection.submit({"a": {"device_name": "a"}})
+    time.sleep(0.1)
+    connection.cancel()
+
+    results = future.result(timeout=2)
+    assert not results["a"]["connected"]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from utils.epoching import analytic_signal, epoch_array, epoch_mask
+
+SFREQ = 100.0
+TMIN, TMAX = -0.2, 0.5
+
+
+def recording(n_samples: int = 1000) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((3, n_samples))
+
+
+def test_mask_matches_the_epochs_that_are_cut():
+    data = recording()
+    # First and last events have windows that run past the data
+    events = np.array([[10, 0, 1], [200, 0, 2], [450, 0, 1], [700, 0, 2], [980, 0, 1]])
+
+    kept = epoch_mask(events, data.shape[-1], SFREQ, TMIN, TMAX)
+    epochs = epoch_array(data, events, SFREQ, TMIN, TMAX)
+
+    np.testing.assert_array_equal(kept, [False, True, True, True, False])
+    assert len(epochs) == kept.sum()
+
+    for epoch, (sample, _, _) in zip(epochs, events[kept]):
+        np.testing.assert_array_equal(epoch, data[:, sample - 20 : sample + 51])
+
+
+def test_mask_follows_first_samp():
+    data = recording()
+    events = np.array([5000, 5010, 5900, 5990])
+
+    kept = epoch_mask(events, data.shape[-1], SFREQ, TMIN, TMAX, first_samp=5000)
+
+    np.testing.assert_array_equal(kept, [False, False, True, False])
+    assert len(epoch_array(data, events, SFREQ, TMIN, TMAX, first_samp=5000)) == 1
+
+
+def test_kept_events_label_epochs_like_mne():
+    mne = pytest.importorskip("mne")
+
+    data = recording()
+    events = np.array([[10, 0, 1], [200, 0, 2], [450, 0, 1], [980, 0, 2]])
+    info = mne.create_info(["a", "b", "c"], SFREQ, ch_types="eeg")
+    raw = mne.io.RawArray(data, info, verbose=False)
+
+    reference = mne.Epochs(
+        raw, events, tmin=TMIN, tmax=TMAX, baseline=None, preload=True, verbose=False
+    )
+    kept = epoch_mask(events, raw.n_times, SFREQ, TMIN, TMAX, raw.first_samp)
+    epochs = mne.EpochsArray(
+        epoch_array(data, events, SFREQ, TMIN, TMAX),
+        info,
+        events=events[kept],
+        tmin=TMIN,
+        verbose=False,
+    )
+
+    np.testing.assert_array_equal(epochs.events, reference.events)
+    np.testing.assert_allclose(epochs.get_data(), reference.get_data())
+
+
+def test_analytic_signal_keeps_only_the_band():
+    t = np.arange(200) / SFREQ
+    alpha = np.sin(2 * np.pi * 10 * t)
+    # Offset, slow drift and line noise outside of the band
+    data = np.stack(
+        [alpha + 0.5 + np.sin(2 * np.pi * 0.5 * t) + np.sin(2 * np.pi * 45 * t)]
+    )
+
+    analytic = analytic_signal(data, sfreq=SFREQ, band=(1, 40))
+
+    np.testing.assert_allclose(analytic[0], analytic_signal(alpha), atol=1e-10)
+    np.testing.assert_allclose(np.abs(analytic[0]), 1.0, atol=1e-10)
+    np.testing.assert_allclose(
+        analytic_signal(data.astype(np.float32), sfreq=SFREQ, band=(1, 40)),
+        analytic,
+        atol=1e-5,
+    )
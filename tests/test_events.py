@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+mne = pytest.importorskip("mne")
+
+from utils.events import EventIndex  # noqa: E402
+
+SFREQ = 250.0
+EVENT_ID = {"target": 1}
+MEAS_DATE = 1_700_000_000.0
+
+
+def recording(meas_date: float = None) -> "mne.io.RawArray":
+    info = mne.create_info(2, SFREQ, ch_types="eeg")
+    raw = mne.io.RawArray(np.zeros((2, int(120 * SFREQ))), info, verbose=False)
+    if meas_date is not None:
+        raw.set_meas_date(meas_date)
+    return raw
+
+
+def add_block(raw, onsets: list) -> None:
+    """Appends the markers of one block, as the stimulation does during a session"""
+    annotations = raw.annotations.copy()
+    for onset in onsets:
+        annotations.append(onset, 0.0, "target")
+    # Non-stimulus markers are ignored by the index
+    annotations.append(onsets[-1] + 1.0, 0.0, "rest")
+    raw.set_annotations(annotations)
+
+
+def reference_events(raw) -> np.ndarray:
+    events, _ = mne.events_from_annotations(raw, event_id=EVENT_ID, verbose=False)
+    return events
+
+
+@pytest.mark.parametrize("meas_date", [None, MEAS_DATE])
+def test_blocks_with_missing_and_extra_markers(meas_date):
+    raw = recording(meas_date)
+    index = EventIndex(EVENT_ID, capacity=2)
+
+    # 4 trials, then one marker lost, then one spurious marker
+    blocks = [
+        [2.0, 6.0, 10.0, 14.0],
+        [32.0, 36.0, 44.0],
+        [62.0, 66.0, 68.5, 70.0, 74.0],
+    ]
+    for block, onsets in enumerate(blocks):
+        add_block(raw, onsets)
+        assert index.update(raw) == len(onsets)
+        assert index.n_blocks == block + 1
+
+    # Updating without new annotations adds nothing
+    assert index.update(raw) == 0
+    assert index.size == 12
+
+    for block, onsets in enumerate(blocks):
+        positions = index.select(block)
+        assert len(positions) == len(onsets)
+        assert index.trials[positions].tolist() == list(range(len(onsets)))
+        assert index.blocks[positions].tolist() == [block] * len(onsets)
+
+    # The short block does not borrow a trial from the block before it
+    np.testing.assert_array_equal(
+        index.events(raw, block=1)[:, 0], (np.array(blocks[1]) * SFREQ).astype(int)
+    )
+
+    expected = reference_events(raw)
+    np.testing.assert_array_equal(index.events(raw), expected)
+    np.testing.assert_array_equal(
+        np.concatenate([index.events(raw, block=block) for block in range(3)]),
+        expected,
+    )
+    assert index.codes[: index.size].tolist() == expected[:, 2].tolist()
+
+
+def test_events_follow_crop_and_resampling():
+    raw = recording(MEAS_DATE)
+    index = EventIndex(EVENT_ID)
+    add_block(raw, [12.0, 16.0, 20.0, 24.0])
+    index.update(raw)
+
+    cropped = raw.copy().crop(tmin=10.0)
+    assert cropped.first_samp > 0
+    np.testing.assert_array_equal(index.events(cropped), reference_events(cropped))
+
+    resampled = raw.copy().resample(256.0, verbose=False)
+    np.testing.assert_array_equal(index.events(resampled), reference_events(resampled))
+
+
+def test_explicit_block_continues_trial_numbers():
+    raw = recording()
+    index = EventIndex(EVENT_ID)
+
+    add_block(raw, [2.0, 6.0])
+    index.update(raw, block=0)
+    add_block(raw, [10.0, 14.0])
+    index.update(raw, block=0)
+
+    assert index.n_blocks == 1
+    assert index.trials[index.select(0)].tolist() == [0, 1, 2, 3]
@@ -0,0 +1,97 @@
+import logging
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+pylsl = pytest.importorskip("pylsl")
+pytest.importorskip("mne")
+
+from utils.ingestion import LSLIngestion
+
+
+def eeg_outlet(name: str, channel_format, n_channels: int = 3, sfreq: float = 250):
+    info = pylsl.StreamInfo(name, "EEG", n_channels, sfreq, channel_format, name)
+    channels = info.desc().append_child("channels")
+    for index in range(n_channels):
+        channels.append_child("channel").append_child_value("label", f"C{index}")
+
+    return pylsl.StreamOutlet(info)
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def names():
+    suffix = uuid.uuid4().hex[:8]
+    return f"eeg-{suffix}", f"markers-{suffix}"
+
+
+@pytest.mark.parametrize(
+    "channel_format, dtype",
+    [(pylsl.cf_float32, np.float32), (pylsl.cf_int16, np.int16)],
+)
+def test_local_outlet_fills_buffers(names, channel_format, dtype):
+    device, marker_source = names
+    outlet = eeg_outlet(device, channel_format)
+    markers = pylsl.StreamOutlet(
+        pylsl.StreamInfo("markers", "Markers", 1, 0, pylsl.cf_string, marker_source)
+    )
+
+    ingestion = LSLIngestion(
+        logging.getLogger("test"),
+        devices=[device],
+        marker_source=marker_source,
+        capacity=10,
+        scale=1e-6,
+        timeout=2.0,
+    )
+    ingestion.start()
+    try:
+        assert ingestion.devices == [device]
+        assert ingestion.channels[device] == ["C0", "C1", "C2"]
+        wait_for(lambda: outlet.have_consumers() and markers.have_consumers())
+
+        samples = np.arange(300 * 3).reshape(300, 3).astype(dtype) % 1000
+        stamps = pylsl.local_clock() + np.arange(300) / 250
+        outlet.push_chunk(samples, stamps)
+        markers.push_sample(["target"], stamps[100])
+
+        buffer, times = ingestion.buffers[device], ingestion.timestamps[device]
+        wait_for(lambda: times.written == 300 and len(ingestion.markers) == 1)
+
+        np.testing.assert_allclose(
+            buffer.view(0, 300), samples.T.astype(np.float64) * 1e-6
+        )
+        # Same machine, so clock-synced timestamps equal the pushed ones
+        np.testing.assert_allclose(times.view(0, 300)[0], stamps, atol=1e-3)
+        assert ingestion.markers[0][1] == "target"
+        assert ingestion.markers[0][0] == pytest.approx(stamps[100], abs=1e-3)
+        assert ingestion.span(device) == (0, 300)
+    finally:
+        ingestion.stop()
+
+
+def test_string_streams_are_rejected(names):
+    device, marker_source = names
+    outlet = eeg_outlet(device, pylsl.cf_string)
+
+    ingestion = LSLIngestion(
+        logging.getLogger("test"),
+        devices=[device],
+        marker_source=marker_source,
+        timeout=1.0,
+    )
+    ingestion.start()
+    try:
+        assert ingestion.devices == []
+    finally:
+        ingestion.stop()
+        del outlet
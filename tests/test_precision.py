@@ -0,0 +1,145 @@
+"""Single against double precision along the signal path
+
+Tolerances are relative to the signal scale: float32 keeps about 7
+significant digits, and every stage below has to stay well inside what the
+sync values are reported with.
+"""
+
+import numpy as np
+import pytest
+
+from utils.epoching import analytic_signal
+from utils.surrogates import SurrogateTest
+
+SFREQ = 100
+
+
+def eeg(n_channels: int, n_times: int, seed: int = 0) -> np.ndarray:
+    """Alpha-band oscillations in noise, at EEG scale (volts)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_times) / SFREQ
+    phase = rng.uniform(0, 2 * np.pi, (n_channels, 1))
+
+    return 20e-6 * np.sin(2 * np.pi * 10 * t + phase) + 5e-6 * rng.standard_normal(
+        (n_channels, n_times)
+    )
+
+
+def test_analytic_signal_keeps_single_precision():
+    data = eeg(4, 500)
+
+    single = analytic_signal(data.astype(np.float32))
+    double = analytic_signal(data)
+
+    assert single.dtype == np.complex64
+    assert double.dtype == np.complex128
+    np.testing.assert_allclose(single, double, rtol=0, atol=1e-5 * np.abs(double).max())
+
+
+@pytest.mark.parametrize("parameter", ["coh", "plv"])
+def test_sync_values_match_between_precisions(parameter):
+    # (2 participants, n_epochs, n_channels, n_times)
+    data = np.stack(
+        [np.stack([eeg(2, 400, seed=10 * p + e) for e in range(6)]) for p in range(2)]
+    )
+    single = analytic_signal(data.astype(np.float32))
+    double = analytic_signal(data)
+
+    # Connectivity lies in [0, 1]
+    np.testing.assert_allclose(
+        SurrogateTest(method="shuffle").magnitude(single, parameter),
+        SurrogateTest(method="shuffle").magnitude(double, parameter),
+        rtol=0,
+        atol=1e-5,
+    )
+
+    values = [
+        SurrogateTest(n_surrogates=20, method="shuffle", seed=0).run(signal, parameter)
+        for signal in (single, double)
+    ]
+    assert values[0]["value"] == pytest.approx(values[1]["value"], abs=1e-5)
+
+
+@pytest.mark.parametrize("parameter", ["coh", "plv", "ccorr"])
+def test_hypyp_sync_matches_between_precisions(parameter):
+    analyses = pytest.importorskip("hypyp.analyses")
+
+    # (2 participants, n_epochs, n_channels, n_times), as in Synchronization.calculate_sync
+    data = np.stack(
+        [np.stack([eeg(2, 400, seed=10 * p + e) for e in range(6)]) for p in range(2)]
+    )
+
+    results = {}
+    for precision in ("float32", "float64"):
+        # Synchronization.hilbert_tranform adds the frequency axis hypyp expects
+        signal = analytic_signal(data.astype(precision), sfreq=SFREQ, band=(1, 40))
+        values = np.moveaxis(signal[None], 0, 3)
+        result = analyses.compute_sync(values, parameter, epochs_average=True)
+
+        inter_values = result[:, 0:2, 2:4]
+        AM = np.mean(inter_values)
+        GM = np.prod(inter_values) ** (1 / 4)
+        results[precision] = (values.dtype, inter_values, (AM + GM) / 2)
+
+    assert results["float32"][0] == np.complex64
+    np.testing.assert_allclose(
+        results["float32"][1], results["float64"][1], rtol=0, atol=1e-5
+    )
+    assert results["float32"][2] == pytest.approx(results["float64"][2], abs=1e-5)
+
+
+def test_filtering_single_precision_samples():
+    mne = pytest.importorskip("mne")
+
+    data = eeg(4, 2000)
+    info = mne.create_info(4, SFREQ, ch_types="eeg")
+
+    # Streams are ingested as float32, MNE filters them in float64
+    single = mne.io.RawArray(
+        data.astype(np.float32).astype(np.float64), info, verbose=False
+    )
+    double = mne.io.RawArray(data, info, verbose=False)
+
+    for raw in (single, double):
+        raw.filter(1, 40, fir_design="firwin", verbose=False)
+
+    scale = np.abs(double.get_data()).max()
+    np.testing.assert_allclose(
+        single.get_data(), double.get_data(), rtol=0, atol=1e-6 * scale
+    )
+
+
+def test_bilstm_cleaning_matches_between_precisions(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    mne = pytest.importorskip("mne")
+    pytest.importorskip("asrpy")
+    from utils.processing import CHANNELS, Processing
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential(
+        [
+            tf.keras.Input((2 * SFREQ, 1)),
+            tf.keras.layers.Bidirectional(
+                tf.keras.layers.LSTM(4, return_sequences=True)
+            ),
+            tf.keras.layers.Dense(1),
+        ]
+    )
+    path = str(tmp_path / "tiny.keras")
+    model.save(path)
+
+    info = mne.create_info(CHANNELS, SFREQ, ch_types="eeg")
+    raw = mne.io.RawArray(eeg(len(CHANNELS), 1100), info, verbose=False)
+    events = np.array([[100, 0, 1], [900, 0, 1]])
+
+    cleaned = {
+        precision: Processing(model_path=path, precision=precision)
+        .clean(raw.copy(), mode="bilstm", events=events)
+        .get_data()
+        for precision in ("float32", "float64")
+    }
+
+    scale = np.abs(cleaned["float64"]).max()
+    np.testing.assert_allclose(
+        cleaned["float32"], cleaned["float64"], rtol=0, atol=1e-5 * scale
+    )
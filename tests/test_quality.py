@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from utils.quality import QualityGate
+
+SFREQ = 250
+
+
+def epochs(n_epochs: int = 5, n_channels: int = 2, n_times: int = 500) -> np.ndarray:
+    """Clean 10 Hz oscillations in noise, 20 µV amplitude"""
+    rng = np.random.default_rng(0)
+    t = np.arange(n_times) / SFREQ
+    return 20e-6 * np.sin(2 * np.pi * 10 * t) + 5e-6 * rng.standard_normal(
+        (n_epochs, n_channels, n_times)
+    )
+
+
+def test_clean_epochs_pass():
+    report = QualityGate().assess(epochs(), SFREQ)
+
+    assert report["good"].tolist() == [True] * 5
+    assert report["usable"]
+    assert report["ptp"].shape == (5, 2)
+    assert QualityGate.summary(report) == "ptp=0,flat=0,variance=0,line_noise=0"
+
+
+def test_each_check_rejects_its_epoch():
+    data = epochs()
+    t = np.arange(data.shape[-1]) / SFREQ
+    # Blink-sized step on one channel
+    data[0, 1, 200:] += 300e-6
+    # Disconnected electrode
+    data[2, 0] = 0.0
+    # Mains interference dominating one channel
+    data[4, 0] += 100e-6 * np.sin(2 * np.pi * 50 * t)
+
+    report = QualityGate(var_max=1.0).assess(data, SFREQ)
+
+    assert report["good"].tolist() == [False, True, False, True, False]
+    assert report["failed"]["ptp"].tolist() == [True, False, False, False, True]
+    assert report["failed"]["flat"].tolist() == [False, False, True, False, False]
+    assert report["failed"]["line_noise"].tolist() == [
+        False,
+        False,
+        False,
+        False,
+        True,
+    ]
+    assert report["line_ratio"][4, 0] > 0.5
+    assert report["usable"]
+
+
+def test_variance_threshold():
+    data = epochs()
+    data[3] *= 100
+
+    report = QualityGate(ptp_max=np.inf).assess(data, SFREQ)
+
+    assert report["failed"]["variance"].tolist() == [False, False, False, True, False]
+
+
+@pytest.mark.parametrize("min_epochs, usable", [(2, True), (3, False)])
+def test_device_needs_min_good_epochs(min_epochs, usable):
+    data = epochs()
+    data[:3, 0] = 0.0
+
+    report = QualityGate(min_epochs=min_epochs).assess(data, SFREQ)
+
+    assert int(report["good"].sum()) == 2
+    assert report["usable"] is usable
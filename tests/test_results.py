@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.results import ResultsWriter
+
+COLUMNS = {"subject_1": str, "n_epochs": int, "synchronization_value": float}
+
+
+def parts(path) -> list:
+    return sorted(name for name in os.listdir(path) if name.startswith("part-"))
+
+
+def test_frame_keeps_column_types_with_missing_values(tmp_path):
+    writer = ResultsWriter(str(tmp_path), columns=COLUMNS)
+    writer.append(subject_1="a", n_epochs=3, synchronization_value=0.5)
+    writer.append(subject_1="b")
+
+    df = writer.frame()
+
+    assert len(writer) == 2
+    assert str(df["subject_1"].dtype) == "string"
+    assert str(df["n_epochs"].dtype) == "Int64"
+    assert df["synchronization_value"].dtype == "float64"
+    assert df["n_epochs"].isna().tolist() == [False, True]
+
+
+def test_unknown_column_is_rejected(tmp_path):
+    writer = ResultsWriter(str(tmp_path), columns=COLUMNS)
+
+    with pytest.raises(KeyError):
+        writer.append(subjects="a vs b")
+    assert len(writer) == 0
+
+
+def test_flush_writes_one_part_per_batch_and_leaves_no_temporaries(tmp_path):
+    writer = ResultsWriter(str(tmp_path), columns=COLUMNS, batch_size=3)
+
+    for i in range(7):
+        writer.append(subject_1=f"s{i}", n_epochs=i, synchronization_value=i / 10)
+
+    # Two full batches were flushed on append, one record is still buffered
+    assert len(parts(tmp_path)) == 2
+    assert len(writer) == 1
+
+    assert writer.flush() is not None
+    assert writer.flush() is None
+    assert len(parts(tmp_path)) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    df = writer.read()
+    assert df["subject_1"].tolist() == [f"s{i}" for i in range(7)]
+    assert df["n_epochs"].tolist() == list(range(7))
+
+
+def test_context_manager_flushes_and_exports(tmp_path):
+    path = tmp_path / "results"
+    with ResultsWriter(str(path), columns=COLUMNS) as writer:
+        writer.append(subject_1="a", n_epochs=1, synchronization_value=0.1)
+        writer.append(subject_1="b", n_epochs=2, synchronization_value=0.2)
+
+    writer.export_csv(str(tmp_path / "results.csv"))
+    df = pd.read_csv(tmp_path / "results.csv")
+
+    assert df["subject_1"].tolist() == ["a", "b"]
+    assert df["synchronization_value"].tolist() == [0.1, 0.2]
+
+
+def test_read_without_parts_is_empty(tmp_path):
+    writer = ResultsWriter(str(tmp_path / "missing"), columns=COLUMNS)
+
+    df = writer.read()
+
+    assert len(df) == 0
+    assert list(df.columns) == list(COLUMNS)
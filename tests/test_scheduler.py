@@ -0,0 +1,73 @@
+import pytest
+
+from utils import scheduler
+from utils.scheduler import ModeScheduler
+
+
+class Clock:
+    """Manually advanced replacement for time.perf_counter"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler.time, "perf_counter", clock)
+    return clock
+
+
+def test_most_thorough_mode_that_fits(clock):
+    costs = {"bilstm": 1e-3, "ica": 1e-4, "asr": 1e-5, "none": 0.0}
+    modes = ModeScheduler(budget=1.0, costs=costs)
+
+    # 1000 samples x 2 channels: bilstm 2 s, ica 0.2 s, asr 0.02 s
+    assert modes.choose(1000, 2) == "ica"
+    # The budget is shared between the devices left in the block
+    assert modes.choose(1000, 2, n_devices=20) == "asr"
+    # Channels can differ per mode
+    assert modes.choose(1000, {"bilstm": 0, "ica": 2, "asr": 2, "none": 2}) == "bilstm"
+
+
+def test_budget_runs_down_within_a_block(clock):
+    modes = ModeScheduler(budget=1.0, costs={"bilstm": 1e-4})
+
+    assert modes.choose(1000, 2) == "bilstm"
+
+    clock.now = 0.9
+    assert modes.remaining() == pytest.approx(0.1)
+    assert modes.choose(1000, 2) == "ica"
+
+    clock.now = 2.0
+    assert modes.choose(1000, 2) == "none"
+
+    modes.start_block()
+    assert modes.remaining() == pytest.approx(1.0)
+    assert modes.choose(1000, 2) == "bilstm"
+
+
+def test_cheapest_mode_when_nothing_fits(clock):
+    modes = ModeScheduler(budget=0.0, modes=["bilstm", "ica"])
+
+    assert modes.choose(1000, 2) == "ica"
+
+
+def test_measurements_replace_then_smooth_estimates(clock):
+    modes = ModeScheduler(budget=1.0, smoothing=0.5)
+
+    # The first measurement replaces the default estimate
+    modes.update("ica", 1000, 2, elapsed=0.4)
+    assert modes.estimate("ica", 1000, 2) == pytest.approx(0.4)
+
+    # Later ones are blended with the running estimate
+    modes.update("ica", 1000, 2, elapsed=0.8)
+    assert modes.estimate("ica", 1000, 2) == pytest.approx(0.6)
+
+    # Empty runs carry no information
+    modes.update("ica", 0, 2, elapsed=1.0)
+    assert modes.estimate("ica", 1000, 2) == pytest.approx(0.6)
+    assert modes.estimate("unknown", 1000, 2) == 0.0
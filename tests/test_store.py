@@ -0,0 +1,103 @@
+import sqlite3
+
+import pandas as pd
+
+from utils.results import ResultsWriter
+from utils.store import ResultsStore
+
+
+def write_analysis(path, n_rows: int) -> None:
+    pd.DataFrame(
+        {
+            "Segment_ID": range(n_rows),
+            "RMS_Noisy": 2.0,
+            "RMS_Cleaned": 1.0,
+            "RMS_diff": 1.0,
+            "Correlation": 0.9,
+            "P_Value": 0.01,
+        }
+    ).to_csv(path, index=False)
+
+
+def write_sync(path) -> None:
+    pd.DataFrame(
+        {
+            "date": ["20240101-120000"] * 2,
+            "subjects": ["user_1 vs user_2"] * 2,
+            "parameter": ["coh", "plv"],
+            "frequency_bands": ["{'freq_bands': [1, 40]}"] * 2,
+            "synchronization_value": [0.4, 0.6],
+        }
+    ).to_csv(path, index=False)
+
+
+def count(store: ResultsStore, table: str) -> int:
+    with sqlite3.connect(store.path) as con:
+        return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_import_directory_is_idempotent(tmp_path):
+    write_analysis(tmp_path / "ica_analysis_results.csv", 5)
+    write_analysis(tmp_path / "asr_analysis_results.csv", 3)
+    write_sync(tmp_path / "exp-20240101-120000.csv")
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+
+    assert store.import_directory(str(tmp_path)) == 10
+    assert store.import_directory(str(tmp_path)) == 0
+    assert count(store, "cleaning_analysis") == 8
+    assert count(store, "results") == 2
+
+
+def test_changed_file_is_imported_again(tmp_path):
+    path = tmp_path / "ica_analysis_results.csv"
+    write_analysis(path, 2)
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+
+    assert store.import_csv(str(path)) == 2
+    write_analysis(path, 4)
+    assert store.import_csv(str(path)) == 4
+    # Rows of the earlier import are replaced, not duplicated
+    assert count(store, "cleaning_analysis") == 4
+    assert store.import_csv(str(path)) == 0
+
+
+def test_appended_file_replaces_its_rows_only(tmp_path):
+    path = tmp_path / "exp-20240101-120000.csv"
+    write_sync(path)
+    write_analysis(tmp_path / "ica_analysis_results.csv", 3)
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.import_directory(str(tmp_path))
+    store.insert(pd.DataFrame({"parameter": ["coh"], "synchronization_value": [0.1]}))
+
+    # The session appended one more row to its CSV since the last import
+    df = pd.read_csv(path)
+    pd.concat([df, df.tail(1)]).to_csv(path, index=False)
+
+    assert store.import_directory(str(tmp_path)) == 3
+    assert count(store, "results") == 4
+    assert count(store, "cleaning_analysis") == 3
+
+
+def test_imported_results_are_queryable(tmp_path):
+    write_sync(tmp_path / "exp-20240101-120000.csv")
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.import_directory(str(tmp_path))
+
+    df = store.query(subjects=("user_2", "user_1"), parameter="plv", band=(1, 40))
+    assert df["synchronization_value"].tolist() == [0.6]
+
+
+def test_every_flushed_batch_reaches_the_store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    results = ResultsWriter(
+        str(tmp_path / "parts"),
+        batch_size=4,
+        on_flush=lambda df: store.insert(df, exp_name="exp"),
+    )
+
+    for i in range(10):
+        results.append(subject_1="a", subject_2="b", synchronization_value=i / 10)
+    results.flush()
+
+    assert count(store, "results") == 10
+    assert store.values(subjects=("a", "b")).tolist() == [i / 10 for i in range(10)]
@@ -0,0 +1,174 @@
+import logging
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("mne")
+pytest.importorskip("asrpy")
+pytest.importorskip("pylsl")
+
+import mne  # noqa: E402
+
+from utils import streaming  # noqa: E402
+from utils.buffers import RingBuffer  # noqa: E402
+
+SFREQ = 256
+N_SAMPLES = 30 * SFREQ
+
+
+class Scale:
+    """Linear stand-in for the BiLSTM, so streamed and offline outputs must agree"""
+
+    def predict(self, x: np.ndarray, batch_size: int = 256, verbose: int = 0):
+        return 0.5 * x[..., 0]
+
+
+class Tanh:
+    """Non-linear stand-in, whose output depends on how its input was standardised"""
+
+    def predict(self, x: np.ndarray, batch_size: int = 256, verbose: int = 0):
+        return np.tanh(x[..., 0])
+
+
+class Ingestion:
+    """Minimal live source with the attributes `StreamingDenoiser` reads"""
+
+    def __init__(self) -> None:
+        self.devices = ["device"]
+        self.channels = {"device": ["O1", "O2", "Fp1"]}
+        self.sfreq = {"device": float(SFREQ)}
+        self.buffers = {"device": RingBuffer(3, N_SAMPLES + SFREQ, np.float64)}
+
+    def span(self, device: str) -> tuple:
+        buffer = self.buffers[device]
+        return buffer.first, buffer.written
+
+    def close(self) -> None:
+        for buffer in self.buffers.values():
+            buffer.close()
+            buffer.unlink()
+
+
+def recording() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(N_SAMPLES) / SFREQ
+    return np.vstack(
+        [
+            np.sin(2 * np.pi * 10 * t) + 0.3 * rng.standard_normal(N_SAMPLES),
+            np.sin(2 * np.pi * 12 * t) + 0.3 * rng.standard_normal(N_SAMPLES),
+            rng.standard_normal(N_SAMPLES),
+        ]
+    )
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    ingestion = Ingestion()
+    denoisers = []
+
+    def make(hop: int, model=Scale) -> streaming.StreamingDenoiser:
+        monkeypatch.setattr(
+            streaming, "load_model", lambda path, num_threads=None: model()
+        )
+        denoiser = streaming.StreamingDenoiser(
+            ingestion,
+            "model",
+            ["O1", "O2"],
+            logging.getLogger(__name__),
+            sfreq=SFREQ,
+            hop=hop,
+            dtype="float64",
+        )
+        # The worker is stopped right away, chunks are processed by the test
+        denoiser.start()
+        denoiser._stop.set()
+        denoiser._thread.join()
+        denoisers.append(denoiser)
+        return denoiser
+
+    yield ingestion, make
+
+    for denoiser in denoisers:
+        denoiser.stop()
+    ingestion.close()
+
+
+def band_pass(data: np.ndarray) -> np.ndarray:
+    """Band-passes as `Processing.clean` does"""
+    return mne.filter.filter_data(
+        data, SFREQ, 1, 40, fir_design="firwin", verbose=False
+    )
+
+
+def offline(data: np.ndarray) -> np.ndarray:
+    """Band-passes as `Processing.clean` does and applies the linear stand-in model"""
+    return 0.5 * band_pass(data)
+
+
+@pytest.mark.parametrize("hop", [512, 256])
+def test_streamed_output_matches_offline_cleaning(stream, hop):
+    ingestion, make = stream
+    denoiser = make(hop)
+    data = recording()
+
+    # Samples arrive in chunks that do not line up with segments
+    for start in range(0, N_SAMPLES, 100):
+        ingestion.buffers["device"].write(data[:, start : start + 100])
+        denoiser.process("device")
+
+    positions = np.arange(2000, 6000, dtype=float)
+    streamed = denoiser.denoised("device", positions)
+    reference = offline(data[:2])[:, 2000:6000]
+
+    np.testing.assert_allclose(streamed, reference, atol=1e-6 * np.abs(reference).max())
+
+
+def test_tail_is_denoised_on_request(stream):
+    ingestion, make = stream
+    denoiser = make(512)
+    data = recording()
+
+    ingestion.buffers["device"].write(data)
+    denoiser.process("device")
+
+    # The last samples are not covered by a full segment yet
+    positions = np.arange(N_SAMPLES - 600, N_SAMPLES - 10, dtype=float)
+    assert denoiser._streams["device"].output.written < N_SAMPLES - 10
+
+    streamed = denoiser.denoised("device", positions)
+    # The newest sample waits for the next one to be resampled, the filter is
+    # flushed with zeros after the one before it, as at the end of a recording
+    received = data[:2, : N_SAMPLES - 1]
+    filtered = np.array(
+        [
+            np.convolve(channel, denoiser._taps)[denoiser._delay :][:N_SAMPLES]
+            for channel in received
+        ]
+    )
+
+    np.testing.assert_allclose(
+        streamed, 0.5 * filtered[:, N_SAMPLES - 600 : N_SAMPLES - 10], atol=1e-9
+    )
+
+
+def test_segments_are_standardised_by_their_own_std(stream):
+    ingestion, make = stream
+    denoiser = make(512, model=Tanh)
+    data = recording()
+    # A loud stretch early in the session must not change later segments
+    data[:, : 8 * SFREQ] *= 20
+
+    for start in range(0, N_SAMPLES, 100):
+        ingestion.buffers["device"].write(data[:, start : start + 100])
+        denoiser.process("device")
+
+    # Whole 512-sample segments, past the filter transient of the loud stretch
+    positions = np.arange(6 * 512, 14 * 512, dtype=float)
+    streamed = denoiser.denoised("device", positions)
+
+    segments = band_pass(data[:2])[:, 6 * 512 : 14 * 512].reshape(2, -1, 512)
+    std = segments.std(axis=-1, keepdims=True)
+    reference = (np.tanh(segments / std) * std).reshape(2, -1)
+
+    np.testing.assert_allclose(streamed, reference, atol=1e-6 * np.abs(reference).max())
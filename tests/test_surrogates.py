@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from utils.epoching import analytic_signal
+from utils.surrogates import SurrogateTest
+
+
+def test_shuffle_pairings_are_derangements():
+    test = SurrogateTest(n_surrogates=5000, method="shuffle", seed=0)
+
+    pairing = test.pairings(n_epochs=4, n_pairings=4)
+
+    assert pairing.shape == (5000, 4)
+    np.testing.assert_array_equal(
+        np.sort(pairing, axis=1), np.tile(np.arange(4), (5000, 1))
+    )
+    assert not np.any(pairing == np.arange(4))
+    # All 9 derangements of 4 epochs are drawn
+    assert len({tuple(row) for row in pairing}) == 9
+
+
+def test_two_epochs_swap():
+    pairing = SurrogateTest(n_surrogates=10, method="shuffle", seed=0).pairings(2, 2)
+
+    np.testing.assert_array_equal(pairing, np.tile([1, 0], (10, 1)))
+
+
+def test_shuffle_needs_two_epochs():
+    with pytest.raises(ValueError):
+        SurrogateTest(method="shuffle").pairings(1, 1)
+
+
+def test_shift_pairings_keep_away_from_zero_lag():
+    pairing = SurrogateTest(n_surrogates=2000, min_shift=0.1, seed=0).pairings(8, 100)
+
+    assert pairing.min() >= 10
+    assert pairing.max() <= 90
+
+
+def test_identical_signals_are_significant():
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((8, 1, 200))
+    # Both participants share every epoch, shuffled epochs do not
+    signal = analytic_signal(np.stack([data, data]))
+
+    result = SurrogateTest(n_surrogates=200, method="shuffle", seed=0).run(
+        signal, "plv"
+    )
+
+    assert result["value"] == pytest.approx(1.0)
+    assert result["null"].max() < result["value"]
+    assert result["p_value"] == pytest.approx(1 / 201)
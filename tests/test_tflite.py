@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+N_SAMPLES = 128
+
+
+@pytest.fixture
+def denoiser():
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    # Dense layers are large enough for int8 dynamic-range quantization to apply
+    return tf.keras.Sequential(
+        [
+            tf.keras.Input((N_SAMPLES, 1)),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(256, activation="relu"),
+            tf.keras.layers.Dense(N_SAMPLES),
+        ]
+    )
+
+
+def replay(n_segments: int = 64) -> tuple:
+    rng = np.random.default_rng(0)
+    t = np.arange(N_SAMPLES) / 256
+    clean = np.sin(2 * np.pi * 10 * t + rng.uniform(0, 2 * np.pi, (n_segments, 1)))
+    noisy = clean + 0.5 * rng.standard_normal(clean.shape)
+
+    return noisy.astype(np.float32)[..., None], clean.astype(np.float32)
+
+
+@pytest.mark.parametrize("variant", ["float32", "float16", "int8"])
+def test_variants_stay_within_tolerance(rnn_model, denoiser, tmp_path, variant):
+    export = rnn_model("export_tflite")
+    noisy, clean = replay()
+
+    path = str(tmp_path / f"{variant}.tflite")
+    with open(path, "wb") as file:
+        file.write(export.convert(denoiser, variant))
+
+    output, _ = export.run_tflite(path, noisy, batch_size=16, num_threads=1)
+    reference = denoiser.predict(noisy, verbose=0)
+    deltas = export.compare(reference, output.reshape(clean.shape), clean)
+
+    assert export.within_tolerance(deltas, variant), deltas
+
+
+def test_tolerance_rejects_a_degraded_variant(rnn_model, denoiser):
+    export = rnn_model("export_tflite")
+    noisy, clean = replay()
+
+    reference = denoiser.predict(noisy, verbose=0)
+    # A variant that shrinks the output, as a broken quantization would
+    degraded = 0.9 * reference
+    deltas = export.compare(reference, degraded, clean)
+
+    assert not export.within_tolerance(deltas, "int8")
+    assert export.within_tolerance(
+        export.compare(reference, reference, clean), "float32"
+    )
+
+
+def test_tflite_model_keeps_one_input_shape(rnn_model, denoiser, tmp_path):
+    pytest.importorskip("mne")
+    pytest.importorskip("asrpy")
+    from utils.processing import TFLiteModel
+
+    export = rnn_model("export_tflite")
+    path = str(tmp_path / "float32.tflite")
+    with open(path, "wb") as file:
+        file.write(export.convert(denoiser, "float32"))
+
+    model = TFLiteModel(path, num_threads=1, batch_size=16)
+    noisy, _ = replay(37)
+
+    empty = model.predict(noisy[:0])
+    assert empty.shape == (0, N_SAMPLES)
+
+    # Full batches and a short, zero-padded last batch
+    np.testing.assert_allclose(
+        model.predict(noisy), denoiser.predict(noisy, verbose=0), atol=1e-5
+    )
+    np.testing.assert_allclose(
+        model.predict(noisy[:3]), denoiser.predict(noisy[:3], verbose=0), atol=1e-5
+    )
+    assert list(model._interpreter.get_input_details()[0]["shape"]) == [
+        16,
+        N_SAMPLES,
+        1,
+    ]
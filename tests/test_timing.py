@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from utils.timing import FrameTimer, flicker_schedule
+
+
+def run_trial(timer: FrameTimer, flip_times: np.ndarray, visible: np.ndarray) -> dict:
+    timer.reset()
+    for flip_time, state in zip(flip_times, visible):
+        timer.record(flip_time, state)
+    return timer.stats(flicker_freq=10.0)
+
+
+def test_interval_statistics_and_dropped_frames():
+    timer = FrameTimer(frame_rate=60.0, max_duration=1.0)
+    flip_times = np.arange(20) / 60.0
+    # Two frames missed between flips 9 and 10
+    flip_times[10:] += 2 / 60.0
+
+    stats = run_trial(timer, flip_times, np.full(20, -1))
+
+    assert stats["n_frames"] == 20
+    assert stats["dropped_frames"] == 2
+    assert stats["frame_interval_max"] == pytest.approx(3 / 60.0)
+    assert stats["frame_interval_mean"] == pytest.approx(flip_times[-1] / 19)
+    assert np.isnan(stats["flicker_freq_effective"])
+
+
+def test_effective_flicker_frequency_from_onsets():
+    timer = FrameTimer(frame_rate=60.0, max_duration=2.0)
+    flip_times = np.arange(60) / 60.0
+    # 3 frames on, 3 frames off: 10 Hz
+    visible = (np.arange(60) // 3 + 1) % 2
+    visible[:6] = -1
+
+    stats = run_trial(timer, flip_times, visible)
+
+    assert stats["flicker_freq_target"] == 10.0
+    assert stats["flicker_freq_effective"] == pytest.approx(10.0)
+
+
+def test_not_running_frames_are_not_onsets():
+    timer = FrameTimer(frame_rate=60.0, max_duration=1.0)
+    visible = np.array([-1, 1, -1, 1, -1, 1])
+
+    stats = run_trial(timer, np.arange(6) / 60.0, visible)
+
+    assert np.isnan(stats["flicker_freq_effective"])
+
+
+def test_reset_and_capacity():
+    timer = FrameTimer(frame_rate=10.0, max_duration=0.5)
+    for i in range(timer.capacity + 5):
+        timer.record(i / 10.0)
+    assert timer.stats()["n_frames"] == timer.capacity
+
+    timer.reset()
+    stats = timer.stats()
+    assert stats["n_frames"] == 0
+    assert np.isnan(stats["frame_interval_mean"])
+    assert stats["dropped_frames"] == 0
+
+
+@pytest.mark.parametrize("waveform", ["square", "sine"])
+@pytest.mark.parametrize("flicker_freq", [12.0, 7.5, 11.3])
+def test_flicker_schedule_onsets_match_frequency(waveform, flicker_freq):
+    frame_rate = 60.0
+    schedule, visible = flicker_schedule(frame_rate, flicker_freq, 4.0, waveform)
+
+    assert schedule.shape == visible.shape
+    assert schedule.min() >= 0 and schedule.max() <= 1
+    # The stimulus is always drawn with some opacity while it is on
+    assert np.all(schedule[visible == 1] > 0)
+
+    timer = FrameTimer(frame_rate=frame_rate, max_duration=4.0)
+    for frame, state in enumerate(visible):
+        timer.record(frame / frame_rate, state)
+    stats = timer.stats(flicker_freq=flicker_freq)
+
+    assert stats["flicker_freq_effective"] == pytest.approx(flicker_freq, rel=0.05)
+
+
+def test_square_schedule_is_on_off():
+    schedule, visible = flicker_schedule(60.0, 12.0, 1.0, "square")
+
+    np.testing.assert_array_equal(schedule, visible)
+    np.testing.assert_array_equal(visible[:5], [1, 1, 1, 0, 0])
+
+
+def test_unknown_waveform():
+    with pytest.raises(ValueError):
+        flicker_schedule(60.0, 12.0, 1.0, "triangle")
@@ -0,0 +1,46 @@
+import glob
+
+import numpy as np
+
+
+def segments(tf, n_segments: int, seed: int):
+    data = np.random.default_rng(seed).standard_normal((n_segments, 64))
+    return tf.data.Dataset.from_tensor_slices(data.astype(np.float32))
+
+
+def batches(dataset) -> np.ndarray:
+    return np.concatenate([noisy.numpy() for noisy, _ in dataset])
+
+
+def test_validation_mixes_are_the_same_every_epoch(rnn_model):
+    import tensorflow as tf
+
+    train = rnn_model("train")
+    kwargs = dict(snr_range=(-7.0, 2.0), combinations=3, batch_size=4)
+
+    val = train.pipeline(segments(tf, 8, 0), segments(tf, 5, 1), **kwargs)
+    fit = train.pipeline(
+        segments(tf, 8, 0), segments(tf, 5, 1), shuffle_buffer=16, **kwargs
+    )
+
+    first = batches(val)
+    assert first.shape == (24, 64, 1)
+    np.testing.assert_array_equal(first, batches(val))
+    assert not np.array_equal(batches(fit), batches(fit))
+
+
+def test_segments_are_only_cached_to_a_given_file(rnn_model, tmp_path, monkeypatch):
+    import tensorflow as tf
+
+    train = rnn_model("train")
+    monkeypatch.chdir(tmp_path)
+    kwargs = dict(snr_range=(-7.0, 2.0), combinations=1, batch_size=4)
+
+    batches(train.pipeline(segments(tf, 8, 0), segments(tf, 5, 1), **kwargs))
+    assert glob.glob(str(tmp_path / "*")) == []
+
+    cache = str(tmp_path / "segments")
+    batches(
+        train.pipeline(segments(tf, 8, 0), segments(tf, 5, 1), cache=cache, **kwargs)
+    )
+    assert glob.glob(f"{cache}.clean*") and glob.glob(f"{cache}.noise*")
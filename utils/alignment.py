@@ -0,0 +1,208 @@
+import numpy as np
+
+from utils.buffers import RingBuffer
+
+
+class ClockAligner:
+    """Maps each device's samples onto a shared clock with a running linear fit
+
+    Every device gets a least-squares fit of its sample timestamps against
+    sample indices, updated from running means and centred co-moments so each
+    update costs only the new samples. The fit absorbs clock offset and drift
+    and averages out timestamp jitter, and whole blocks are then resampled onto
+    one shared timeline with vectorized linear interpolation.
+    """
+
+    def __init__(self, sfreq: float) -> None:
+        """Initializes clock aligner
+
+        Args:
+            sfreq (float): Sampling frequency of the shared timeline
+        """
+        self.sfreq = sfreq
+
+        # count, mean x, mean y and co-moments xx, xy, yy of indices and timestamps
+        self._moments: dict[str, np.ndarray] = {}
+        self._reference: dict[str, tuple] = {}
+        self._seen: dict[str, int] = {}
+
+    @property
+    def devices(self) -> list:
+        """Names of devices with a clock fit"""
+        return list(self._moments)
+
+    def update(self, device: str, indices: np.ndarray, timestamps: np.ndarray) -> None:
+        """Adds new samples to the running fit of a device
+
+        Args:
+            device (str): Device name
+            indices (np.ndarray): Sample indices
+            timestamps (np.ndarray): Timestamps of the samples in seconds
+        """
+        if len(indices) == 0:
+            return
+
+        if device not in self._moments:
+            # Timestamps are accumulated relative to the line through the first
+            # chunk, so they stay near the jitter scale over hour-long sessions
+            # and the residual keeps its precision
+            period = 0.0
+            if len(indices) > 1 and indices[-1] != indices[0]:
+                period = (timestamps[-1] - timestamps[0]) / (indices[-1] - indices[0])
+
+            self._reference[device] = (
+                int(indices[0]),
+                float(timestamps[0]),
+                float(period),
+            )
+            self._moments[device] = np.zeros(6)
+
+        index0, time0, period0 = self._reference[device]
+        x = np.asarray(indices, dtype=np.float64) - index0
+        y = np.asarray(timestamps, dtype=np.float64) - time0 - period0 * x
+
+        # Merges the centred statistics of the new samples into the running ones
+        count, mean_x, mean_y, cxx, cxy, cyy = self._moments[device]
+        n = len(x)
+        dx, dy = x - x.mean(), y - y.mean()
+        delta_x, delta_y = x.mean() - mean_x, y.mean() - mean_y
+        total = count + n
+        weight = count * n / total
+
+        self._moments[device] = np.array(
+            [
+                total,
+                mean_x + delta_x * n / total,
+                mean_y + delta_y * n / total,
+                cxx + dx @ dx + delta_x**2 * weight,
+                cxy + dx @ dy + delta_x * delta_y * weight,
+                cyy + dy @ dy + delta_y**2 * weight,
+            ]
+        )
+
+    def update_buffer(self, device: str, timestamps: RingBuffer) -> int:
+        """Adds the timestamps written to a buffer since the last update
+
+        Args:
+            device (str): Device name
+            timestamps (RingBuffer): Single-channel buffer of sample timestamps
+
+        Returns:
+            n_new (int): Number of new samples
+        """
+        start = max(self._seen.get(device, 0), timestamps.first)
+        stop = timestamps.written
+
+        if stop > start:
+            self.update(device, np.arange(start, stop), timestamps.view(start, stop)[0])
+        self._seen[device] = stop
+
+        return max(stop - start, 0)
+
+    def fit(self, device: str) -> tuple:
+        """Returns the clock fit of a device
+
+        Args:
+            device (str): Device name
+
+        Returns:
+            intercept (float): Fitted timestamp of the reference sample, relative to its timestamp
+            period (float): Fitted seconds per sample
+        """
+        _, mean_x, mean_y, cxx, cxy, _ = self._moments[device]
+        period0 = self._reference[device][2]
+
+        if cxx <= 0:
+            return mean_y, period0
+
+        slope = cxy / cxx
+        intercept = mean_y - slope * mean_x
+
+        return intercept, period0 + slope
+
+    def error(self, device: str) -> float:
+        """Returns the root mean square residual of the timestamps around the fit
+
+        Args:
+            device (str): Device name
+
+        Returns:
+            rms (float): Alignment error in seconds
+        """
+        count, _, _, cxx, cxy, cyy = self._moments[device]
+
+        residual = cyy - (cxy**2 / cxx if cxx > 0 else 0.0)
+
+        return float(np.sqrt(max(residual, 0.0) / count))
+
+    def times(self, device: str, indices: np.ndarray) -> np.ndarray:
+        """Maps sample indices of a device to shared clock times
+
+        Args:
+            device (str): Device name
+            indices (np.ndarray): Sample indices
+
+        Returns:
+            times (np.ndarray): Fitted timestamps in seconds
+        """
+        index0, time0, _ = self._reference[device]
+        a, b = self.fit(device)
+
+        return time0 + a + b * (np.asarray(indices, dtype=np.float64) - index0)
+
+    def positions(self, device: str, times: np.ndarray) -> np.ndarray:
+        """Maps shared clock times to fractional sample indices of a device
+
+        Args:
+            device (str): Device name
+            times (np.ndarray): Timestamps in seconds
+
+        Returns:
+            positions (np.ndarray): Fractional sample indices
+        """
+        index0, time0, _ = self._reference[device]
+        a, b = self.fit(device)
+
+        return index0 + (np.asarray(times, dtype=np.float64) - time0 - a) / b
+
+    def timeline(self, spans: dict) -> np.ndarray:
+        """Builds the shared timeline covered by every device
+
+        Args:
+            spans (dict): Sample range [start, stop) of every device
+
+        Returns:
+            times (np.ndarray): Shared clock times at the timeline sampling frequency
+        """
+        start = max(
+            float(self.times(device, span[0])) for device, span in spans.items()
+        )
+        stop = min(
+            float(self.times(device, span[1] - 1)) for device, span in spans.items()
+        )
+        n_samples = max(int(np.floor((stop - start) * self.sfreq)) + 1, 0)
+
+        return start + np.arange(n_samples) / self.sfreq
+
+    def resample(
+        self, device: str, data: np.ndarray, start: int, times: np.ndarray
+    ) -> np.ndarray:
+        """Linearly interpolates device samples at shared clock times
+
+        Args:
+            device (str): Device name
+            data (np.ndarray): Samples with shape (n_channels, n_samples)
+            start (int): Sample index of the first column of `data`
+            times (np.ndarray): Shared clock times to sample at
+
+        Returns:
+            aligned (np.ndarray): Samples with shape (n_channels, len(times))
+        """
+        positions = self.positions(device, times) - start
+        lower = np.clip(np.floor(positions).astype(np.int64), 0, data.shape[1] - 2)
+        fraction = (positions - lower).astype(data.dtype)
+
+        below = np.take(data, lower, axis=1)
+        above = np.take(data, lower + 1, axis=1)
+
+        return below + (above - below) * fraction
@@ -0,0 +1,654 @@
+import json
+import os
+import tempfile
+import zlib
+
+import mne
+import numpy as np
+
+from utils.events import EventIndex, _reference
+
+MANIFEST = "manifest.json"
+LOG = "log.jsonl"
+CONTINUOUS = ("raw", "cleaned")
+
+
+def _write_atomic(path: str, payload: bytes) -> None:
+    """Writes a file next to its target and renames it, so readers never see a partial file
+
+    Args:
+        path (str): Target path
+        payload (bytes): File contents
+    """
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as file:
+        file.write(payload)
+    os.replace(temp, path)
+
+
+def _replay(directory: str) -> tuple:
+    """Rebuilds the manifest of an archive from its header and its append log
+
+    A last log line cut short by an interrupted write is ignored, the chunks
+    it would have described are then simply not read.
+
+    Args:
+        directory (str): Archive folder
+
+    Returns:
+        manifest (dict): Header with the layout and events of every device
+        size (int): Bytes of the log taken by complete records
+    """
+    with open(os.path.join(directory, MANIFEST)) as file:
+        manifest = json.load(file)
+    manifest["devices"] = {}
+    size = 0
+
+    path = os.path.join(directory, LOG)
+    if not os.path.exists(path):
+        return manifest, size
+
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            _apply(manifest, json.loads(line))
+            size += len(line)
+
+    return manifest, size
+
+
+def _apply(manifest: dict, record: dict) -> None:
+    """Applies one append log record to a manifest
+
+    Args:
+        manifest (dict): Manifest updated in place
+        record (dict): "array" creates an array, "rows" sets its row count and
+            adds epoch labels, "events" adds indexed events
+    """
+    entry = manifest["devices"].setdefault(
+        record["device"], {"event_id": {}, "events": {}, "arrays": {}}
+    )
+
+    if record["op"] == "array":
+        entry["arrays"][record["kind"]] = dict(record["meta"])
+    elif record["op"] == "rows":
+        meta = entry["arrays"][record["kind"]]
+        meta["rows"] = record["rows"]
+        for name in ("blocks", "trials"):
+            if name in record:
+                meta[name] += record[name]
+    elif record["op"] == "events":
+        entry["event_id"] = record["event_id"]
+        for name, values in record["events"].items():
+            entry["events"].setdefault(name, []).extend(values)
+
+
+class _ChunkedArray:
+    """Rows of one array split into fixed-size chunk files along the first axis
+
+    Chunks are zlib-compressed raw bytes, or `.npy` files that are memory-mapped
+    when read back if compression is off. Reads only touch the chunks that
+    overlap the requested rows.
+    """
+
+    def __init__(
+        self, directory: str, meta: dict, compression: str, level: int
+    ) -> None:
+        """Initializes chunked array
+
+        Args:
+            directory (str): Folder holding the chunk files
+            meta (dict): Manifest entry of the array, updated in place on appends
+            compression (str): "zlib", or None to store memory-mappable `.npy` chunks
+            level (int): zlib compression level
+        """
+        self.directory = directory
+        self.meta = meta
+        self.compression = compression
+        self.level = level
+
+        self.dtype = np.dtype(meta["dtype"])
+        self.row_shape = tuple(meta["row_shape"])
+        self.chunk_rows = meta["chunk_rows"]
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def rows(self) -> int:
+        """Number of rows stored"""
+        return self.meta["rows"]
+
+    def _path(self, chunk: int) -> str:
+        """Returns the path of a chunk file"""
+        suffix = ".zz" if self.compression == "zlib" else ".npy"
+        return os.path.join(self.directory, f"{chunk:06d}{suffix}")
+
+    def _write_chunk(self, chunk: int, rows: np.ndarray) -> None:
+        """Writes one chunk, replacing an earlier partial version of it"""
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+
+        if self.compression == "zlib":
+            _write_atomic(self._path(chunk), zlib.compress(rows.tobytes(), self.level))
+        else:
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+            with os.fdopen(fd, "wb") as file:
+                np.save(file, rows)
+            os.replace(temp, self._path(chunk))
+
+    def _read_chunk(self, chunk: int) -> np.ndarray:
+        """Reads one chunk, as a read-only memory map if it is not compressed"""
+        if self.compression == "zlib":
+            with open(self._path(chunk), "rb") as file:
+                payload = zlib.decompress(file.read())
+            return np.frombuffer(payload, dtype=self.dtype).reshape(-1, *self.row_shape)
+
+        return np.load(self._path(chunk), mmap_mode="r")
+
+    def append(self, rows: np.ndarray) -> None:
+        """Appends rows, completing the last partial chunk first
+
+        Args:
+            rows (np.ndarray): Rows with shape (n_rows, *row_shape)
+        """
+        if len(rows) == 0:
+            return
+
+        chunk, filled = divmod(self.rows, self.chunk_rows)
+        if filled:
+            rows = np.concatenate([self._read_chunk(chunk)[:filled], rows])
+
+        for offset in range(0, len(rows), self.chunk_rows):
+            self._write_chunk(chunk, rows[offset : offset + self.chunk_rows])
+            chunk += 1
+
+        self.meta["rows"] += len(rows) - filled
+
+    def read(self, start: int, stop: int, memo: dict = None) -> np.ndarray:
+        """Reads rows [start, stop) from the chunks that cover them
+
+        Args:
+            start (int): First row
+            stop (int): Row after the last one
+            memo (dict): Chunks already read by the caller, reused and filled in
+
+        Returns:
+            rows (np.ndarray): Rows with shape (stop - start, *row_shape)
+        """
+        start, stop = max(start, 0), min(stop, self.rows)
+        if stop <= start:
+            return np.empty((0, *self.row_shape), dtype=self.dtype)
+
+        memo = {} if memo is None else memo
+        parts = []
+
+        for chunk in range(start // self.chunk_rows, (stop - 1) // self.chunk_rows + 1):
+            if chunk not in memo:
+                memo[chunk] = self._read_chunk(chunk)
+
+            offset = chunk * self.chunk_rows
+            parts.append(memo[chunk][max(start - offset, 0) : stop - offset])
+
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+class SessionArchive:
+    """Writes the raw data and cleaned epochs of a session into a chunked archive
+
+    Every device and data kind is an array split into fixed-size chunks on
+    disk. Continuous data is stored time-major, so a chunk holds
+    `chunk_samples` samples of every channel, and epochs are grouped into
+    chunks of about the same size. `manifest.json` holds the run metadata and
+    the chunk layout, and every append adds a line to `log.jsonl` with the new
+    row counts, epoch labels and events only, so an append costs the same at
+    the end of a session as at its start and an interrupted session stays
+    readable up to its last complete line.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        chunk_samples: int = 4096,
+        compression: str = "zlib",
+        level: int = 6,
+        dtype: str = "float32",
+        metadata: dict = None,
+    ) -> None:
+        """Initializes session archive, continuing an existing one in `directory`
+
+        Args:
+            directory (str): Archive folder
+            chunk_samples (int): Samples per chunk of continuous data
+            compression (str): "zlib", or None to store memory-mappable `.npy` chunks
+            level (int): zlib compression level
+            dtype (str): Data type samples are stored as
+            metadata (dict): Run metadata such as `COMMAND` and `expInfo`
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            self.manifest, size = _replay(directory)
+            # Drops a record cut short by an interrupted session before appending
+            if os.path.exists(os.path.join(directory, LOG)):
+                os.truncate(os.path.join(directory, LOG), size)
+        else:
+            self.manifest = {
+                "version": 2,
+                "chunk_samples": chunk_samples,
+                "compression": compression,
+                "level": level,
+                "dtype": dtype,
+                "metadata": {},
+                "devices": {},
+            }
+
+        self.manifest["metadata"].update(metadata or {})
+        self._write_header()
+        self._arrays: dict[tuple, _ChunkedArray] = {}
+
+    def _write_header(self) -> None:
+        """Writes the manifest without the per-device entries kept in the log"""
+        header = {
+            name: value for name, value in self.manifest.items() if name != "devices"
+        }
+        _write_atomic(
+            os.path.join(self.directory, MANIFEST),
+            json.dumps(header, indent=1, default=str).encode(),
+        )
+
+    def _log(self, record: dict) -> None:
+        """Applies a record to the manifest and appends it to the log
+
+        Args:
+            record (dict): Record as read by `_apply`
+        """
+        _apply(self.manifest, record)
+
+        with open(os.path.join(self.directory, LOG), "a") as file:
+            file.write(json.dumps(record, default=str) + "\n")
+
+    def _device(self, device: str) -> dict:
+        """Returns the manifest entry of a device, creating it if needed"""
+        return self.manifest["devices"].setdefault(
+            device, {"event_id": {}, "events": {}, "arrays": {}}
+        )
+
+    def _array(self, device: str, kind: str, row_shape: tuple, **meta) -> _ChunkedArray:
+        """Returns the chunked array of a device and data kind, creating it if needed"""
+        arrays = self._device(device)["arrays"]
+
+        if kind not in arrays:
+            # Epoch chunks hold about as many samples as continuous ones
+            chunk_rows = self.manifest["chunk_samples"]
+            if kind not in CONTINUOUS:
+                chunk_rows = max(chunk_rows // row_shape[-1], 1)
+
+            self._log(
+                {
+                    "op": "array",
+                    "device": device,
+                    "kind": kind,
+                    "meta": {
+                        "dtype": self.manifest["dtype"],
+                        "row_shape": list(row_shape),
+                        "chunk_rows": chunk_rows,
+                        "rows": 0,
+                        **meta,
+                    },
+                }
+            )
+        elif list(row_shape) != arrays[kind]["row_shape"]:
+            raise ValueError(
+                f"{kind} rows of {device} have shape {row_shape}, "
+                f"archive holds {tuple(arrays[kind]['row_shape'])}"
+            )
+
+        if (device, kind) not in self._arrays:
+            self._arrays[(device, kind)] = _ChunkedArray(
+                os.path.join(self.directory, device, kind),
+                arrays[kind],
+                self.manifest["compression"],
+                self.manifest["level"],
+            )
+
+        return self._arrays[(device, kind)]
+
+    def append_continuous(self, device: str, kind: str, raw: mne.io.Raw) -> int:
+        """Appends the samples of `raw` that are newer than the archived ones
+
+        Raw data rebuilt from the LSL buffers covers the whole buffer every
+        block, so samples are placed by their absolute time and only the part
+        after the archived end is written. A gap before `raw` starts is filled
+        with NaN so sample positions stay tied to time.
+
+        Args:
+            device (str): User device name
+            kind (str): "raw" or "cleaned"
+            raw (mne.io.Raw): Continuous data
+
+        Returns:
+            n_new (int): Number of samples appended
+        """
+        sfreq = raw.info["sfreq"]
+        start = _reference(raw) + raw.first_samp / sfreq
+
+        array = self._array(
+            device,
+            kind,
+            (len(raw.ch_names),),
+            sfreq=sfreq,
+            start=start,
+            ch_names=list(raw.ch_names),
+        )
+        if array.meta["sfreq"] != sfreq:
+            raise ValueError(
+                f"{kind} of {device} is sampled at {sfreq} Hz, "
+                f"archive holds {array.meta['sfreq']} Hz"
+            )
+
+        offset = int(round((array.meta["start"] - start) * sfreq)) + array.rows
+        if offset >= raw.n_times:
+            return 0
+
+        data = raw.get_data(start=max(offset, 0)).T.astype(array.dtype)
+        if offset < 0:
+            gap = np.full((-offset, data.shape[1]), np.nan, dtype=array.dtype)
+            data = np.concatenate([gap, data])
+
+        array.append(data)
+        self._log({"op": "rows", "device": device, "kind": kind, "rows": array.rows})
+
+        return len(data)
+
+    def append_epochs(
+        self,
+        device: str,
+        epochs: np.ndarray,
+        sfreq: float,
+        tmin: float,
+        ch_names: list,
+        blocks: np.ndarray,
+        trials: np.ndarray,
+    ) -> int:
+        """Appends epochs together with the block and trial each one belongs to
+
+        Args:
+            device (str): User device name
+            epochs (np.ndarray): Epoched data with shape (n_epochs, n_channels, n_times)
+            sfreq (float): Sampling frequency
+            tmin (float): Start of each epoch relative to its event in seconds
+            ch_names (list): Channel names
+            blocks (np.ndarray): Block of every epoch
+            trials (np.ndarray): Trial of every epoch within its block
+
+        Returns:
+            n_new (int): Number of epochs appended
+        """
+        array = self._array(
+            device,
+            "epochs",
+            epochs.shape[1:],
+            sfreq=sfreq,
+            tmin=tmin,
+            ch_names=list(ch_names),
+            blocks=[],
+            trials=[],
+        )
+
+        array.append(epochs)
+        self._log(
+            {
+                "op": "rows",
+                "device": device,
+                "kind": "epochs",
+                "rows": array.rows,
+                "blocks": [int(block) for block in blocks],
+                "trials": [int(trial) for trial in trials],
+            }
+        )
+
+        return len(epochs)
+
+    def set_events(self, device: str, index: EventIndex) -> None:
+        """Stores the events of a device indexed since the last call
+
+        Args:
+            device (str): User device name
+            index (EventIndex): Events indexed so far, the index only ever grows
+        """
+        entry = self._device(device)
+        archived = len(entry["events"].get("onsets", []))
+
+        if archived == index.size and entry["event_id"] == index.event_id:
+            return
+
+        self._log(
+            {
+                "op": "events",
+                "device": device,
+                "event_id": index.event_id,
+                "events": {
+                    name: getattr(index, name)[archived : index.size].tolist()
+                    for name in ("onsets", "codes", "blocks", "trials")
+                },
+            }
+        )
+
+
+class ArchiveReader:
+    """Reads trials, blocks or sample ranges back from a session archive
+
+    Only the chunks overlapping a request are decompressed, or memory-mapped
+    if the archive was written without compression.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Initializes archive reader
+
+        Args:
+            directory (str): Archive folder
+        """
+        self.directory = directory
+        self.manifest, _ = _replay(directory)
+        self.chunks_read = 0
+
+    @property
+    def metadata(self) -> dict:
+        """Run metadata stored with the session"""
+        return self.manifest["metadata"]
+
+    @property
+    def devices(self) -> list:
+        """Names of archived devices"""
+        return list(self.manifest["devices"])
+
+    def kinds(self, device: str) -> list:
+        """Returns the data kinds archived for a device"""
+        return list(self.manifest["devices"][device]["arrays"])
+
+    def info(self, device: str, kind: str) -> dict:
+        """Returns the manifest entry of an archived array"""
+        return self.manifest["devices"][device]["arrays"][kind]
+
+    def _array(self, device: str, kind: str) -> _ChunkedArray:
+        """Opens the chunked array of a device and data kind"""
+        return _ChunkedArray(
+            os.path.join(self.directory, device, kind),
+            self.info(device, kind),
+            self.manifest["compression"],
+            self.manifest["level"],
+        )
+
+    def _read(
+        self, array: _ChunkedArray, start: int, stop: int, memo: dict
+    ) -> np.ndarray:
+        """Reads rows and counts the chunks that had to be read for them"""
+        before = len(memo)
+        rows = array.read(start, stop, memo)
+        self.chunks_read += len(memo) - before
+
+        return rows
+
+    def events(self, device: str, blocks: list = None, trials: list = None) -> dict:
+        """Returns the indexed events of a device
+
+        Args:
+            device (str): User device name
+            blocks (list): Blocks to select, None selects every block
+            trials (list): Trials within each block to select, None selects every trial
+
+        Returns:
+            events (dict): Onsets, codes, blocks and trials arrays of the selected events
+        """
+        events = {
+            name: np.asarray(values)
+            for name, values in self.manifest["devices"][device]["events"].items()
+        }
+        keep = self._select(
+            events.get("blocks", []), events.get("trials", []), blocks, trials
+        )
+
+        return {name: values[keep] for name, values in events.items()}
+
+    @staticmethod
+    def _select(
+        block_of: np.ndarray, trial_of: np.ndarray, blocks: list, trials: list
+    ) -> np.ndarray:
+        """Returns a mask of the entries matching the requested blocks and trials"""
+        keep = np.ones(len(block_of), dtype=bool)
+        if blocks is not None:
+            keep &= np.isin(block_of, blocks)
+        if trials is not None:
+            keep &= np.isin(trial_of, trials)
+
+        return keep
+
+    def read(
+        self, device: str, kind: str, start: int = 0, stop: int = None
+    ) -> np.ndarray:
+        """Reads a sample range of continuous data
+
+        Args:
+            device (str): User device name
+            kind (str): "raw" or "cleaned"
+            start (int): First sample
+            stop (int): Sample after the last one, None reads to the end
+
+        Returns:
+            data (np.ndarray): Samples with shape (n_channels, n_samples)
+        """
+        array = self._array(device, kind)
+        stop = array.rows if stop is None else stop
+
+        return self._read(array, start, stop, {}).T
+
+    def to_raw(
+        self, device: str, kind: str = "raw", start: int = 0, stop: int = None
+    ) -> mne.io.RawArray:
+        """Builds raw MNE data from a sample range of continuous data
+
+        Args:
+            device (str): User device name
+            kind (str): "raw" or "cleaned"
+            start (int): First sample
+            stop (int): Sample after the last one, None reads to the end
+
+        Returns:
+            raw (mne.io.RawArray): Archived data with its events as annotations
+        """
+        meta = self.info(device, kind)
+        info = mne.create_info(meta["ch_names"], sfreq=meta["sfreq"], ch_types="eeg")
+        raw = mne.io.RawArray(
+            np.array(self.read(device, kind, start, stop), dtype=np.float64),
+            info,
+            verbose=False,
+        )
+
+        entry = self.manifest["devices"][device]
+        events = self.events(device)
+        if len(events.get("onsets", [])):
+            names = {code: name for name, code in entry["event_id"].items()}
+            offset = meta["start"] + start / meta["sfreq"]
+            inside = (events["onsets"] >= offset) & (
+                events["onsets"] < offset + raw.n_times / meta["sfreq"]
+            )
+            raw.set_annotations(
+                mne.Annotations(
+                    onset=events["onsets"][inside] - offset,
+                    duration=np.zeros(inside.sum()),
+                    description=[names[code] for code in events["codes"][inside]],
+                )
+            )
+
+        return raw
+
+    def trials(
+        self,
+        device: str,
+        kind: str = "epochs",
+        blocks: list = None,
+        trials: list = None,
+        tmin: float = None,
+        tmax: float = None,
+    ) -> np.ndarray:
+        """Reads the data of selected trials
+
+        Epochs are read as stored. For continuous data a window from `tmin` to
+        `tmax` around every selected event is cut, as `mne.Epochs` would, and
+        windows that are not fully archived are dropped.
+
+        Args:
+            device (str): User device name
+            kind (str): "epochs", "raw" or "cleaned"
+            blocks (list): Blocks to select, None selects every block
+            trials (list): Trials within each block to select, None selects every trial
+            tmin (float): Window start around events in seconds, defaults to the epochs' one
+            tmax (float): Window end around events in seconds, defaults to the epochs' one
+
+        Returns:
+            data (np.ndarray): Trial data with shape (n_trials, n_channels, n_times)
+        """
+        memo = {}
+
+        if kind == "epochs":
+            array = self._array(device, kind)
+            rows = np.flatnonzero(
+                self._select(array.meta["blocks"], array.meta["trials"], blocks, trials)
+            )
+            if len(rows) == 0:
+                return np.empty((0, *array.row_shape), dtype=array.dtype)
+
+            # Selections are mostly runs of consecutive epochs, read one run at a time
+            runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+            return np.concatenate(
+                [self._read(array, run[0], run[-1] + 1, memo) for run in runs]
+            )
+
+        if tmin is None or tmax is None:
+            if "epochs" not in self.kinds(device):
+                raise ValueError("tmin and tmax are needed without archived epochs")
+            epochs = self.info(device, "epochs")
+            tmin = epochs["tmin"] if tmin is None else tmin
+            tmax = (
+                epochs["tmin"] + (epochs["row_shape"][1] - 1) / epochs["sfreq"]
+                if tmax is None
+                else tmax
+            )
+
+        array = self._array(device, kind)
+        sfreq, start = array.meta["sfreq"], array.meta["start"]
+        first = int(round(tmin * sfreq))
+        n_times = int(round(tmax * sfreq)) - first + 1
+
+        onsets = self.events(device, blocks, trials).get("onsets", np.empty(0))
+        samples = np.round((onsets - start) * sfreq).astype(np.int64) + first
+        samples = samples[(samples >= 0) & (samples + n_times <= array.rows)]
+
+        data = np.empty(
+            (len(samples), *array.row_shape[::-1], n_times), dtype=array.dtype
+        )
+        for position, sample in enumerate(samples):
+            data[position] = self._read(array, sample, sample + n_times, memo).T
+
+        return data
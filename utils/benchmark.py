@@ -0,0 +1,111 @@
+"""Benchmarks run time and peak memory of each Processing cleaning mode
+
+Run from the `utils` folder, where the model paths used by Processing resolve:
+
+    python benchmark.py --duration 120 --precision float32
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import mne
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.processing import Processing
+
+
+def synthetic_raw(
+    duration: float, sfreq: float = 256, seed: int = 0
+) -> mne.io.RawArray:
+    """Creates noisy EEG-like data with the channels Processing expects
+
+    Args:
+        duration (float): Recording length in seconds
+        sfreq (float): Sampling frequency
+        seed (int): Random seed
+
+    Returns:
+        raw (mne.io.RawArray): Synthetic recording
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(int(duration * sfreq)) / sfreq
+
+    ssvep = np.sin(2 * np.pi * 12 * times)
+    blinks = (rng.random(len(times)) < 0.002).astype(float)
+    blinks = np.convolve(blinks, np.hanning(int(0.3 * sfreq)), mode="same")
+
+    data = 1e-5 * rng.standard_normal((4, len(times)))
+    data[:2] += 5e-6 * ssvep
+    data[2:] += 1e-4 * blinks
+
+    info = mne.create_info(["O1", "O2", "Fp1", "Fp2"], sfreq=sfreq, ch_types="eeg")
+    return mne.io.RawArray(data, info, verbose=False)
+
+
+def benchmark(
+    cleaner: Processing, raw: mne.io.Raw, modes: list, repeats: int = 2
+) -> pd.DataFrame:
+    """Measures run time and peak traced memory of each cleaning mode
+
+    The first repeat of each mode includes one-off costs (model load, scratch
+    allocation), later repeats show the steady state of a running session.
+
+    Args:
+        cleaner (Processing): Cleaner reused across repeats, as across blocks
+        raw (mne.io.Raw): Recording to clean
+        modes (list): Cleaning modes
+        repeats (int): Runs per mode
+
+    Returns:
+        results (pd.DataFrame): One row per mode and repeat
+    """
+    events = np.array([[int(raw.info["sfreq"]) * 4, 0, 1]])
+    rows = []
+
+    for mode in modes:
+        for repeat in range(repeats):
+            block = raw.copy()
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            cleaner.clean(raw=block, mode=mode, events=events)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            rows.append(
+                {
+                    "mode": mode,
+                    "repeat": repeat,
+                    "time_s": round(elapsed, 3),
+                    "peak_memory_mb": round(peak / 2**20, 2),
+                    "input_mb": round(block.get_data().nbytes / 2**20, 2),
+                }
+            )
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--model", default="../RNN_model/models/b20-LRsch.keras")
+    parser.add_argument("--precision", default="float32")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--channels", nargs="+", default=["O1", "O2"])
+    parser.add_argument("--modes", nargs="+", default=["none", "asr", "ica", "bilstm"])
+    args = parser.parse_args()
+
+    mne.set_log_level("ERROR")
+    cleaner = Processing(
+        model_path=args.model, precision=args.precision, channels=args.channels
+    )
+    raw = synthetic_raw(args.duration)
+
+    print(benchmark(cleaner, raw, args.modes, args.repeats).to_string(index=False))
@@ -0,0 +1,164 @@
+import numpy as np
+
+from multiprocessing import shared_memory
+
+_HEADER = np.dtype(
+    [("written", "<i8"), ("capacity", "<i8"), ("n_channels", "<i8"), ("dtype", "S8")]
+)
+
+
+class RingBuffer:
+    """Fixed-capacity multi-channel sample ring buffer in shared memory
+
+    Every sample is stored twice, at `i % capacity` and `i % capacity + capacity`,
+    so any window of at most `capacity` samples is contiguous in time and can be
+    returned as a NumPy view without copying. Other processes attach by name and
+    read the same memory.
+    """
+
+    def __init__(
+        self,
+        n_channels: int = None,
+        capacity: int = None,
+        dtype: np.dtype = np.float64,
+        name: str = None,
+    ) -> None:
+        """Creates a new ring buffer, or attaches to an existing one if only `name` is given
+
+        Args:
+            n_channels (int): Number of channels
+            capacity (int): Number of samples kept per channel
+            dtype (np.dtype): Sample data type
+            name (str): Shared memory block name
+        """
+        create = n_channels is not None
+
+        if create:
+            dtype = np.dtype(dtype)
+            size = _HEADER.itemsize + n_channels * 2 * capacity * dtype.itemsize
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self._header = np.ndarray((), dtype=_HEADER, buffer=self._shm.buf)
+        if create:
+            self._header["written"] = 0
+            self._header["capacity"] = capacity
+            self._header["n_channels"] = n_channels
+            self._header["dtype"] = dtype.str.encode()
+
+        self.capacity = int(self._header["capacity"])
+        self.n_channels = int(self._header["n_channels"])
+        self.dtype = np.dtype(self._header["dtype"].item().decode())
+
+        self._data = np.ndarray(
+            (self.n_channels, 2 * self.capacity),
+            dtype=self.dtype,
+            buffer=self._shm.buf,
+            offset=_HEADER.itemsize,
+        )
+
+    @classmethod
+    def attach(cls, name: str) -> "RingBuffer":
+        """Attaches to a ring buffer created by another process
+
+        Args:
+            name (str): Shared memory block name
+
+        Returns:
+            buffer (RingBuffer): Buffer sharing memory with the creator
+        """
+        return cls(name=name)
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name used to attach from other processes"""
+        return self._shm.name
+
+    @property
+    def written(self) -> int:
+        """Total number of samples written, i.e. the sample index of the next sample"""
+        return int(self._header["written"])
+
+    @property
+    def first(self) -> int:
+        """Sample index of the oldest sample still available"""
+        return max(self.written - self.capacity, 0)
+
+    def __enter__(self) -> "RingBuffer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, chunk: np.ndarray) -> int:
+        """Appends samples, overwriting the oldest ones when full
+
+        Args:
+            chunk (np.ndarray): Samples with shape (n_channels, n_samples)
+
+        Returns:
+            written (int): Total number of samples written after this chunk
+        """
+        written = self.written
+        n_samples = chunk.shape[1]
+
+        if n_samples > self.capacity:
+            chunk = chunk[:, -self.capacity :]
+            written += n_samples - self.capacity
+            n_samples = self.capacity
+
+        start = written % self.capacity
+        first = min(n_samples, self.capacity - start)
+
+        for offset in (0, self.capacity):
+            self._data[:, offset + start : offset + start + first] = chunk[:, :first]
+            self._data[:, offset : offset + n_samples - first] = chunk[:, first:]
+
+        # Samples are in place before the index is published to readers
+        self._header["written"] = written + n_samples
+
+        return written + n_samples
+
+    def view(self, start: int, stop: int) -> np.ndarray:
+        """Returns a read-only zero-copy view of samples [start, stop)
+
+        Args:
+            start (int): First sample index
+            stop (int): Sample index after the last sample
+
+        Returns:
+            data (np.ndarray): Samples with shape (n_channels, stop - start)
+        """
+        if start < self.first or stop > self.written or start > stop:
+            raise IndexError(
+                f"Samples [{start}, {stop}) are outside the buffer [{self.first}, {self.written})"
+            )
+
+        offset = start % self.capacity
+        data = self._data[:, offset : offset + stop - start]
+        data.flags.writeable = False
+
+        return data
+
+    def latest(self, n_samples: int) -> np.ndarray:
+        """Returns a zero-copy view of the most recent samples
+
+        Args:
+            n_samples (int): Number of samples
+
+        Returns:
+            data (np.ndarray): Samples with shape (n_channels, n_samples)
+        """
+        written = self.written
+        return self.view(written - min(n_samples, written - self.first), written)
+
+    def close(self) -> None:
+        """Detaches from the shared memory block"""
+        self._header = None
+        self._data = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Frees the shared memory block, called once by the creating process"""
+        self._shm.unlink()
@@ -0,0 +1,153 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ArrayCache:
+    """Content-addressed cache for arrays computed from epoched data
+
+    Entries are kept in an in-memory LRU tier bounded by a byte budget and,
+    if a directory is given, written to an on-disk tier of `.npy` files that
+    are memory-mapped when read back.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, directory: str = None) -> None:
+        """Initializes array cache
+
+        Args:
+            max_bytes (int): Memory budget of the in-memory tier in bytes
+            directory (str): Folder of the on-disk tier, None keeps the cache in memory only
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*arrays: np.ndarray, **params) -> str:
+        """Hashes array contents together with the parameters that produced them
+
+        Args:
+            arrays (np.ndarray): Input arrays
+            params: Other inputs of the computation, e.g. band, metric, cleaning mode
+
+        Returns:
+            key (str): Hex digest identifying the computation
+        """
+        digest = hashlib.blake2b(digest_size=16)
+
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.data)
+
+        digest.update(repr(sorted(params.items())).encode())
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Returns the on-disk path of an entry"""
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key: str) -> np.ndarray:
+        """Looks an entry up in memory first, then on disk
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            value (np.ndarray): Cached array, read-only memory map for disk hits, None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self.directory is not None and os.path.exists(self._path(key)):
+                self.hits += 1
+                return np.load(self._path(key), mmap_mode="r")
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: np.ndarray) -> None:
+        """Stores an entry, evicting the least recently used ones over the memory budget
+
+        Args:
+            key (str): Entry key
+            value (np.ndarray): Array to cache, it must not be modified afterwards
+        """
+        value = np.asarray(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+
+            if value.nbytes <= self.max_bytes:
+                self._entries[key] = value
+                self._bytes += value.nbytes
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+        if self.directory is not None and not os.path.exists(self._path(key)):
+            # Written next to the target and renamed, so readers never see a partial file
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+            with os.fdopen(fd, "wb") as file:
+                np.save(file, value)
+            os.replace(temp, self._path(key))
+
+    def get_or_compute(self, key: str, compute) -> np.ndarray:
+        """Returns a cached entry, computing and storing it on a miss
+
+        Args:
+            key (str): Entry key
+            compute (callable): Computes the value without arguments
+
+        Returns:
+            value (np.ndarray): Cached or newly computed array
+        """
+        value = self.get(key)
+
+        if value is None:
+            value = compute()
+            self.put(key, value)
+
+        return value
+
+    def stats(self) -> dict:
+        """Returns hit and miss counters and memory use
+
+        Returns:
+            stats (dict): Hits, misses, hit rate, entries and bytes held in memory
+        """
+        total = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def clear(self) -> None:
+        """Empties the in-memory tier, the on-disk tier is kept"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
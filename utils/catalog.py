@@ -0,0 +1,419 @@
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import weakref
+
+from collections.abc import Mapping
+
+import mne
+import numpy as np
+
+INDEX = ".catalog.json"
+
+
+def _remove(path: str) -> None:
+    """Removes a memory-map file once the raw object using it is gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class RecordingCatalog:
+    """Index of recording files that only loads samples when a recording is used
+
+    Files are described from their headers (channels, sampling frequency,
+    duration and events) without reading samples, and descriptions are kept
+    in an index file next to the recordings that is reused for files whose
+    modification time and size did not change. Catalogs with different
+    patterns can share one index, each only adds and drops its own files.
+    Recordings are then loaded one at a time, with only the picked channels and
+    time range read into memory, or memory-mapped from disk, so peak memory
+    follows one recording instead of the whole study.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        pattern: str = "*.fif",
+        index_path: str = None,
+        memmap_dir: str = None,
+    ) -> None:
+        """Initializes recording catalog and indexes the matching files
+
+        Args:
+            directory (str): Folder holding the recordings
+            pattern (str): Glob pattern of recording files directly inside `directory`
+            index_path (str): Index file, None keeps it in `directory`
+            memmap_dir (str): Folder of memory-map files, None uses a temporary folder
+        """
+        self.directory = directory
+        self.pattern = pattern
+        self.index_path = (
+            os.path.join(directory, INDEX) if index_path is None else index_path
+        )
+        self.memmap_dir = memmap_dir
+
+        self.entries = self._read_index()
+        self._order: list[str] = []
+
+        self.scan()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getitem__(self, path: str) -> dict:
+        return self.entries[self._key(path)]
+
+    @property
+    def paths(self) -> list:
+        """Paths of the recordings matching the pattern, in the order `glob` lists them"""
+        return [os.path.join(self.directory, key) for key in self._order]
+
+    def _key(self, path: str) -> str:
+        """Returns the index key of a recording, its path relative to the catalog folder"""
+        return os.path.relpath(path, self.directory)
+
+    def _matches(self, key: str) -> bool:
+        """Checks whether an index key belongs to this catalog's pattern"""
+        return os.path.dirname(key) == "" and fnmatch.fnmatch(key, self.pattern)
+
+    def _read_index(self) -> dict:
+        """Reads the index file, empty if it does not exist yet"""
+        if not os.path.exists(self.index_path):
+            return {}
+
+        with open(self.index_path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def describe(path: str) -> dict:
+        """Reads the description of a recording from its header, without its samples
+
+        Args:
+            path (str): Recording file
+
+        Returns:
+            entry (dict): File stamp, channels, sampling frequency, duration and events
+        """
+        stat = os.stat(path)
+        raw = mne.io.read_raw(path, preload=False, verbose=False)
+
+        events, event_id = np.empty((0, 3), dtype=np.int64), {}
+        if len(raw.annotations):
+            events, event_id = mne.events_from_annotations(raw, verbose=False)
+
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "ch_names": raw.ch_names,
+            "sfreq": float(raw.info["sfreq"]),
+            "n_times": int(raw.n_times),
+            "first_samp": int(raw.first_samp),
+            "duration": raw.n_times / raw.info["sfreq"],
+            "event_id": {name: int(code) for name, code in event_id.items()},
+            "events": events.tolist(),
+        }
+        raw.close()
+
+        return entry
+
+    def scan(self) -> int:
+        """Indexes new and changed recordings and drops removed ones
+
+        Only files matching the pattern are considered, entries of other
+        patterns sharing the index are kept as they are.
+
+        Returns:
+            n_indexed (int): Number of recordings whose header had to be read
+        """
+        found = {
+            self._key(path): path
+            for path in glob.glob(os.path.join(self.directory, self.pattern))
+        }
+        removed = {key for key in self.entries if self._matches(key)} - set(found)
+        n_indexed = 0
+
+        for key in removed:
+            del self.entries[key]
+
+        for key, path in found.items():
+            stat = os.stat(path)
+            entry = self.entries.get(key)
+
+            if (
+                entry is None
+                or entry["mtime_ns"] != stat.st_mtime_ns
+                or entry["size"] != stat.st_size
+            ):
+                self.entries[key] = self.describe(path)
+                n_indexed += 1
+
+        self._order = list(found)
+
+        if n_indexed or removed or not os.path.exists(self.index_path):
+            self.save()
+
+        return n_indexed
+
+    def save(self) -> None:
+        """Writes this catalog's entries into the index
+
+        The index is read again first and only entries of this pattern are
+        replaced, so catalogs of other patterns that saved in the meantime keep
+        theirs. It is written next to its target and renamed, so readers never
+        see a partial file.
+        """
+        entries = {
+            key: entry
+            for key, entry in self._read_index().items()
+            if not self._matches(key)
+        }
+        entries.update(
+            {key: entry for key, entry in self.entries.items() if self._matches(key)}
+        )
+        self.entries = entries
+
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(temp, self.index_path)
+
+    def select(
+        self,
+        channels: list = None,
+        min_duration: float = None,
+        events: list = None,
+        pattern: str = None,
+    ) -> list:
+        """Returns the recordings matching every given condition
+
+        Args:
+            channels (list): Channels a recording must have
+            min_duration (float): Shortest accepted duration in seconds
+            events (list): Event descriptions a recording must have
+            pattern (str): Glob pattern the file name must match
+
+        Returns:
+            paths (list): Matching recording files
+        """
+        paths = []
+
+        for path in self.paths:
+            entry = self[path]
+
+            if channels is not None and not set(channels) <= set(entry["ch_names"]):
+                continue
+            if min_duration is not None and entry["duration"] < min_duration:
+                continue
+            if events is not None and not set(events) <= set(entry["event_id"]):
+                continue
+            if pattern is not None and not fnmatch.fnmatch(
+                os.path.basename(path), pattern
+            ):
+                continue
+
+            paths.append(path)
+
+        return paths
+
+    def events(self, path: str) -> tuple:
+        """Returns the indexed events of a recording
+
+        Args:
+            path (str): Recording file
+
+        Returns:
+            events (np.ndarray): Events with shape (n_events, 3), as `mne.events_from_annotations`
+            event_id (dict): Event descriptions and their codes
+        """
+        entry = self[path]
+        events = np.array(entry["events"], dtype=np.int64).reshape(-1, 3)
+
+        return events, dict(entry["event_id"])
+
+    def load(
+        self,
+        path: str,
+        picks: list = None,
+        tmin: float = 0.0,
+        tmax: float = None,
+        memmap: bool = False,
+    ) -> mne.io.Raw:
+        """Loads a recording, reading only the picked channels and time range
+
+        Args:
+            path (str): Recording file
+            picks (list): Channels to keep, None keeps all of them
+            tmin (float): Start of the loaded range in seconds
+            tmax (float): End of the loaded range in seconds, None loads to the end
+            memmap (bool): Back the samples with a memory-map file instead of RAM. The
+                file holds every channel, picking then copies only the picked ones
+
+        Returns:
+            raw (mne.io.Raw): Preloaded recording, ready for in-place filtering and resampling
+        """
+        if not memmap:
+            raw = mne.io.read_raw(path, preload=False, verbose=False)
+            if picks is not None:
+                raw.pick(picks)
+            return raw.crop(tmin=tmin, tmax=tmax).load_data(verbose=False)
+
+        directory = self.memmap_dir or tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=8)
+        fd, buffer = tempfile.mkstemp(
+            dir=directory, prefix=f"{name.hexdigest()}-", suffix=".dat"
+        )
+        os.close(fd)
+
+        raw = mne.io.read_raw(path, preload=buffer, verbose=False)
+        weakref.finalize(raw, _remove, buffer)
+
+        if picks is not None:
+            raw.pick(picks)
+
+        return raw.crop(tmin=tmin, tmax=tmax)
+
+    def iter_raws(self, paths: list = None, **kwargs):
+        """Loads recordings one after another
+
+        The previous recording is released before the next one is read, as long
+        as the caller does not keep a reference to it.
+
+        Args:
+            paths (list): Recording files, None uses every indexed one
+            kwargs: Arguments of `load`
+
+        Yields:
+            path (str): Recording file
+            raw (mne.io.Raw): Loaded recording
+        """
+        for path in self.paths if paths is None else paths:
+            yield path, self.load(path, **kwargs)
+
+    def n_segments(self, path: str, length: float) -> int:
+        """Returns the number of segments `segments` yields, from the indexed header
+
+        Args:
+            path (str): Recording file
+            length (float): Segment length in seconds
+
+        Returns:
+            n_segments (int): Number of whole segments in the recording
+        """
+        entry = self[path]
+
+        return int(np.floor((entry["n_times"] - 1) / entry["sfreq"] / length))
+
+    def segments(self, path: str, length: float, picks: list = None):
+        """Loads a recording in consecutive segments of a fixed length
+
+        Segments are cut from the lazily opened file and only one of them is
+        read into memory at a time. A trailing part shorter than `length` is
+        skipped.
+
+        Args:
+            path (str): Recording file
+            length (float): Segment length in seconds
+            picks (list): Channels to keep, None keeps all of them
+
+        Yields:
+            segment (mne.io.Raw): Loaded segment
+        """
+        raw = mne.io.read_raw(path, preload=False, verbose=False)
+        if picks is not None:
+            raw.pick(picks)
+
+        sfreq = raw.info["sfreq"]
+        n_segments = int(np.floor(raw.times[-1] / length))
+
+        for index in range(n_segments):
+            start = index * length
+            yield raw.copy().crop(
+                tmin=start, tmax=start + length - 1 / sfreq
+            ).load_data(verbose=False)
+
+    def recordings(self, paths: list = None, **kwargs) -> Mapping:
+        """Returns a mapping of recording files to recordings that loads each one on access
+
+        It can replace a dict of preloaded recordings, every access reads the
+        recording again, so only the ones in use are held in memory.
+
+        Args:
+            paths (list): Recording files, None uses every indexed one
+            kwargs: Arguments of `load`
+
+        Returns:
+            recordings (Mapping): Lazily loaded recordings keyed by file
+        """
+        paths = self.paths if paths is None else paths
+
+        return _LazyRecordings(self, {path: path for path in paths}, kwargs)
+
+    def database(self, recordings: dict, **kwargs) -> "CatalogDatabase":
+        """Serves recordings to `Synchronization` in place of the experiment database
+
+        Args:
+            recordings (dict): Recording file of every device name
+            kwargs: Arguments of `load`
+
+        Returns:
+            database (CatalogDatabase): Database that loads each device on access
+        """
+        return CatalogDatabase(self, recordings, **kwargs)
+
+
+class _LazyRecordings(Mapping):
+    """Device to recording mapping that loads a fresh raw on every access"""
+
+    def __init__(
+        self, catalog: RecordingCatalog, recordings: dict, kwargs: dict
+    ) -> None:
+        self._catalog = catalog
+        self._recordings = recordings
+        self._kwargs = kwargs
+
+    def __getitem__(self, device: str) -> mne.io.Raw:
+        return self._catalog.load(self._recordings[device], **self._kwargs)
+
+    def __iter__(self):
+        return iter(self._recordings)
+
+    def __len__(self) -> int:
+        return len(self._recordings)
+
+
+class CatalogDatabase:
+    """Offline stand-in for the experiment database, backed by a recording catalog
+
+    It implements the part of the database interface `Synchronization` uses,
+    and every device's recording is only read when it is requested.
+    """
+
+    def __init__(self, catalog: RecordingCatalog, recordings: dict, **kwargs) -> None:
+        """Initializes catalog database
+
+        Args:
+            catalog (RecordingCatalog): Catalog the recordings are indexed in
+            recordings (dict): Recording file of every device name
+            kwargs: Arguments of `RecordingCatalog.load`
+        """
+        self._catalog = catalog
+        self._recordings = dict(recordings)
+        self._kwargs = kwargs
+
+    def separate_marker_devices(self) -> dict:
+        """Returns the data devices, recordings hold their markers as annotations"""
+        return {"data": dict(self._recordings), "markers": {}}
+
+    def get_mne(self) -> Mapping:
+        """Returns the recordings of every device, each loaded when accessed"""
+        return _LazyRecordings(self._catalog, self._recordings, self._kwargs)
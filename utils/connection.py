@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class ConnectionManager:
+    """Connects devices to BrainAccess Board in the background with exponential backoff"""
+
+    def __init__(
+        self,
+        board_control,
+        logger: logging.Logger,
+        timeout: float = 30.0,
+        initial_delay: float = 0.1,
+        max_delay: float = 5.0,
+        command_lock: threading.Lock = None,
+    ) -> None:
+        """Initializes connection manager
+
+        Args:
+            board_control (BoardControl): Socket client used to send Board commands
+            logger (logging.Logger): The logger object for logging information, errors, etc.
+            timeout (float): Overall deadline in seconds for connecting all devices
+            initial_delay (float): Delay in seconds before the first retry
+            max_delay (float): Upper limit of the delay between retries
+            command_lock (threading.Lock): Lock held around every `board_control.command`
+                call, shared with other users of the same socket client
+        """
+        self._board_control = board_control
+        self._logger = logger
+        self._timeout = timeout
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+
+        self._command_lock = command_lock or threading.Lock()
+        self._state_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._status: dict[str, dict] = {}
+
+    def cancel(self) -> None:
+        """Stops all pending connection attempts"""
+        self._cancelled.set()
+
+    def status(self) -> dict:
+        """Returns the latest attempt of every device, for polling while connecting
+
+        Returns:
+            status (dict): Connection status, latency, attempts and last reply for each device
+        """
+        with self._state_lock:
+            return {name: dict(result) for name, result in self._status.items()}
+
+    def submit(self, commands: dict) -> Future:
+        """Starts connecting devices in the background
+
+        Args:
+            commands (dict): `connect_device` command for each device name
+
+        Returns:
+            future (Future): Resolves to the per-device results of `connect`
+        """
+        future = Future()
+
+        def target():
+            try:
+                future.set_result(self.connect(commands))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=target, name="device-connect", daemon=True).start()
+
+        return future
+
+    def connect(self, commands: dict) -> dict:
+        """Connects all devices concurrently and waits until each succeeds, fails or times out
+
+        Args:
+            commands (dict): `connect_device` command for each device name
+
+        Returns:
+            results (dict): Connection status, latency, attempts and last reply for each device
+        """
+        self._cancelled.clear()
+        with self._state_lock:
+            self._status.clear()
+        deadline = time.monotonic() + self._timeout
+
+        with ThreadPoolExecutor(max_workers=max(len(commands), 1)) as pool:
+            futures = {
+                name: pool.submit(self._connect, name, command, deadline)
+                for name, command in commands.items()
+            }
+
+        return {name: future.result() for name, future in futures.items()}
+
+    def _connect(self, name: str, command: dict, deadline: float) -> dict:
+        """Retries one device connection until it succeeds, the deadline passes or it is cancelled
+
+        Args:
+            name (str): Device name used for logging
+            command (dict): `connect_device` command for the device
+            deadline (float): `time.monotonic()` value after which no retry is made
+
+        Returns:
+            result (dict): Connection status, latency, attempts and last reply
+        """
+        start = time.monotonic()
+        delay = self._initial_delay
+        attempts = 0
+
+        while True:
+            attempts += 1
+            # One socket carries every request/reply pair, retry delays still overlap
+            with self._command_lock:
+                reply = self._board_control.command(command)
+
+            result = {
+                "connected": reply["command"] != "error",
+                "latency": time.monotonic() - start,
+                "attempts": attempts,
+                "reply": reply,
+            }
+            with self._state_lock:
+                self._status[name] = result
+
+            if result["connected"]:
+                self._logger.info(
+                    f"Connected {name} in {result['latency']:.2f} s after {attempts} attempts"
+                )
+                return result
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._cancelled.wait(min(delay, remaining)):
+                self._logger.error(
+                    f"Could not connect {name} after {attempts} attempts: {reply['message']}"
+                )
+                return result
+
+            delay = min(delay * 2, self._max_delay)
@@ -0,0 +1,141 @@
+import numpy as np
+import scipy.fft as sp_fft
+import scipy.signal as signal
+
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+
+def epoch_mask(
+    events: np.ndarray,
+    n_samples: int,
+    sfreq: float,
+    tmin: float,
+    tmax: float,
+    first_samp: int = 0,
+) -> np.ndarray:
+    """Returns which events have their whole epoch window inside the data
+
+    It is the window test `epoch_array` drops events with, so the events of
+    its epochs are `events[epoch_mask(...)]`.
+
+    Args:
+        events (np.ndarray): MNE events array, or a 1-D array of event sample indices
+        n_samples (int): Number of samples of the continuous data
+        sfreq (float): Sampling frequency
+        tmin (float): Start of each epoch relative to its event in seconds
+        tmax (float): End of each epoch relative to its event in seconds
+        first_samp (int): Sample index of the first sample of the data
+
+    Returns:
+        kept (np.ndarray): Boolean mask of the events that get an epoch
+    """
+    events = np.asarray(events)
+    samples = events[:, 0] if events.ndim == 2 else events
+
+    start = int(round(tmin * sfreq))
+    n_times = int(round(tmax * sfreq)) - start + 1
+    onsets = samples.astype(np.int64) - first_samp + start
+
+    return (onsets >= 0) & (onsets + n_times <= n_samples)
+
+
+def epoch_array(
+    data: np.ndarray,
+    events: np.ndarray,
+    sfreq: float,
+    tmin: float,
+    tmax: float,
+    first_samp: int = 0,
+    detrend: int = None,
+) -> np.ndarray:
+    """Cuts epochs around events directly from a (n_channels, n_samples) array
+
+    Windows follow `mne.Epochs`: samples from `round(tmin * sfreq)` to
+    `round(tmax * sfreq)` around each event, inclusive, and events whose window
+    does not fit in the data are dropped. If the events are evenly spaced the
+    result is a read-only strided view over `data`, otherwise the windows are
+    gathered into one new array.
+
+    Args:
+        data (np.ndarray): Continuous data with shape (n_channels, n_samples)
+        events (np.ndarray): MNE events array, or a 1-D array of event sample indices
+        sfreq (float): Sampling frequency
+        tmin (float): Start of each epoch relative to its event in seconds
+        tmax (float): End of each epoch relative to its event in seconds
+        first_samp (int): Sample index of the first column of `data`
+        detrend (int): 0 removes the mean, 1 removes a linear trend, None keeps data as is
+
+    Returns:
+        epochs (np.ndarray): Epoched data with shape (n_events, n_channels, n_times)
+    """
+    events = np.asarray(events)
+    samples = events[:, 0] if events.ndim == 2 else events
+
+    start = int(round(tmin * sfreq))
+    n_times = int(round(tmax * sfreq)) - start + 1
+
+    onsets = samples.astype(np.int64) - first_samp + start
+    onsets = onsets[epoch_mask(events, data.shape[-1], sfreq, tmin, tmax, first_samp)]
+    steps = np.diff(onsets)
+    owned = True
+
+    if len(onsets) == 0:
+        epochs = np.empty((0, data.shape[0], n_times), dtype=data.dtype)
+    elif np.all(steps == (steps[0] if len(steps) else 0)):
+        step = int(steps[0]) if len(steps) else 0
+        epochs = as_strided(
+            data[:, onsets[0] :],
+            shape=(len(onsets), data.shape[0], n_times),
+            strides=(step * data.strides[1], data.strides[0], data.strides[1]),
+            writeable=False,
+        )
+        owned = False
+    else:
+        windows = sliding_window_view(data, n_times, axis=-1)
+        epochs = np.moveaxis(windows[:, onsets], 0, 1)
+
+    if detrend is not None:
+        if not owned:
+            epochs = np.array(epochs)
+
+        epochs = signal.detrend(
+            epochs,
+            axis=-1,
+            type="linear" if detrend == 1 else "constant",
+            overwrite_data=True,
+        )
+
+    return epochs
+
+
+def analytic_signal(
+    data: np.ndarray, sfreq: float = None, band: tuple = None
+) -> np.ndarray:
+    """Computes the analytic signal along the last axis like `scipy.signal.hilbert`,
+    but keeps single precision input as complex64 instead of upcasting to complex128
+
+    With a frequency band, components outside of it are zeroed in the same FFT,
+    which band-passes the signal without another pass over the data.
+
+    Args:
+        data (np.ndarray): Real-valued data
+        sfreq (float): Sampling frequency, required with `band`
+        band (tuple): Frequency band as (low, high) in Hz, None keeps every frequency
+
+    Returns:
+        analytic (np.ndarray): Complex analytic signal
+    """
+    n_times = data.shape[-1]
+    h = np.zeros(n_times, dtype=data.real.dtype)
+    h[0] = 1
+    if n_times % 2 == 0:
+        h[n_times // 2] = 1
+        h[1 : n_times // 2] = 2
+    else:
+        h[1 : (n_times + 1) // 2] = 2
+
+    if band is not None:
+        freqs = np.abs(sp_fft.fftfreq(n_times, d=1 / sfreq))
+        h[(freqs < band[0]) | (freqs > band[1])] = 0
+
+    return sp_fft.ifft(sp_fft.fft(data, axis=-1) * h, axis=-1)
@@ -0,0 +1,150 @@
+import mne
+import numpy as np
+
+
+def _reference(raw: mne.io.Raw) -> float:
+    """Returns the time annotation onsets of `raw` are relative to, in seconds
+
+    Args:
+        raw (mne.io.Raw): Raw data holding annotations
+
+    Returns:
+        reference (float): POSIX time of the annotations' origin, 0 if they have none
+    """
+    orig_time = raw.annotations.orig_time
+
+    return 0.0 if orig_time is None else orig_time.timestamp()
+
+
+class EventIndex:
+    """Incremental index of the stimulus events of one device
+
+    Every update only ingests annotations newer than the last indexed one, so
+    the cost of event handling grows with the new events of a block instead of
+    with the whole session, and each event keeps the block and trial it
+    belongs to.
+    """
+
+    def __init__(self, event_id: dict, capacity: int = 256) -> None:
+        """Initializes event index
+
+        Args:
+            event_id (dict): Annotation descriptions to index and their event codes
+            capacity (int): Initial number of events the arrays can hold
+        """
+        self.event_id = dict(event_id)
+        self.size = 0
+
+        # Absolute onsets in seconds if annotations have an origin time, else relative ones
+        self.onsets = np.empty(capacity, dtype=np.float64)
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.blocks = np.empty(capacity, dtype=np.int32)
+        self.trials = np.empty(capacity, dtype=np.int32)
+
+    def _grow(self, size: int) -> None:
+        """Doubles array capacity until `size` events fit
+
+        Args:
+            size (int): Required number of events
+        """
+        capacity = len(self.onsets)
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+
+        for name in ("onsets", "codes", "blocks", "trials"):
+            array = getattr(self, name)
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[: self.size] = array[: self.size]
+            setattr(self, name, grown)
+
+    @property
+    def n_blocks(self) -> int:
+        """Returns the number of blocks indexed so far"""
+        return int(self.blocks[: self.size].max()) + 1 if self.size else 0
+
+    def update(self, raw: mne.io.Raw, block: int = None) -> int:
+        """Indexes the annotations added since the last update
+
+        Args:
+            raw (mne.io.Raw): Raw data holding the stimulus annotations
+            block (int): Block the new events belong to, None starts the next block
+
+        Returns:
+            n_new (int): Number of newly indexed events
+        """
+        annotations = raw.annotations
+        # Absolute onsets stay comparable when the recording's start moves between blocks
+        onsets = np.asarray(annotations.onset, dtype=np.float64) + _reference(raw)
+
+        # Annotations are kept sorted by onset, so the new ones are a suffix
+        start = 0
+        if self.size:
+            start = np.searchsorted(onsets, self.onsets[self.size - 1], side="right")
+
+        descriptions = np.asarray(annotations.description[start:])
+        keep = np.isin(descriptions, list(self.event_id))
+        n_new = int(keep.sum())
+
+        if n_new == 0:
+            return 0
+
+        block = self.n_blocks if block is None else block
+        previous = np.count_nonzero(self.blocks[: self.size] == block)
+
+        self._grow(self.size + n_new)
+        new = slice(self.size, self.size + n_new)
+
+        self.onsets[new] = onsets[start:][keep]
+        self.codes[new] = [self.event_id[name] for name in descriptions[keep]]
+        self.blocks[new] = block
+        self.trials[new] = np.arange(previous, previous + n_new)
+        self.size += n_new
+
+        return n_new
+
+    def select(self, block: int = None) -> np.ndarray:
+        """Returns the positions of the events of a block
+
+        Args:
+            block (int): Block number, None selects every block
+
+        Returns:
+            positions (np.ndarray): Indices into the index arrays
+        """
+        if block is None:
+            return np.arange(self.size)
+
+        return np.flatnonzero(self.blocks[: self.size] == block)
+
+    def events(self, raw: mne.io.Raw, block: int = None) -> np.ndarray:
+        """Builds an MNE events array for the sample grid of `raw`
+
+        Sample indices are computed as in `mne.events_from_annotations`, so the
+        same events line up with any crop or resampling of the recording.
+
+        Args:
+            raw (mne.io.Raw): Raw data the events are used with
+            block (int): Block number, None returns the events of every block
+
+        Returns:
+            events (np.ndarray): Events with shape (n_events, 3) and dtype int64
+        """
+        positions = self.select(block)
+        orig_time = raw.annotations.orig_time
+
+        samples = raw.time_as_index(
+            self.onsets[positions] - _reference(raw),
+            use_rounding=True,
+            origin=orig_time,
+        ).astype(np.int64)
+        if orig_time is not None:
+            samples += raw.first_samp
+
+        events = np.zeros((len(positions), 3), dtype=np.int64)
+        events[:, 0] = samples
+        events[:, 2] = self.codes[positions]
+
+        return events
@@ -0,0 +1,275 @@
+import logging
+import threading
+
+from datetime import datetime, timezone
+
+import mne
+import numpy as np
+
+from pylsl import (
+    StreamInlet,
+    resolve_byprop,
+    proc_clocksync,
+    cf_float32,
+    cf_double64,
+    cf_int8,
+    cf_int16,
+    cf_int32,
+    cf_int64,
+)
+
+from utils.buffers import RingBuffer
+from utils.alignment import ClockAligner
+
+# Pull buffers must match the stream's sample format, string streams are not supported
+_DTYPES = {
+    cf_float32: np.float32,
+    cf_double64: np.float64,
+    cf_int8: np.int8,
+    cf_int16: np.int16,
+    cf_int32: np.int32,
+    cf_int64: np.int64,
+}
+
+
+class LSLIngestion:
+    """Pulls device EEG and stimulus markers from LSL streams on a background thread
+
+    Any LSL outlet works as a source, including a `pylsl.StreamOutlet` created
+    locally, so the ingestion path can be exercised without a headset.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        devices: list = None,
+        marker_source: str = "sync-stimulus",
+        stream_type: str = "EEG",
+        capacity: float = 600.0,
+        max_chunk: int = 1024,
+        scale: float = 1e-6,
+        timeout: float = 5.0,
+        dtype: str = "float64",
+    ) -> None:
+        """Initializes LSL ingestion backend
+
+        Args:
+            logger (logging.Logger): The logger object for logging information, errors, etc.
+            devices (list): Device stream names, None subscribes to every stream of `stream_type`
+            marker_source (str): Source ID of the stimulation marker stream
+            stream_type (str): LSL stream type of the device streams
+            capacity (float): Seconds of data kept per device
+            max_chunk (int): Maximum number of samples pulled per chunk
+            scale (float): Factor converting stream units to volts
+            timeout (float): Seconds to wait while resolving streams
+            dtype (str): Data type of the sample buffers
+        """
+        self._logger = logger
+        self._device_names = devices
+        self._marker_source = marker_source
+        self._stream_type = stream_type
+        self._capacity = capacity
+        self._max_chunk = max_chunk
+        self._scale = scale
+        self._timeout = timeout
+        self._dtype = np.dtype(dtype)
+
+        self._inlets: dict[str, StreamInlet] = {}
+        self._chunks: dict[str, np.ndarray] = {}
+        self.buffers: dict[str, RingBuffer] = {}
+        self.timestamps: dict[str, RingBuffer] = {}
+        self.channels: dict[str, list] = {}
+        self.sfreq: dict[str, float] = {}
+
+        self._marker_inlet: StreamInlet = None
+        self.markers: list[tuple[float, str]] = []
+        self._markers_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    @property
+    def devices(self) -> list:
+        """Names of subscribed device streams"""
+        return list(self._inlets)
+
+    def start(self) -> None:
+        """Resolves streams, preallocates buffers and starts pulling data"""
+        if self._device_names is None:
+            streams = resolve_byprop("type", self._stream_type, timeout=self._timeout)
+        else:
+            streams = []
+            for device in self._device_names:
+                found = resolve_byprop("name", device, timeout=self._timeout)
+                if not found:
+                    self._logger.error(f"LSL stream {device} not found")
+                streams += found[:1]
+
+        for info in streams:
+            device = info.name()
+            if info.channel_format() not in _DTYPES:
+                self._logger.error(
+                    f"LSL stream {device} has unsupported channel format {info.channel_format()}"
+                )
+                continue
+
+            # Clock sync maps sender timestamps onto the local LSL clock
+            inlet = StreamInlet(
+                info, max_chunklen=self._max_chunk, processing_flags=proc_clocksync
+            )
+            info = inlet.info()
+
+            self._inlets[device] = inlet
+            self.sfreq[device] = info.nominal_srate()
+            self.channels[device] = self._channel_names(info)
+
+            dtype = _DTYPES[info.channel_format()]
+            capacity = int(self._capacity * self.sfreq[device])
+            self._chunks[device] = np.empty(
+                (self._max_chunk, info.channel_count()), dtype
+            )
+            self.buffers[device] = RingBuffer(
+                info.channel_count(), capacity, self._dtype
+            )
+            self.timestamps[device] = RingBuffer(1, capacity, np.float64)
+
+        markers = resolve_byprop(
+            "source_id", self._marker_source, timeout=self._timeout
+        )
+        if markers:
+            self._marker_inlet = StreamInlet(
+                markers[0], processing_flags=proc_clocksync
+            )
+        else:
+            self._logger.error(f"LSL marker stream {self._marker_source} not found")
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._pull, name="lsl-ingestion", daemon=True
+        )
+        self._thread.start()
+        self._logger.info(f"Started LSL ingestion for {self.devices}")
+
+    def stop(self) -> None:
+        """Stops pulling data and frees shared buffers"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        for buffer in [*self.buffers.values(), *self.timestamps.values()]:
+            buffer.close()
+            buffer.unlink()
+
+    def _channel_names(self, info) -> list:
+        """Reads channel labels from the stream description"""
+        names = []
+        channel = info.desc().child("channels").child("channel")
+
+        for index in range(info.channel_count()):
+            names.append(channel.child_value("label") or f"ch{index}")
+            channel = channel.next_sibling()
+
+        return names
+
+    def _pull(self) -> None:
+        """Pulls available chunks into the device and marker buffers until stopped"""
+        while not self._stop.is_set():
+            pulled = 0
+
+            for device, inlet in self._inlets.items():
+                chunk = self._chunks[device]
+                _, timestamps = inlet.pull_chunk(
+                    timeout=0.0, max_samples=self._max_chunk, dest_obj=chunk
+                )
+                n_samples = len(timestamps)
+
+                if n_samples:
+                    self.buffers[device].write(chunk[:n_samples].T * self._scale)
+                    self.timestamps[device].write(np.asarray(timestamps)[np.newaxis])
+                    pulled += n_samples
+
+            if self._marker_inlet is not None:
+                samples, timestamps = self._marker_inlet.pull_chunk(timeout=0.0)
+                if timestamps:
+                    with self._markers_lock:
+                        self.markers += [
+                            (timestamp, sample[0])
+                            for sample, timestamp in zip(samples, timestamps)
+                        ]
+                    pulled += len(timestamps)
+
+            if not pulled:
+                self._stop.wait(0.005)
+
+    def span(self, device: str) -> tuple:
+        """Returns the sample range held in both the data and the timestamp buffer
+
+        Args:
+            device (str): Device stream name
+
+        Returns:
+            start, stop (int): Sample index range [start, stop)
+        """
+        buffer, times = self.buffers[device], self.timestamps[device]
+
+        return max(buffer.first, times.first), min(buffer.written, times.written)
+
+    def to_raw(
+        self,
+        device: str,
+        times: np.ndarray = None,
+        aligner: ClockAligner = None,
+        span: tuple = None,
+    ) -> mne.io.RawArray:
+        """Builds raw MNE data with stimulus annotations from the buffered samples
+
+        Args:
+            device (str): Device stream name
+            times (np.ndarray): Shared timeline to resample onto, see `ClockAligner.timeline`
+            aligner (ClockAligner): Clock fits used to resample onto `times`
+            span (tuple): Sample range to use, see `span`, None uses everything buffered
+
+        Returns:
+            raw (mne.io.RawArray): Buffered device data
+        """
+        start, stop = self.span(device) if span is None else span
+        data = self.buffers[device].view(start, stop)
+        sfreq = self.sfreq[device]
+
+        if aligner is not None and times is not None:
+            data = aligner.resample(device, data, start, times)
+            timestamps, sfreq = times, aligner.sfreq
+        else:
+            timestamps = self.timestamps[device].view(start, stop)[0]
+            # MNE filters and resamples in place, so it gets its own copy of the shared samples
+            data = np.array(data)
+
+        info = mne.create_info(
+            ch_names=self.channels[device], sfreq=sfreq, ch_types="eeg"
+        )
+        raw = mne.io.RawArray(data, info, verbose=False)
+
+        with self._markers_lock:
+            markers = [
+                (timestamp, msg)
+                for timestamp, msg in self.markers
+                if len(timestamps) and timestamp >= timestamps[0]
+            ]
+
+        if markers:
+            # The LSL clock of the first sample is the measurement date, so annotation
+            # times stay comparable between blocks while the buffer wraps around
+            reference = datetime.fromtimestamp(timestamps[0], tz=timezone.utc)
+            raw.set_meas_date(reference)
+
+            onsets = np.array([timestamp for timestamp, _ in markers]) - timestamps[0]
+            raw.set_annotations(
+                mne.Annotations(
+                    onset=onsets,
+                    duration=np.zeros(len(markers)),
+                    description=[msg for _, msg in markers],
+                    orig_time=reference,
+                )
+            )
+
+        return raw
@@ -2,22 +2,198 @@ import mne
 from mne.preprocessing import ICA
 import asrpy
 
+import os
+import threading
+
 import tensorflow as tf
 import numpy as np
 
+CHANNELS = ["O1", "O2", "Fp1", "Fp2"]
+EOG_CHANNELS = ["Fp1", "Fp2"]
+
+_models: dict[str, tf.keras.Model] = {}
+_models_lock = threading.Lock()
+
+
+class TFLiteModel:
+    """Runs a converted .tflite model behind the `predict` interface of a Keras model"""
+
+    def __init__(
+        self, path: str, num_threads: int = None, batch_size: int = 256
+    ) -> None:
+        """Initializes TFLite interpreter
+
+        The input tensor is sized once to `batch_size` segments, every
+        invocation uses that shape and the last batch is zero-padded, so the
+        interpreter never reallocates its tensors.
+
+        Args:
+            path (str): path to the .tflite model
+            num_threads (int): interpreter threads, None uses every CPU core
+            batch_size (int): segments per invocation
+        """
+        self._interpreter = tf.lite.Interpreter(
+            model_path=path, num_threads=num_threads or os.cpu_count()
+        )
+        self._input = self._interpreter.get_input_details()[0]
+        self.batch_size = batch_size
+
+        self._interpreter.resize_tensor_input(
+            self._input["index"], [batch_size, *self._input["shape_signature"][1:]]
+        )
+        self._interpreter.allocate_tensors()
+        self._output = self._interpreter.get_output_details()[0]
+
+        self._batch = np.zeros(
+            (batch_size, *self._input["shape_signature"][1:]), dtype=np.float32
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def input_shape(self) -> tuple:
+        """Model input shape with None as the batch dimension"""
+        return (None, *self._input["shape_signature"][1:])
+
+    def predict(
+        self, x: np.ndarray, batch_size: int = None, verbose: int = 0
+    ) -> np.ndarray:
+        """Denoises segments in batched interpreter invocations
+
+        Args:
+            x (np.ndarray): segments with shape (n_segments, n_samples, 1)
+            batch_size (int): unused, the batch size is fixed when the model is loaded
+            verbose (int): unused, kept for compatibility with `tf.keras.Model.predict`
+
+        Returns:
+            y (np.ndarray): denoised segments with shape (n_segments, n_samples)
+        """
+        output = np.empty(
+            (len(x), *self._output["shape"][1:]), dtype=self._output["dtype"]
+        )
+
+        with self._lock:
+            for start in range(0, len(x), self.batch_size):
+                stop = min(start + self.batch_size, len(x))
+                self._batch[: stop - start] = x[start:stop]
+                self._batch[stop - start :] = 0
+
+                self._interpreter.set_tensor(self._input["index"], self._batch)
+                self._interpreter.invoke()
+                output[start:stop] = self._interpreter.get_tensor(
+                    self._output["index"]
+                )[: stop - start]
+
+        return output
+
+
+def load_model(path: str, num_threads: int = None) -> tf.keras.Model:
+    """Loads a trained model once and reuses it for every following block
+
+    Args:
+        path (str): path to the saved .keras model, or a .tflite model exported
+            with `RNN_model/export_tflite.py`
+        num_threads (int): interpreter threads of .tflite models
+
+    Returns:
+        model (tf.keras.Model): loaded recurrent neural network model
+    """
+    path = os.path.abspath(path)
+
+    with _models_lock:
+        if path not in _models:
+            if path.endswith(".tflite"):
+                _models[path] = TFLiteModel(path, num_threads=num_threads)
+            else:
+                _models[path] = tf.keras.models.load_model(path)
+
+        return _models[path]
+
 
 class Processing:
     """Data processing model that cleans noisy EEG signal"""
 
-    def __init__(self):
-        """Initializes Processing class object"""
-        return
+    def __init__(
+        self,
+        model_path: str = None,
+        precision: str = None,
+        channels: list = None,
+        num_threads: int = None,
+    ):
+        """Initializes Processing class object
+
+        Args:
+            model_path (str): path to the BiLSTM model used in "bilstm" mode, None uses
+                `MODEL_PATH` from the experiment config
+            precision (str): "float32" or "float64" working precision of the BiLSTM path,
+                None uses `PRECISION` from the experiment config
+            channels (list): channels used downstream, None keeps all of `CHANNELS`
+            num_threads (int): inference threads of .tflite models, None uses every CPU core
+        """
+        if model_path is None:
+            # Imported on demand, the config module opens the session dialog on import
+            from config import MODEL_PATH as model_path
+        if precision is None:
+            from config import PRECISION as precision
+
+        self.model_path = model_path
+        self.channels = CHANNELS if channels is None else list(channels)
+        self.dtype = np.dtype(precision)
+        self.num_threads = num_threads
+        self._scratch: dict[str, np.ndarray] = {}
+
+    def _buffer(self, name: str, shape: tuple) -> np.ndarray:
+        """Returns a scratch array that is reused across blocks and only grows when needed
+
+        Args:
+            name (str): scratch buffer name
+            shape (tuple): requested array shape
+
+        Returns:
+            buffer (np.ndarray): uninitialized array view with the requested shape
+        """
+        size = int(np.prod(shape))
+        buffer = self._scratch.get(name)
+
+        if buffer is None or buffer.size < size or buffer.dtype != self.dtype:
+            buffer = self._scratch[name] = np.empty(size, dtype=self.dtype)
+
+        return buffer[:size].reshape(shape)
+
+    def plan(self, mode: str) -> list:
+        """Returns the channels a cleaning mode has to keep
+
+        Only the downstream channels are cleaned, EOG reference channels are kept
+        for ICA, which uses them to find ocular components, and ASR keeps every
+        channel because it reconstructs artifacts from the channel covariance.
+
+        Args:
+            mode (str): cleaning mode
+
+        Returns:
+            channels (list): channels to keep, in `CHANNELS` order
+        """
+        needed = set(self.channels)
+
+        if mode.lower() == "ica":
+            needed |= set(EOG_CHANNELS)
+        elif mode.lower() == "asr":
+            needed |= set(CHANNELS)
+
+        return [channel for channel in CHANNELS if channel in needed] + [
+            channel for channel in self.channels if channel not in CHANNELS
+        ]
 
     def clean(
         self, raw: mne.io.Raw, mode: str = None, events: np.array = None
     ) -> mne.io.Raw:
         """Starts cleaning method based on mode configuration. If None, raw noisy data is returned
 
+        The cleaner takes ownership of `raw`: the channels planned for the mode
+        (see `plan`) are picked and the band-pass filter is applied in place, and
+        the caller keeps using the filtered raw. At most one further copy is made
+        per block (ICA), ASR and BiLSTM read the filtered raw directly and BiLSTM
+        reuses scratch buffers across blocks.
+
         Args:
             raw (mne.io.Raw): raw noisy EEG data
             mode (str): cleaning mode
@@ -27,10 +203,12 @@ class Processing:
             self.reconstructed (mne.io.Raw): reconstructed, clean EEG signal
         """
 
+        picks = self.plan(mode)
+
         try:
-            self.raw = raw.pick(["O1", "O2", "Fp1", "Fp2"])
+            self.raw = raw.pick(picks)
         except ValueError:
-            raise Exception("Channels 'O1', 'O2', 'Fp1', and 'Fp2' are expected.")
+            raise Exception(f"Channels {', '.join(picks)} are expected.")
 
         self.raw.filter(1, 40, fir_design="firwin")
         # self.raw.resample(256)
@@ -40,7 +218,7 @@ class Processing:
         elif mode.lower() == "asr":
             self.ASR()
         elif mode.lower() == "bilstm":
-            model = tf.keras.models.load_model("../RNN_model/models/b20-LRsch.keras")
+            model = load_model(self.model_path, num_threads=self.num_threads)
             self.BiLSTM(model=model, events=events)
         else:
             return self.raw
@@ -49,6 +227,7 @@ class Processing:
 
     def ICA(self) -> None:
         """Uses independent component analysis (ICA) for artifact removal"""
+        # The single working copy of the block, ICA is applied to it in place
         self.reconstructed = self.raw.copy()
 
         ica = ICA(
@@ -60,7 +239,7 @@ class Processing:
 
         eog_indices, _ = ica.find_bads_eog(
             self.reconstructed,
-            ch_name=["Fp1", "Fp2"],
+            ch_name=EOG_CHANNELS,
             threshold=0.7,
             measure="correlation",
         )
@@ -72,11 +251,10 @@ class Processing:
     def ASR(self) -> None:
         """Uses artifact subspace reconstruction (ASR) for artifact removal"""
 
-        processed_raw = self.raw.copy()
-
-        asr = asrpy.ASR(sfreq=processed_raw.info["sfreq"], cutoff=15)
-        asr.fit(processed_raw)
-        self.reconstructed = asr.transform(processed_raw)
+        # ASR does not modify its input, so it runs on the filtered raw without a copy
+        asr = asrpy.ASR(sfreq=self.raw.info["sfreq"], cutoff=15)
+        asr.fit(self.raw)
+        self.reconstructed = asr.transform(self.raw)
 
         return
 
@@ -84,7 +262,7 @@ class Processing:
         """Uses Bidirectional LSTM (BiLSTM) recurrent neural network for artifact removal
 
         Args:
-            model (tf.keras.Model): trained recurrent neural network model
+            model (tf.keras.Model): trained recurrent neural network model, or a `TFLiteModel`
         """
 
         tmin = events[0][0] / self.raw.info["sfreq"]
@@ -93,59 +271,53 @@ class Processing:
         if len(events) > 1:
             tmax = events[-1][0] / self.raw.info["sfreq"]
 
-        processed_raw = self.raw.copy()
-        data = processed_raw.get_data()
+        # get_data returns a new array, so the raw itself is never copied here
+        data = self.raw.get_data()
+        n_channels, n_samples = data.shape
+
+        t = 2
+        samples_per_segment = t * int(self.raw.info["sfreq"])
+        n_segments = n_samples // samples_per_segment
+        n_used = n_segments * samples_per_segment
 
         # Process input data
-        std_devs = np.std(data, axis=1, keepdims=True)
-        data_standardized = data / std_devs
+        std_devs = np.std(data, axis=1, keepdims=True).astype(self.dtype)
+        data_standardized = self._buffer(
+            "standardized", (n_channels, n_segments, samples_per_segment)
+        )
+        np.divide(
+            data[:, :n_used],
+            std_devs,
+            out=data_standardized.reshape(n_channels, n_used),
+            casting="same_kind",
+        )
+        del data
 
-        t = 2
-        samples_per_segment = t * int(processed_raw.info["sfreq"])
-        n_channels = data_standardized.shape[0]
-
-        segments = []
-        for channel in range(n_channels):
-            channel_data = data_standardized[channel, :]
-            n_segments = channel_data.shape[0] // samples_per_segment
-            for segment in range(n_segments):
-                start = segment * samples_per_segment
-                end = start + samples_per_segment
-                if end <= channel_data.shape[0]:
-                    segments.append(
-                        channel_data[start:end].reshape(samples_per_segment, 1)
-                    )
-        segments = np.array(segments)
-
-        # Denoise data
-        denoised_data = []
-        for segment in segments:
-            prediction = model.predict(
-                segment[np.newaxis, :, :]
-            )  # Model predicts on one segment at a time (2s EEG input)
-            denoised_data.append(prediction.squeeze())
-        denoised_data = np.array(denoised_data)
-
-        # Initialize the denoised array with the correct shape
-        denoised_full = np.zeros(data.shape)
-        for channel in range(n_channels):
-            channel_std_dev = std_devs[channel]
-            n_segments = data[channel, :].shape[0] // samples_per_segment
-            for segment in range(n_segments):
-                start = segment * samples_per_segment
-                end = start + samples_per_segment
-                if end <= data[channel, :].shape[0]:
-                    denoised_full[channel, start:end] = (
-                        denoised_data[segment * n_channels + channel] * channel_std_dev
-                    )
+        # Channel-major segments, (n_channels * n_segments, samples_per_segment, 1)
+        segments = data_standardized.reshape(-1, samples_per_segment, 1)
+
+        # Denoise data, all 2s segments in one batched call
+        denoised_data = model.predict(segments, batch_size=256, verbose=0)
+
+        denoised_full = self._buffer("denoised", (n_channels, n_samples))
+        np.multiply(
+            denoised_data.reshape(n_channels, n_used),
+            std_devs,
+            out=denoised_full[:, :n_used],
+            casting="same_kind",
+        )
+        denoised_full[:, n_used:] = 0
 
         info = mne.create_info(
-            ch_names=processed_raw.info["ch_names"],
-            sfreq=processed_raw.info["sfreq"],
+            ch_names=self.raw.info["ch_names"],
+            sfreq=self.raw.info["sfreq"],
             ch_types="eeg",
         )
 
-        # Reconstruct signal to RAW
-        self.reconstructed = mne.io.RawArray(denoised_full, info)
+        # Reconstruct signal to RAW, MNE stores raw data as float64. The cast is
+        # also the copy that lets the scratch buffer be reused in the next block
+        self.reconstructed = mne.io.RawArray(
+            denoised_full.astype(np.float64), info, verbose=False
+        )
 
         return
@@ -15,13 +15,43 @@ from psychopy.constants import (
 )
 
 import os
+import atexit
 
 import psychopy.iohub as io
 from psychopy.hardware import keyboard
 
-from config import expName, FLICKER_FREQ, N_TRIALS, N_BLOCKS, TMAX
+from config import (
+    expName,
+    FLICKER_FREQ,
+    FLICKER_WAVEFORM,
+    N_TRIALS,
+    N_BLOCKS,
+    TMAX,
+    SAMPLING_FREQ,
+    RESAMPLE_FREQ,
+    CHANNELS_LIST,
+    MODEL_PATH,
+    INGESTION_BACKEND,
+    PRECISION,
+    LATENCY_BUDGET,
+    MODE_PREFERENCE,
+    CACHE,
+    ALIGN_CLOCKS,
+    STREAMING,
+    ARCHIVE,
+    COMMAND,
+    PROCESSING_MODE,
+)
 from utils.synchronization import Synchronization
 from utils.processing import Processing
+from utils.warmup import Warmup
+from utils.ingestion import LSLIngestion
+from utils.scheduler import ModeScheduler
+from utils.cache import ArrayCache
+from utils.alignment import ClockAligner
+from utils.streaming import StreamingDenoiser
+from utils.archive import SessionArchive
+from utils.timing import FrameTimer, flicker_schedule
 from model import Model
 
 result = -1
@@ -150,6 +180,35 @@ def run(
 
     os.chdir(_thisDir)
 
+    warmup = Warmup(
+        logger=model.logger,
+        model_path=MODEL_PATH,
+        sfreqs=[SAMPLING_FREQ, RESAMPLE_FREQ],
+        n_channels=len(CHANNELS_LIST),
+        n_trials=N_TRIALS,
+    )
+    warmup.start()
+
+    ingestion = None
+    if INGESTION_BACKEND == "lsl":
+        ingestion = LSLIngestion(logger=model.logger, dtype=PRECISION)
+        ingestion.start()
+        atexit.register(ingestion.stop)
+
+    denoiser = None
+    if ingestion is not None and STREAMING is not None and PROCESSING_MODE == "bilstm":
+        denoiser = StreamingDenoiser(
+            ingestion,
+            model_path=MODEL_PATH,
+            channels=CHANNELS_LIST,
+            logger=model.logger,
+            sfreq=RESAMPLE_FREQ,
+            dtype=PRECISION,
+            **STREAMING,
+        )
+        denoiser.start()
+        atexit.register(denoiser.stop)
+
     frameTolerance = 0.001
     endExpNow = False
 
@@ -343,6 +402,32 @@ def run(
         name="blocks",
     )
     thisExp.addLoop(blocks)
+    cleaner = Processing(
+        model_path=MODEL_PATH, precision=PRECISION, channels=CHANNELS_LIST
+    )
+    scheduler = None
+    if LATENCY_BUDGET is not None:
+        scheduler = ModeScheduler(budget=LATENCY_BUDGET, modes=MODE_PREFERENCE)
+    cache = None if CACHE is None else ArrayCache(**CACHE)
+    event_index = {}
+    archive = None
+    if ARCHIVE is not None:
+        archive = SessionArchive(
+            f"{thisExp.dataFileName}_archive",
+            metadata={"command": COMMAND, "exp_info": expInfo},
+            **ARCHIVE,
+        )
+    aligner = None
+    if ingestion is not None and ALIGN_CLOCKS:
+        aligner = ClockAligner(sfreq=SAMPLING_FREQ)
+    frame_rate = expInfo["frameRate"]
+    frame_timer = FrameTimer(frame_rate=frame_rate, max_duration=10.0)
+    flicker, flicker_visible = flicker_schedule(
+        frame_rate=frame_rate,
+        flicker_freq=FLICKER_FREQ,
+        duration=TMAX,
+        waveform=FLICKER_WAVEFORM,
+    )
     thisBlock = blocks.trialList[0]
     if thisBlock != None:
         for paramName in thisBlock:
@@ -383,13 +468,7 @@ def run(
                 if hasattr(thisComponent, "status"):
                     thisComponent.status = NOT_STARTED
 
-            frame_rate = round(expInfo["frameRate"])
-            flicker_freq = FLICKER_FREQ
-            frames_per_cycle = frame_rate // flicker_freq
-            visible_frames = frames_per_cycle // 2
-
-            flicker_frame_count = 0
-            is_visible = False
+            frame_timer.reset()
 
             routineForceEnded = not continueRoutine
             # --- Run Routine "trial" ---
@@ -402,24 +481,24 @@ def run(
 
                     stimuli.tStartRefresh = tThisFlipGlobal
                     stimuli.status = STARTED
-                    flicker_frame_count = 0
-                    model.annotate("target")
+                    model.annotate_on_flip(win, "target")
 
+                stimulus_frame = -1
                 if stimuli.status == STARTED:
-                    new_visibility = flicker_frame_count < visible_frames
-                    if new_visibility != is_visible:
-                        is_visible = new_visibility
-
-                    if is_visible:
+                    frame = min(
+                        round((tThisFlipGlobal - stimuli.tStartRefresh) * frame_rate),
+                        len(flicker) - 1,
+                    )
+                    stimuli.opacity = flicker[frame]
+                    if flicker[frame] > 0:
                         stimuli.draw()
+                    stimulus_frame = int(flicker_visible[frame])
 
                     if tThisFlipGlobal > stimuli.tStartRefresh + TMAX - frameTolerance:
                         stimuli.status = FINISHED
                         stimuli.setAutoDraw(False)
 
-                    flicker_frame_count = (flicker_frame_count + 1) % frames_per_cycle
-
-                win.flip()
+                frame_timer.record(win.flip(), stimulus_frame)
 
                 if (
                     target_notice.status == NOT_STARTED
@@ -469,14 +548,17 @@ def run(
                         continueRoutine = True
                         break
 
-                if continueRoutine:
-                    win.flip()
-
             # --- Ending Routine "trial" ---
             for thisComponent in trialComponents:
                 if hasattr(thisComponent, "setAutoDraw"):
                     thisComponent.setAutoDraw(False)
 
+            frame_stats = frame_timer.stats(flicker_freq=FLICKER_FREQ)
+            model.logger.info(f"Trial frame timing: {frame_stats}")
+            for key, value in frame_stats.items():
+                thisExp.addData(key, value)
+            thisExp.nextEntry()
+
             if routineForceEnded:
                 routineTimer.reset()
             else:
@@ -503,11 +585,22 @@ def run(
 
         sync_values = []
 
-        cleaner = Processing()
+        warmup.wait()
 
         db = model.get_db()
         compute = Synchronization(
-            database=db, model=model, cleaner=cleaner, sync_list=sync_values
+            database=db,
+            model=model,
+            cleaner=cleaner,
+            sync_list=sync_values,
+            ingestion=ingestion,
+            scheduler=scheduler,
+            cache=cache,
+            events=event_index,
+            block=blocks.thisN,
+            aligner=aligner,
+            denoiser=denoiser,
+            archive=archive,
         )
         updated_res = compute.sync_results()
 
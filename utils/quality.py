@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class QualityGate:
+    """Vectorized per-epoch signal quality checks run before cleaning"""
+
+    def __init__(
+        self,
+        ptp_max: float = 200e-6,
+        flat_std: float = 0.5e-6,
+        var_max: float = 1e-8,
+        line_freq: float = 50.0,
+        line_ratio_max: float = 0.5,
+        min_epochs: int = 2,
+    ) -> None:
+        """Initializes quality gate thresholds, amplitudes are in volts
+
+        Args:
+            ptp_max (float): Largest accepted peak-to-peak amplitude per channel
+            flat_std (float): Standard deviation below which a channel counts as flat
+            var_max (float): Largest accepted variance per channel
+            line_freq (float): Power line frequency in Hz
+            line_ratio_max (float): Largest accepted share of power within 1 Hz of the line frequency
+            min_epochs (int): Fewest good epochs for a device to be used at all
+        """
+        self.ptp_max = ptp_max
+        self.flat_std = flat_std
+        self.var_max = var_max
+        self.line_freq = line_freq
+        self.line_ratio_max = line_ratio_max
+        self.min_epochs = min_epochs
+
+    def assess(self, epochs: np.ndarray, sfreq: float) -> dict:
+        """Computes quality metrics and gating decisions for every epoch
+
+        Args:
+            epochs (np.ndarray): Detrended epochs with shape (n_events, n_channels, n_times)
+            sfreq (float): Sampling frequency
+
+        Returns:
+            report (dict): Per-epoch and per-channel metrics, failed checks, the good
+                epoch mask and whether the device is usable
+        """
+        ptp = np.ptp(epochs, axis=-1)
+        variance = np.var(epochs, axis=-1)
+
+        power = np.abs(np.fft.rfft(epochs, axis=-1)) ** 2
+        freqs = np.fft.rfftfreq(epochs.shape[-1], d=1 / sfreq)
+        line = np.abs(freqs - self.line_freq) <= 1
+        total = power[..., 1:].sum(axis=-1)
+        line_ratio = power[..., line].sum(axis=-1) / np.where(total > 0, total, 1)
+
+        checks = {
+            "ptp": ptp > self.ptp_max,
+            "flat": variance < self.flat_std**2,
+            "variance": variance > self.var_max,
+            "line_noise": line_ratio > self.line_ratio_max,
+        }
+
+        bad = np.any(list(checks.values()), axis=0).any(axis=-1)
+        good = ~bad
+
+        return {
+            "ptp": ptp,
+            "variance": variance,
+            "line_ratio": line_ratio,
+            "failed": {name: check.any(axis=-1) for name, check in checks.items()},
+            "good": good,
+            "usable": int(good.sum()) >= self.min_epochs,
+        }
+
+    @staticmethod
+    def summary(report: dict) -> str:
+        """Formats the number of epochs failing each check
+
+        Args:
+            report (dict): Report returned by `assess`
+
+        Returns:
+            summary (str): e.g. "ptp=1,flat=0,variance=1,line_noise=0"
+        """
+        return ",".join(
+            f"{name}={int(failed.sum())}" for name, failed in report["failed"].items()
+        )
@@ -0,0 +1,172 @@
+import os
+import glob
+import tempfile
+import time
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    PARQUET = True
+except ImportError:
+    PARQUET = False
+
+RESULT_COLUMNS = {
+    "date": str,
+    "stimulus_frequency": float,
+    "trial_length": float,
+    "n_trials_per_block": int,
+    "n_blocks": int,
+    "channels": str,
+    "sampling_frequency": int,
+    "freq_low": float,
+    "freq_high": float,
+    "subject_1": str,
+    "subject_2": str,
+    "cleaning_mode": str,
+    "cleaning_mode_1": str,
+    "cleaning_mode_2": str,
+    "processing_time": float,
+    "latency_budget": float,
+    "parameter": str,
+    "synchronization_value": float,
+    "p_value": float,
+    "null_median": float,
+    "null_95": float,
+    "n_epochs": int,
+    "n_epochs_rejected": int,
+    "quality_flags": str,
+}
+
+
+class ResultsWriter:
+    """Buffers synchronization results in typed columns and writes them in batches"""
+
+    def __init__(
+        self,
+        path: str,
+        columns: dict = RESULT_COLUMNS,
+        batch_size: int = 64,
+        on_flush: Callable = None,
+    ) -> None:
+        """Initializes results writer
+
+        Every flush writes one new part file into `path`, so appending never
+        rewrites or re-parses earlier results.
+
+        Args:
+            path (str): Directory holding the result part files
+            columns (dict): Column names and their Python types
+            batch_size (int): Number of buffered records that triggers a flush
+            on_flush (Callable): Called with the DataFrame of every written batch
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._on_flush = on_flush
+        self._types = dict(columns)
+        self._columns: dict[str, list] = {name: [] for name in self._types}
+        self._extension = "parquet" if PARQUET else "csv"
+
+    def __len__(self) -> int:
+        """Returns number of buffered records"""
+        return len(next(iter(self._columns.values()), []))
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def append(self, **record) -> None:
+        """Buffers one result record, flushing when the batch is full
+
+        Args:
+            **record: Value for each column, missing columns are stored as empty
+        """
+        unknown = set(record) - set(self._types)
+        if unknown:
+            raise KeyError(f"Unknown result columns: {sorted(unknown)}")
+
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+
+        if len(self) >= self.batch_size:
+            self.flush()
+
+    def frame(self) -> pd.DataFrame:
+        """Returns buffered records as a typed DataFrame"""
+        return pd.DataFrame(
+            {
+                name: pd.Series(values, dtype=_dtype(self._types[name]))
+                for name, values in self._columns.items()
+            }
+        )
+
+    def flush(self) -> str:
+        """Atomically writes buffered records to a new part file
+
+        Returns:
+            filename (str): Written part file, None if nothing was buffered
+        """
+        if len(self) == 0:
+            return None
+
+        os.makedirs(self.path, exist_ok=True)
+        df = self.frame()
+        filename = os.path.join(self.path, f"part-{time.time_ns()}.{self._extension}")
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        os.close(fd)
+        try:
+            if PARQUET:
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_csv(tmp, index=False)
+            os.replace(tmp, filename)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        for values in self._columns.values():
+            values.clear()
+
+        if self._on_flush is not None:
+            self._on_flush(df)
+
+        return filename
+
+    def read(self) -> pd.DataFrame:
+        """Reads every written part file in write order
+
+        Returns:
+            df (pd.DataFrame): All flushed results
+        """
+        parts = sorted(glob.glob(os.path.join(self.path, f"part-*.{self._extension}")))
+        if not parts:
+            return self.frame().iloc[0:0]
+
+        reader = pd.read_parquet if PARQUET else pd.read_csv
+        return pd.concat([reader(part) for part in parts], ignore_index=True)
+
+    def export_csv(self, filename: str) -> None:
+        """Exports every written result to a single CSV file
+
+        Args:
+            filename (str): Output CSV file
+        """
+        self.read().to_csv(filename, index=False)
+
+
+def _dtype(kind: type) -> str:
+    """Maps a column's Python type to a pandas dtype"""
+    if kind is str:
+        return "string"
+    if kind is int:
+        return "Int64"
+    if kind is bool:
+        return "boolean"
+    return np.dtype(kind).name
@@ -0,0 +1,94 @@
+import time
+
+# Rough seconds per sample and channel, replaced by measurements after the first block
+DEFAULT_COSTS = {"bilstm": 2e-5, "ica": 1e-5, "asr": 5e-6, "none": 0.0}
+
+
+class ModeScheduler:
+    """Chooses the most thorough cleaning mode that fits the latency budget of a block"""
+
+    def __init__(
+        self,
+        budget: float,
+        modes: list = None,
+        costs: dict = None,
+        smoothing: float = 0.3,
+    ) -> None:
+        """Initializes cleaning mode scheduler
+
+        Args:
+            budget (float): Seconds available for cleaning every device in one block
+            modes (list): Cleaning modes from most to least thorough
+            costs (dict): Initial cost estimates in seconds per sample and channel
+            smoothing (float): Weight of the newest measurement in the running estimate
+        """
+        self.budget = budget
+        self.modes = list(DEFAULT_COSTS) if modes is None else list(modes)
+        self.smoothing = smoothing
+
+        self._costs = {**DEFAULT_COSTS, **(costs or {})}
+        self._measured: set[str] = set()
+        self._block_start = time.perf_counter()
+
+    def start_block(self) -> None:
+        """Starts the budget clock of a new block"""
+        self._block_start = time.perf_counter()
+
+    def remaining(self) -> float:
+        """Returns seconds left in the current block's budget"""
+        return self.budget - (time.perf_counter() - self._block_start)
+
+    def estimate(self, mode: str, n_samples: int, n_channels: int) -> float:
+        """Estimates cleaning time of a mode
+
+        Args:
+            mode (str): Cleaning mode
+            n_samples (int): Number of samples per channel
+            n_channels (int): Number of cleaned channels
+
+        Returns:
+            seconds (float): Estimated cleaning time
+        """
+        return self._costs.get(mode, 0.0) * n_samples * n_channels
+
+    def choose(self, n_samples: int, n_channels, n_devices: int = 1) -> str:
+        """Picks the most thorough mode whose estimate fits the remaining budget
+
+        Args:
+            n_samples (int): Number of samples per channel
+            n_channels (int or dict): Number of cleaned channels, or a number per mode
+            n_devices (int): Devices still to be cleaned in this block, sharing the budget
+
+        Returns:
+            mode (str): Chosen cleaning mode, the cheapest mode if none fits
+        """
+        available = self.remaining() / max(n_devices, 1)
+
+        for mode in self.modes:
+            channels = n_channels[mode] if isinstance(n_channels, dict) else n_channels
+            if self.estimate(mode, n_samples, channels) <= available:
+                return mode
+
+        return self.modes[-1]
+
+    def update(
+        self, mode: str, n_samples: int, n_channels: int, elapsed: float
+    ) -> None:
+        """Updates the running cost estimate of a mode with a measured run
+
+        Args:
+            mode (str): Cleaning mode
+            n_samples (int): Number of samples per channel
+            n_channels (int): Number of cleaned channels
+            elapsed (float): Measured cleaning time in seconds
+        """
+        if n_samples * n_channels == 0:
+            return
+
+        cost = elapsed / (n_samples * n_channels)
+
+        if mode in self._measured:
+            cost = self.smoothing * cost + (1 - self.smoothing) * self._costs[mode]
+
+        self._costs[mode] = cost
+        self._measured.add(mode)
@@ -0,0 +1,328 @@
+import ast
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from utils.results import RESULT_COLUMNS
+
+_SQL_TYPES = {str: "TEXT", float: "REAL", int: "INTEGER", bool: "INTEGER"}
+
+_IMPORT_TABLES = ("results", "cleaning_analysis")
+
+ANALYSIS_COLUMNS = {
+    "cleaning_mode": str,
+    "segment_id": int,
+    "rms_noisy": float,
+    "rms_cleaned": float,
+    "rms_diff": float,
+    "correlation": float,
+    "p_value": float,
+}
+
+
+class ResultsStore:
+    """Indexed SQLite store of synchronization and cleaning analysis results across sessions"""
+
+    def __init__(self, path: str, columns: dict = RESULT_COLUMNS) -> None:
+        """Initializes results store, creating tables and indexes if needed
+
+        Args:
+            path (str): SQLite database file
+            columns (dict): Synchronization result column names and their Python types
+        """
+        self.path = path
+        self._columns = dict(columns)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as con, con:
+            # `source` is the CSV file imported rows came from, None for live results
+            self._create_table(
+                con, "results", {"exp_name": str, "source": str, **self._columns}
+            )
+            self._create_table(
+                con, "cleaning_analysis", {"source": str, **ANALYSIS_COLUMNS}
+            )
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS imported_files "
+                "(path TEXT PRIMARY KEY, digest TEXT, mtime_ns INTEGER, n_rows INTEGER)"
+            )
+
+            for column in (
+                "subject_1",
+                "subject_2",
+                "parameter",
+                "cleaning_mode",
+                "date",
+            ):
+                con.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_results_{column} ON results ({column})"
+                )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_band ON results (freq_low, freq_high)"
+            )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_mode ON cleaning_analysis (cleaning_mode)"
+            )
+            for table in _IMPORT_TABLES:
+                con.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_source ON {table} (source)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a new connection, one per call so the store can be used from any thread"""
+        return sqlite3.connect(self.path)
+
+    def _create_table(self, con: sqlite3.Connection, table: str, columns: dict) -> None:
+        """Creates a table and adds columns missing from an older schema"""
+        con.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT)"
+        )
+        existing = {row[1] for row in con.execute(f"PRAGMA table_info({table})")}
+
+        for name, kind in columns.items():
+            if name not in existing:
+                con.execute(f"ALTER TABLE {table} ADD COLUMN {name} {_SQL_TYPES[kind]}")
+
+    def insert(
+        self, df: pd.DataFrame, exp_name: str = None, table: str = "results"
+    ) -> int:
+        """Inserts result rows
+
+        Args:
+            df (pd.DataFrame): Rows to insert, columns must be part of the table schema
+            exp_name (str): Experiment name stored with synchronization results
+            table (str): "results" or "cleaning_analysis"
+
+        Returns:
+            n_rows (int): Number of inserted rows
+        """
+        with closing(self._connect()) as con, con:
+            return self._insert(con, df, exp_name, table)
+
+    def _insert(
+        self, con: sqlite3.Connection, df: pd.DataFrame, exp_name: str, table: str
+    ) -> int:
+        """Inserts result rows within the caller's transaction"""
+        if len(df) == 0:
+            return 0
+
+        if table == "results" and exp_name is not None:
+            df = df.assign(exp_name=exp_name)
+
+        columns = list(df.columns)
+        rows = (
+            tuple(None if pd.isna(value) else _python(value) for value in row)
+            for row in df.itertuples(index=False, name=None)
+        )
+
+        con.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            rows,
+        )
+
+        return len(df)
+
+    def query(
+        self,
+        subjects: tuple = None,
+        parameter: str = None,
+        cleaning_mode: str = None,
+        band: tuple = None,
+        date_from: str = None,
+        date_to: str = None,
+    ) -> pd.DataFrame:
+        """Queries synchronization results, every filter is optional
+
+        Args:
+            subjects (tuple): One or two subject names, a pair matches in either order
+            parameter (str): Synchronization parameter
+            cleaning_mode (str): Cleaning mode
+            band (tuple): Frequency band as (low, high)
+            date_from (str): Earliest session date, inclusive
+            date_to (str): Latest session date, inclusive
+
+        Returns:
+            df (pd.DataFrame): Matching results
+        """
+        clauses, args = [], []
+
+        if subjects is not None:
+            if len(subjects) == 1:
+                clauses.append("(subject_1 = ? OR subject_2 = ?)")
+                args += [subjects[0], subjects[0]]
+            else:
+                clauses.append(
+                    "((subject_1 = ? AND subject_2 = ?) OR (subject_1 = ? AND subject_2 = ?))"
+                )
+                args += [subjects[0], subjects[1], subjects[1], subjects[0]]
+
+        for column, value in (
+            ("parameter", parameter),
+            ("cleaning_mode", cleaning_mode),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+
+        if band is not None:
+            clauses.append("freq_low = ? AND freq_high = ?")
+            args += list(band)
+
+        if date_from is not None:
+            clauses.append("date >= ?")
+            args.append(date_from)
+
+        if date_to is not None:
+            clauses.append("date <= ?")
+            args.append(date_to)
+
+        sql = "SELECT * FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        with closing(self._connect()) as con:
+            return pd.read_sql_query(sql + " ORDER BY id", con, params=args)
+
+    def values(self, **filters) -> np.ndarray:
+        """Returns synchronization values matching `query` filters
+
+        Args:
+            **filters: Keyword filters accepted by `query`
+
+        Returns:
+            values (np.ndarray): Synchronization values
+        """
+        return self.query(**filters)["synchronization_value"].to_numpy(dtype=float)
+
+    def import_csv(self, filename: str) -> int:
+        """Imports a results CSV written before the store existed
+
+        Both per-experiment synchronization files and `*_analysis_results.csv`
+        cleaning analyses are recognised by their header. Imported files are
+        recorded by path and content hash: importing an unchanged file again is a
+        no-op, and a file that changed since replaces the rows of its last import.
+
+        Args:
+            filename (str): CSV file
+
+        Returns:
+            n_rows (int): Number of imported rows, 0 if the file is unchanged
+        """
+        path = os.path.abspath(filename)
+        with open(path, "rb") as file:
+            digest = hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+
+        with closing(self._connect()) as con:
+            imported = con.execute(
+                "SELECT digest FROM imported_files WHERE path = ?", (path,)
+            ).fetchone()
+        if imported is not None and imported[0] == digest:
+            return 0
+
+        table, df, exp_name = self._parse_csv(path)
+
+        with closing(self._connect()) as con, con:
+            # Earlier rows, the new rows and the file record change in one transaction
+            for imported_table in _IMPORT_TABLES:
+                con.execute(f"DELETE FROM {imported_table} WHERE source = ?", (path,))
+            n_rows = self._insert(con, df.assign(source=path), exp_name, table)
+            con.execute(
+                "INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?, ?)",
+                (path, digest, os.stat(path).st_mtime_ns, n_rows),
+            )
+
+        return n_rows
+
+    def _parse_csv(self, filename: str) -> tuple:
+        """Reads a results CSV into rows of the store schema
+
+        Args:
+            filename (str): CSV file
+
+        Returns:
+            table (str): Table the rows belong to
+            df (pd.DataFrame): Rows to insert
+            exp_name (str): Experiment name of synchronization results
+        """
+        df = pd.read_csv(filename)
+        name = os.path.splitext(os.path.basename(filename))[0]
+
+        if "Segment_ID" in df.columns:
+            analysis = pd.DataFrame(
+                {
+                    "cleaning_mode": name.split("_")[0],
+                    "segment_id": df["Segment_ID"].astype(int),
+                    "rms_noisy": df["RMS_Noisy"],
+                    "rms_cleaned": df["RMS_Cleaned"],
+                    "rms_diff": df["RMS_diff"],
+                    "correlation": df["Correlation"],
+                    "p_value": df["P_Value"],
+                }
+            )
+            return "cleaning_analysis", analysis, None
+
+        if "synchronization_value" not in df.columns:
+            raise ValueError(f"Unrecognised results file: {filename}")
+
+        if "subjects" in df.columns:
+            subjects = df["subjects"].str.split(" vs ", n=1, expand=True)
+            df["subject_1"], df["subject_2"] = subjects[0], subjects[1]
+
+        if "frequency_bands" in df.columns:
+            bands = df["frequency_bands"].map(
+                lambda x: ast.literal_eval(x)["freq_bands"]
+            )
+            df["freq_low"], df["freq_high"] = bands.str[0], bands.str[1]
+
+        if "channels" in df.columns:
+            df["channels"] = df["channels"].map(
+                lambda x: ",".join(ast.literal_eval(x)) if x.startswith("[") else x
+            )
+
+        if "date" not in df.columns:
+            match = re.search(r"\d{8}-\d{6}", name)
+            df["date"] = match.group(0) if match else None
+
+        return (
+            "results",
+            df[[column for column in self._columns if column in df.columns]],
+            name,
+        )
+
+    def import_directory(self, path: str) -> int:
+        """Imports every results CSV in a directory, e.g. the existing `output/` folder
+
+        Args:
+            path (str): Directory containing results CSV files
+
+        Returns:
+            n_rows (int): Number of imported rows
+        """
+        return sum(
+            self.import_csv(filename)
+            for filename in sorted(glob.glob(os.path.join(path, "*.csv")))
+        )
+
+
+def _python(value):
+    """Converts NumPy scalars to Python values accepted by sqlite3"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+if __name__ == "__main__":
+    import sys
+
+    output = sys.argv[1] if len(sys.argv) > 1 else "output"
+    store = ResultsStore(os.path.join(output, "results.sqlite"))
+    print(f"Imported {store.import_directory(output)} rows into {store.path}")
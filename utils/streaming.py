@@ -0,0 +1,421 @@
+import logging
+import threading
+
+import mne
+import numpy as np
+import scipy.signal as signal
+
+from utils.buffers import RingBuffer
+from utils.ingestion import LSLIngestion
+from utils.processing import load_model
+
+
+class _Stream:
+    """Denoising state of one device"""
+
+    def __init__(
+        self,
+        picks: list,
+        sfreq: float,
+        first: int,
+        n_taps: int,
+        window: int,
+        capacity: int,
+        dtype: np.dtype,
+    ) -> None:
+        """Initializes device stream state
+
+        Args:
+            picks (list): Indices of the denoised channels in the device stream
+            sfreq (float): Sampling frequency of the device stream
+            first (int): Device sample index that output sample 0 corresponds to
+            n_taps (int): Band-pass filter length
+            window (int): Model segment length
+            capacity (int): Output samples kept
+            dtype (np.dtype): Data type of the buffers
+        """
+        n_channels = len(picks)
+
+        self.picks = picks
+        self.sfreq = sfreq
+        self.first = first
+        self.resampled = 0
+        self.zi = np.zeros((n_channels, n_taps - 1))
+
+        # Band-passed input and final output, both indexed in output samples
+        self.filtered = RingBuffer(n_channels, capacity, dtype)
+        self.output = RingBuffer(n_channels, capacity, dtype)
+
+        # Overlap-add accumulator of the window starting at output.written
+        self.accumulator = np.zeros((n_channels, window))
+        self.weight = np.zeros(window)
+
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        """Frees the shared buffers"""
+        for buffer in (self.filtered, self.output):
+            buffer.close()
+            buffer.unlink()
+
+
+class StreamingDenoiser:
+    """Denoises live device data with the BiLSTM model while trials are running
+
+    A background worker resamples new samples to the model rate, band-passes
+    them with a delay-compensated FIR filter and, whenever a full segment per
+    channel has arrived, denoises it. Segments overlap by `window - hop`
+    samples and are combined by weighted overlap-add into a per-device output
+    buffer, so by the end of a block only its last segments are left to run.
+
+    `Processing.BiLSTM` standardises a block by the standard deviation of the
+    whole block, which is only known once the block has ended. Streamed
+    segments are standardised by their own standard deviation instead, so
+    their scale does not depend on earlier blocks or on how much of the
+    current block has arrived.
+    """
+
+    def __init__(
+        self,
+        ingestion: LSLIngestion,
+        model_path: str,
+        channels: list,
+        logger: logging.Logger,
+        sfreq: float = 256,
+        window: int = 512,
+        hop: int = 512,
+        band: tuple = (1, 40),
+        capacity: float = 600.0,
+        poll: float = 0.05,
+        dtype: str = "float32",
+        num_threads: int = None,
+    ) -> None:
+        """Initializes streaming denoiser
+
+        Args:
+            ingestion (LSLIngestion): Live data source
+            model_path (str): Path to the BiLSTM model
+            channels (list): Denoised channels
+            logger (logging.Logger): The logger object for logging information, errors, etc.
+            sfreq (float): Model sampling frequency
+            window (int): Model segment length in samples
+            hop (int): Samples between segment starts, smaller than `window` to overlap
+            band (tuple): Band-pass edges in Hz, as in `Processing.clean`
+            capacity (float): Seconds of output kept per device
+            poll (float): Seconds the worker waits when no segment is ready
+            dtype (str): Data type of the buffers
+            num_threads (int): Inference threads of .tflite models
+        """
+        self._ingestion = ingestion
+        self._model_path = model_path
+        self._num_threads = num_threads
+        self._logger = logger
+
+        self.channels = list(channels)
+        self.sfreq = sfreq
+        self.window = window
+        self.hop = hop
+        self._capacity = int(capacity * sfreq)
+        self._poll = poll
+        self._dtype = np.dtype(dtype)
+
+        # The band-pass `Processing.clean` applies with `raw.filter`, made
+        # zero-phase below by shifting the causal output by its delay
+        l_freq, h_freq = band
+        self._taps = mne.filter.create_filter(
+            None, sfreq, l_freq, h_freq, fir_design="firwin", verbose=False
+        )
+        n_taps = len(self._taps)
+        self._delay = (n_taps - 1) // 2
+
+        # Hann synthesis window for overlapping segments, never exactly zero
+        self._synthesis = (
+            np.hanning(window + 2)[1:-1] if hop < window else np.ones(window)
+        )
+
+        self._streams: dict[str, _Stream] = {}
+        self._model_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    @property
+    def devices(self) -> list:
+        """Names of devices being denoised"""
+        return list(self._streams)
+
+    def start(self) -> None:
+        """Creates device streams and starts the background worker"""
+        for device in self._ingestion.devices:
+            names = self._ingestion.channels[device]
+            missing = [channel for channel in self.channels if channel not in names]
+            if missing:
+                self._logger.error(f"Not streaming {device}: missing {missing}")
+                continue
+
+            self._streams[device] = _Stream(
+                picks=[names.index(channel) for channel in self.channels],
+                sfreq=self._ingestion.sfreq[device],
+                first=self._ingestion.span(device)[1],
+                n_taps=len(self._taps),
+                window=self.window,
+                capacity=self._capacity,
+                dtype=self._dtype,
+            )
+
+        self._model = load_model(self._model_path, num_threads=self._num_threads)
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="streaming-denoiser", daemon=True
+        )
+        self._thread.start()
+        self._logger.info(f"Started streaming denoiser for {self.devices}")
+
+    def stop(self) -> None:
+        """Stops the worker and frees the output buffers"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        for stream in self._streams.values():
+            stream.close()
+
+    def _run(self) -> None:
+        """Processes new samples of every device until stopped"""
+        while not self._stop.is_set():
+            processed = 0
+
+            for device in self._streams:
+                try:
+                    processed += self.process(device)
+                except Exception as e:
+                    self._logger.error(f"Streaming denoiser error on {device}: {e}")
+
+            if not processed:
+                self._stop.wait(self._poll)
+
+    def process(self, device: str) -> int:
+        """Resamples, filters and denoises the samples of a device that arrived since the last call
+
+        Args:
+            device (str): Device stream name
+
+        Returns:
+            n_segments (int): Number of segments denoised
+        """
+        stream = self._streams[device]
+
+        with stream.lock:
+            self._resample(device, stream)
+
+            starts = np.arange(
+                stream.output.written,
+                stream.filtered.written - self.window + 1,
+                self.hop,
+            )
+            if len(starts):
+                segments = np.stack(
+                    [
+                        stream.filtered.view(start, start + self.window)
+                        for start in starts
+                    ]
+                )
+                self._overlap_add(stream, self._denoise(segments), final=True)
+
+        return len(starts)
+
+    def _resample(self, device: str, stream: _Stream) -> None:
+        """Moves new device samples onto the model rate and band-passes them
+
+        Args:
+            device (str): Device stream name
+            stream (_Stream): Device stream state
+        """
+        buffer = self._ingestion.buffers[device]
+        first, written = max(buffer.first, stream.first), buffer.written
+        ratio = stream.sfreq / self.sfreq
+
+        # Linear interpolation needs the sample after each position
+        available = int(np.floor((written - 2 - stream.first) / ratio)) + 1
+        start = max(stream.resampled, int(np.ceil((first - stream.first) / ratio)))
+        if available <= start:
+            return
+
+        positions = stream.first + np.arange(start, available) * ratio
+        lower = np.floor(positions).astype(np.int64)
+        fraction = positions - lower
+
+        data = buffer.view(int(lower[0]), int(lower[-1]) + 2)[stream.picks]
+        lower -= lower[0]
+        resampled = data[:, lower] + (data[:, lower + 1] - data[:, lower]) * fraction
+
+        filtered, stream.zi = signal.lfilter(
+            self._taps, 1.0, resampled, axis=1, zi=stream.zi
+        )
+        stream.resampled = available
+
+        # Shifting by the filter delay makes the causal FIR zero-phase
+        skip = max(self._delay - start, 0)
+        stream.filtered.write(filtered[:, skip:].astype(self._dtype))
+
+    def _denoise(self, segments: np.ndarray, lengths: np.ndarray = None) -> np.ndarray:
+        """Denoises segments in one batched model call, as `Processing.BiLSTM` does
+
+        Args:
+            segments (np.ndarray): Segments with shape (n_segments, n_channels, window)
+            lengths (np.ndarray): Samples of each segment that are data rather than
+                zero padding, None if every segment is full
+
+        Returns:
+            denoised (np.ndarray): Denoised segments with the same shape
+        """
+        if lengths is None:
+            std = np.std(segments, axis=-1, keepdims=True)
+        else:
+            valid = np.arange(self.window) < lengths[:, np.newaxis, np.newaxis]
+            count = lengths[:, np.newaxis, np.newaxis]
+            mean = np.sum(segments * valid, axis=-1, keepdims=True) / count
+            std = np.sqrt(
+                np.sum(((segments - mean) * valid) ** 2, axis=-1, keepdims=True) / count
+            )
+        std = np.where(std > 0, std, 1)
+
+        standardized = (segments / std).astype(np.float32).reshape(-1, self.window, 1)
+        with self._model_lock:
+            denoised = self._model.predict(standardized, batch_size=256, verbose=0)
+
+        return denoised.reshape(segments.shape) * std
+
+    def _overlap_add(
+        self, stream: _Stream, denoised: np.ndarray, final: bool
+    ) -> np.ndarray:
+        """Adds denoised segments, `hop` samples apart, into the output
+
+        Args:
+            stream (_Stream): Device stream state
+            denoised (np.ndarray): Segments with shape (n_segments, n_channels, window)
+            final (bool): Write finished samples to the output buffer and keep the
+                accumulator, otherwise work on copies and return the samples
+
+        Returns:
+            samples (np.ndarray): Samples finished by these segments if not `final`
+        """
+        accumulator = stream.accumulator if final else stream.accumulator.copy()
+        weight = stream.weight if final else stream.weight.copy()
+        finished = []
+
+        for segment in denoised:
+            accumulator += segment * self._synthesis
+            weight += self._synthesis
+
+            done = accumulator[:, : self.hop] / weight[: self.hop]
+            if final:
+                stream.output.write(done.astype(self._dtype))
+            else:
+                finished.append(done)
+
+            accumulator[:, : -self.hop] = accumulator[:, self.hop :]
+            accumulator[:, -self.hop :] = 0
+            weight[: -self.hop] = weight[self.hop :]
+            weight[-self.hop :] = 0
+
+        if not final:
+            # The rest of the last segment is only overlapped by itself
+            finished.append(
+                accumulator[:, : self.window - self.hop]
+                / weight[: self.window - self.hop]
+            )
+            return np.concatenate(finished, axis=1)
+
+    def _tail(self, stream: _Stream) -> np.ndarray:
+        """Denoises the samples not yet covered by a full segment, without changing state
+
+        The filter is flushed with zeros and the last segment is zero-padded, as
+        at the end of an offline recording, while the stream itself carries on
+        and later replaces these samples once real data follows them.
+
+        Args:
+            stream (_Stream): Device stream state
+
+        Returns:
+            tail (np.ndarray): Denoised samples from `output.written` up to the
+                last resampled sample
+        """
+        flushed, _ = signal.lfilter(
+            self._taps,
+            1.0,
+            np.zeros((len(stream.picks), self._delay)),
+            axis=1,
+            zi=stream.zi,
+        )
+        skip = max(self._delay - stream.resampled, 0)
+        pending = np.concatenate(
+            [
+                stream.filtered.view(stream.output.written, stream.filtered.written),
+                flushed[:, skip:],
+            ],
+            axis=1,
+        )
+
+        n_pending = pending.shape[1]
+        if n_pending == 0:
+            return pending
+
+        n_segments = max(int(np.ceil((n_pending - self.window) / self.hop)), 0) + 1
+        padded = np.zeros(
+            (len(stream.picks), (n_segments - 1) * self.hop + self.window)
+        )
+        padded[:, :n_pending] = pending
+
+        segments = np.stack(
+            [
+                padded[:, index * self.hop : index * self.hop + self.window]
+                for index in range(n_segments)
+            ]
+        )
+        # Padding is left out of the standard deviation of the last segments
+        lengths = np.clip(n_pending - np.arange(n_segments) * self.hop, 1, self.window)
+        tail = self._overlap_add(stream, self._denoise(segments, lengths), final=False)
+
+        return tail[:, :n_pending]
+
+    def denoised(self, device: str, positions: np.ndarray) -> np.ndarray:
+        """Returns denoised data at device sample positions, catching up first
+
+        Args:
+            device (str): Device stream name
+            positions (np.ndarray): Fractional device sample indices
+
+        Returns:
+            data (np.ndarray): Denoised data with shape (n_channels, len(positions)),
+                None if the output no longer or not yet covers the positions
+        """
+        stream = self._streams.get(device)
+        if stream is None:
+            return None
+
+        self.process(device)
+
+        with stream.lock:
+            indices = (np.asarray(positions) - stream.first) * self.sfreq / stream.sfreq
+            lower = np.floor(indices).astype(np.int64)
+            start = int(lower[0])
+            stop = min(int(lower[-1]) + 2, stream.resampled)
+
+            if start < stream.output.first or int(lower[-1]) >= stream.resampled:
+                return None
+
+            written = stream.output.written
+            parts = []
+            if start < written:
+                parts.append(stream.output.view(start, min(stop, written)))
+            if stop > written:
+                tail = self._tail(stream)
+                parts.append(tail[:, max(start - written, 0) : stop - written])
+            data = np.concatenate(parts, axis=1)
+
+        lower -= start
+        fraction = indices - np.floor(indices)
+        upper = np.minimum(lower + 1, data.shape[1] - 1)
+
+        return data[:, lower] + (data[:, upper] - data[:, lower]) * fraction
@@ -0,0 +1,208 @@
+import numpy as np
+import scipy.fft as sp_fft
+
+from concurrent.futures import ProcessPoolExecutor
+
+METHODS = ("shift", "shuffle")
+
+
+def _reduce(con: np.ndarray) -> np.ndarray:
+    """Reduces inter-brain connectivity matrices to one value like `calculate_sync`
+
+    Args:
+        con (np.ndarray): Connectivity with shape (..., n_channels_1, n_channels_2)
+
+    Returns:
+        sync (np.ndarray): Mean of the arithmetic and geometric mean of each matrix
+    """
+    size = con.shape[-1] * con.shape[-2]
+    am = con.mean(axis=(-2, -1))
+    gm = np.prod(con, axis=(-2, -1)) ** (1 / size)
+
+    return (am + gm) / 2
+
+
+def _null_chunk(magnitude: np.ndarray, pairing: np.ndarray) -> np.ndarray:
+    """Computes surrogate sync values for one chunk of pairings
+
+    Args:
+        magnitude (np.ndarray): Normalised connectivity with shape
+            (n_epochs, n_pairings, n_channels_1, n_channels_2)
+        pairing (np.ndarray): Pairing index of every epoch with shape (n_surrogates, n_epochs)
+
+    Returns:
+        null (np.ndarray): Surrogate sync values with shape (n_surrogates,)
+    """
+    epochs = np.arange(magnitude.shape[0])
+
+    # (n_surrogates, n_epochs, n_channels_1, n_channels_2), averaged over epochs
+    con = np.nanmean(magnitude[epochs, pairing], axis=1)
+
+    return _reduce(con)
+
+
+class SurrogateTest:
+    """Tests synchronization values against surrogate pairings of the same analytic signals"""
+
+    def __init__(
+        self,
+        n_surrogates: int = 1000,
+        method: str = "shift",
+        min_shift: float = 0.1,
+        chunk_size: int = 1000,
+        n_jobs: int = 1,
+        seed: int = None,
+    ) -> None:
+        """Initializes surrogate test
+
+        "shift" circularly shifts the second participant's signal by a random lag
+        per epoch, "shuffle" pairs every epoch of the first participant with a
+        different epoch of the second, drawn as a random derangement.
+
+        Args:
+            n_surrogates (int): Number of surrogate pairings
+            method (str): "shift" or "shuffle"
+            min_shift (float): Smallest shift as a share of the epoch length, so
+                surrogates never stay close to the original alignment
+            chunk_size (int): Surrogates evaluated per batch, bounds memory use
+            n_jobs (int): Worker processes the chunks are spread over, 1 runs in process
+            seed (int): Random seed
+        """
+        if method not in METHODS:
+            raise ValueError(f"Surrogate method should be one of {', '.join(METHODS)}")
+
+        self.n_surrogates = n_surrogates
+        self.method = method
+        self.min_shift = min_shift
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self._rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _normalise(complex_signal: np.ndarray, parameter: str) -> tuple:
+        """Prepares both participants' signals and the normalisation of a measure
+
+        Args:
+            complex_signal (np.ndarray): Analytic signals with shape (2, n_epochs, n_channels, n_times)
+            parameter (str): "coh" or "plv"
+
+        Returns:
+            z1, z2 (np.ndarray): Signals entering the cross-spectrum
+            scale1, scale2 (np.ndarray): Per-epoch and channel factors of the denominator
+        """
+        if parameter == "plv":
+            phase = complex_signal / np.abs(complex_signal)
+            scale = np.full(phase.shape[:3], np.sqrt(phase.shape[-1]))
+            return phase[0], phase[1], scale[0], scale[1]
+
+        if parameter == "coh":
+            scale = np.sqrt(np.nansum(np.abs(complex_signal) ** 2, axis=-1))
+            return complex_signal[0], complex_signal[1], scale[0], scale[1]
+
+        raise ValueError(f"Surrogate test does not support '{parameter}'")
+
+    def magnitude(self, complex_signal: np.ndarray, parameter: str) -> np.ndarray:
+        """Computes normalised connectivity for every possible pairing at once
+
+        Shifts use one FFT cross-correlation, which gives the cross-spectrum at
+        every lag, shuffles use the cross-spectrum between every pair of epochs.
+        Both normalise as `hypyp.analyses.compute_sync`, so lag 0, or pairing
+        each epoch with itself, gives the original value.
+
+        Args:
+            complex_signal (np.ndarray): Analytic signals with shape (2, n_epochs, n_channels, n_times)
+            parameter (str): "coh" or "plv"
+
+        Returns:
+            magnitude (np.ndarray): Connectivity with shape
+                (n_epochs, n_pairings, n_channels_1, n_channels_2)
+        """
+        z1, z2, scale1, scale2 = self._normalise(complex_signal, parameter)
+
+        if self.method == "shift":
+            spectrum1 = sp_fft.fft(z1, axis=-1)
+            spectrum2 = sp_fft.fft(z2, axis=-1)
+            # cross[e, i, j, lag] = sum_t z1[e, i, t + lag] * conj(z2[e, j, t])
+            cross = sp_fft.ifft(
+                spectrum1[:, :, None] * np.conj(spectrum2[:, None]), axis=-1
+            )
+            cross = np.moveaxis(cross, -1, 1)
+            norm = scale1[:, None, :, None] * scale2[:, None, None, :]
+        else:
+            cross = np.einsum("ait,bjt->abij", z1, np.conj(z2))
+            norm = scale1[:, None, :, None] * scale2[None, :, None, :]
+
+        return np.abs(cross) / norm
+
+    def pairings(self, n_epochs: int, n_pairings: int) -> np.ndarray:
+        """Draws the pairing index of every epoch for all surrogates
+
+        Args:
+            n_epochs (int): Number of epochs
+            n_pairings (int): Lags for "shift", epochs for "shuffle"
+
+        Returns:
+            pairing (np.ndarray): Indices with shape (n_surrogates, n_epochs)
+        """
+        if self.method == "shift":
+            low = max(int(self.min_shift * n_pairings), 1)
+            return self._rng.integers(
+                low, n_pairings - low + 1, size=(self.n_surrogates, n_epochs)
+            )
+
+        if n_epochs < 2:
+            raise ValueError("Shuffled surrogates need at least two epochs")
+
+        # Derangements: permutations with a fixed point still pair an epoch with
+        # itself, so they are redrawn until none is left (about 37 % pass per draw)
+        order = np.arange(n_epochs)
+        pairing = self._rng.permuted(np.tile(order, (self.n_surrogates, 1)), axis=1)
+        fixed = np.any(pairing == order, axis=1)
+
+        while fixed.any():
+            pairing[fixed] = self._rng.permuted(pairing[fixed], axis=1)
+            fixed = np.any(pairing == order, axis=1)
+
+        return pairing
+
+    def run(self, complex_signal: np.ndarray, parameter: str) -> dict:
+        """Computes the sync value of the original pairing and its surrogate distribution
+
+        Args:
+            complex_signal (np.ndarray): Analytic signals with shape (2, n_epochs, n_channels, n_times)
+            parameter (str): "coh" or "plv"
+
+        Returns:
+            significance (dict): Original value, p-value, median and 95th percentile
+                of the surrogate distribution, and the distribution itself
+        """
+        magnitude = self.magnitude(complex_signal, parameter)
+        n_epochs, n_pairings = magnitude.shape[:2]
+
+        original = np.zeros(n_epochs, dtype=int)
+        if self.method == "shuffle":
+            original = np.arange(n_epochs)
+
+        value = _null_chunk(magnitude, original[None])[0]
+
+        pairing = self.pairings(n_epochs, n_pairings)
+        chunks = [
+            pairing[start : start + self.chunk_size]
+            for start in range(0, len(pairing), self.chunk_size)
+        ]
+
+        if self.n_jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                null = list(pool.map(_null_chunk, [magnitude] * len(chunks), chunks))
+        else:
+            null = [_null_chunk(magnitude, chunk) for chunk in chunks]
+
+        null = np.concatenate(null)
+
+        return {
+            "value": float(value),
+            "p_value": float((1 + np.sum(null >= value)) / (1 + len(null))),
+            "null_median": float(np.median(null)),
+            "null_95": float(np.percentile(null, 95)),
+            "null": null,
+        }
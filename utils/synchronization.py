@@ -1,32 +1,48 @@
 import mne
-import pandas as pd
 import numpy as np
-import os
-
-import scipy.signal as signal
+import time
 
 from hypyp import analyses
 from typing import Any
+from functools import partial
 from itertools import combinations
 
 from utils.processing import Processing
+from utils.results import ResultsWriter
+from utils.store import ResultsStore
+from utils.ingestion import LSLIngestion
+from utils.epoching import analytic_signal, epoch_array, epoch_mask
+from utils.quality import QualityGate
+from utils.scheduler import ModeScheduler
+from utils.surrogates import SurrogateTest
+from utils.cache import ArrayCache
+from utils.events import EventIndex
+from utils.alignment import ClockAligner
+from utils.streaming import StreamingDenoiser
+from utils.archive import SessionArchive
 from model import Model
 from config import (
     N_TRIALS,
     N_BLOCKS,
     CHANNELS_LIST,
     SAMPLING_FREQ,
+    RESAMPLE_FREQ,
     FREQ_BANDS,
     FLICKER_FREQ,
     TMIN,
     TMAX,
     RECORD,
     EXP_NAME,
+    RESULTS_DB,
     USERS,
     TRIAL_LEN,
     EVENT_DICT,
     DEV,
     PROCESSING_MODE,
+    PRECISION,
+    QUALITY_GATE,
+    SURROGATES,
+    expInfo,
 )
 
 
@@ -34,13 +50,37 @@ class Synchronization:
     """Performs brain synchronization calculations"""
 
     def __init__(
-        self, model: Model, database: tuple, cleaner: Processing, sync_list: list
+        self,
+        model: Model,
+        database: tuple,
+        cleaner: Processing,
+        sync_list: list,
+        ingestion: LSLIngestion = None,
+        scheduler: ModeScheduler = None,
+        cache: ArrayCache = None,
+        events: dict = None,
+        block: int = None,
+        aligner: ClockAligner = None,
+        denoiser: StreamingDenoiser = None,
+        archive: SessionArchive = None,
     ) -> None:
         """Initializes synchronization calculation class
 
         Args:
             model (Model): Handles logging through BrainAccess Board API interface
             database (tuple): The experiment database
+            ingestion (LSLIngestion): Live LSL data source used instead of the database if given
+            scheduler (ModeScheduler): Picks the cleaning mode per device from a latency budget,
+                the fixed cleaning mode is used if None
+            cache (ArrayCache): Reuses analytic signals and sync results of identical epochs
+            events (dict): Event index per device, kept between blocks so only new
+                annotations are indexed
+            block (int): Current block number, None treats new events as the next block
+            aligner (ClockAligner): Running clock fits that put live devices on a shared
+                timeline, kept between blocks
+            denoiser (StreamingDenoiser): Live BiLSTM output used instead of cleaning
+                after the block where it covers the current trials
+            archive (SessionArchive): Stores raw data and cleaned epochs of every block
         """
 
         self._sync_value = -1
@@ -48,6 +88,14 @@ class Synchronization:
 
         self._db, self._db_status = database
         self._model = model
+        self._ingestion = ingestion
+        self._cache = cache
+        self._event_index = {} if events is None else events
+        self._block = block
+        self._aligner = aligner
+        self._denoiser = denoiser
+        self._origins: dict[str, tuple] = {}
+        self._archive = archive
 
         self._model.logger.info("Starting data processing process")
 
@@ -62,6 +110,12 @@ class Synchronization:
         self._concatenated_epochs = []
 
         self._cleaner = cleaner
+        self._gate = None if QUALITY_GATE is None else QualityGate(**QUALITY_GATE)
+        self._quality: dict[str, dict] = {}
+        self._scheduler = scheduler
+        self._cleaning: dict[str, tuple] = {}
+        self._surrogates = None if SURROGATES is None else SurrogateTest(**SURROGATES)
+        self._significance: dict[str, float] = {}
         self.update_users()
         self.epoch_data()
 
@@ -78,6 +132,7 @@ class Synchronization:
         self._params["event_dict"] = EVENT_DICT
         self._params["dev"] = DEV
         self._params["cleaning_mode"] = PROCESSING_MODE
+        self._params["dtype"] = np.dtype(PRECISION)
 
     def update_users(self) -> None:
         """Updates user names based on their devices"""
@@ -88,35 +143,382 @@ class Synchronization:
 
     def get_user_devices(self) -> None:
         """Returns user devices"""
+        if self._ingestion is not None:
+            self._user_devices = self._ingestion.devices
+            return
+
         devices = self._db.separate_marker_devices()
         self._user_devices = list(devices["data"].keys())
 
     def get_mne_from_db(self) -> None:
-        """Gets MNE data from experiment database"""
-        if not self._db:
-            return None
-
+        """Gets MNE data from experiment database, or from the LSL buffers if ingesting live"""
         self._mne_data = []
 
+        if self._ingestion is not None:
+            times = None if self._aligner is None else self.align()
+
+            def get_raw(device: str) -> mne.io.RawArray:
+                span = self._ingestion.span(device)
+                self._origins[device] = (span[0], times)
+                return self._ingestion.to_raw(
+                    device, times=times, aligner=self._aligner, span=span
+                )
+
+        elif self._db:
+            get_raw = lambda device: self._db.get_mne()[device]
+        else:
+            return None
+
         for device in self._user_devices:
-            self._mne_data.append({device: self._db.get_mne()[device]})
+            self._mne_data.append({device: get_raw(device)})
 
             if self._params["dev"]:
                 # if only 1 device connected, duplicate
-                self._mne_data.append({device: self._db.get_mne()[device]})
+                self._mne_data.append({device: get_raw(device)})
 
         if len(self._mne_data) == 0:
             self._model.logger.error("No MNE data found")
 
-    def get_current_events(self, events: np.ndarray) -> np.ndarray:
-        """Gets the events from the current block of trials
+    def align(self) -> np.ndarray:
+        """Updates the device clock fits with new timestamps and builds a shared timeline
+
+        Returns:
+            times (np.ndarray): Shared clock times covered by every device
+        """
+        spans = {}
+
+        for device in self._user_devices:
+            self._aligner.update_buffer(device, self._ingestion.timestamps[device])
+            spans[device] = self._ingestion.span(device)
+
+            _, period = self._aligner.fit(device)
+            self._model.logger.info(
+                f"Clock fit for {device}: {1 / period:.3f} Hz effective rate, "
+                f"{self._aligner.error(device) * 1e3:.3f} ms alignment error"
+            )
+
+        return self._aligner.timeline(spans)
+
+    def get_events(self, device: str, raw_data: mne.io.Raw) -> tuple:
+        """Indexes the new events of a device and returns the current and all events
+
+        Args:
+            device (str): User device name
+            raw_data (mne.io.Raw): User raw data holding the stimulus annotations
+
+        Returns:
+            current_events (np.ndarray): Events of the current block of trials
+            events (np.ndarray): Events of the whole experiment
+        """
+        index = self._event_index.setdefault(
+            device, EventIndex(self._params["event_dict"])
+        )
+        index.update(raw_data, block=self._block)
+
+        block = index.n_blocks - 1 if self._block is None else self._block
+        current_events = index.events(raw_data, block=block)
+
+        if len(current_events) != N_TRIALS:
+            self._model.logger.warning(
+                f"Block {block} of {device} has {len(current_events)} events, "
+                f"{N_TRIALS} expected"
+            )
+
+        return current_events, index.events(raw_data)
+
+    def get_epochs(
+        self, raw_data: mne.io.Raw, events: np.ndarray, detrend: int = None
+    ) -> np.ndarray:
+        """Cuts epochs of the analysed channels straight from raw data, without building mne.Epochs
+
+        Args:
+            raw_data (mne.io.Raw): User raw data
+            events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
+            detrend (int): 0 removes the mean, 1 removes a linear trend, None keeps data as is
+
+        Returns:
+            epochs (np.ndarray): Epoched data with shape (n_events, n_channels, n_times)
+        """
+        return epoch_array(
+            raw_data.get_data(picks=self._params["channels_list"]).astype(
+                self._params["dtype"], copy=False
+            ),
+            events,
+            sfreq=raw_data.info["sfreq"],
+            tmin=self._params["tmin"],
+            tmax=self._params["tmax"],
+            first_samp=raw_data.first_samp,
+            detrend=detrend,
+        )
+
+    def kept_events(self, raw_data: mne.io.Raw, events: np.ndarray) -> np.ndarray:
+        """Returns the events that `get_epochs` cuts an epoch for
+
+        Args:
+            raw_data (mne.io.Raw): User raw data
+            events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
+
+        Returns:
+            kept (np.ndarray): Boolean mask of the events whose epoch fits in the data
+        """
+        return epoch_mask(
+            events,
+            raw_data.n_times,
+            sfreq=raw_data.info["sfreq"],
+            tmin=self._params["tmin"],
+            tmax=self._params["tmax"],
+            first_samp=raw_data.first_samp,
+        )
+
+    def get_mne_epochs(self, device: str, full: bool = False) -> mne.EpochsArray:
+        """Builds MNE epochs of a device on request
+
+        Args:
+            device (str): User device name
+            full (bool): Epochs for the whole experiment instead of the current block
+
+        Returns:
+            epochs (mne.EpochsArray): Epoched data of the analysed channels, None if
+                the device has no usable epochs
+        """
+        epochs = self._all_epochs if full else self._current_epochs
+        # Blocks that failed the quality gate hold None instead of epochs
+        data = next(
+            (epoch[device] for epoch in epochs if epoch.get(device) is not None), None
+        )
+        if data is None:
+            self._model.logger.error(f"No epochs found for {device}")
+            return None
+
+        current_events, events, ev_id, sfreq = self._events[device]
+
+        info = mne.create_info(
+            ch_names=self._params["channels_list"], sfreq=sfreq, ch_types="eeg"
+        )
+
+        return mne.EpochsArray(
+            np.array(data),
+            info,
+            events=events if full else current_events,
+            tmin=self._params["tmin"],
+            event_id=ev_id,
+            verbose=False,
+        )
+
+    def clean(
+        self, device: str, raw_data: mne.io.Raw, events: np.ndarray, n_devices: int
+    ) -> mne.io.Raw:
+        """Cleans one device with the fixed or the scheduled cleaning mode and times it
+
+        Args:
+            device (str): User device name
+            raw_data (mne.io.Raw): User raw data
+            events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
+            n_devices (int): Devices still to be cleaned in this block, including this one
+
+        Returns:
+            processed_data (mne.io.Raw): Cleaned data
+        """
+        start = time.perf_counter()
+        streamed = self.streamed(device, raw_data, events)
+
+        if streamed is not None:
+            elapsed = time.perf_counter() - start
+            self._cleaning[device] = ("bilstm-stream", elapsed)
+            self._model.logger.info(
+                f"Used streamed BiLSTM output for {device}, waited {elapsed:.2f} s"
+            )
+            return streamed
+
+        mode = self._params["cleaning_mode"]
+        n_channels = {
+            option: len(self._cleaner.plan(option))
+            for option in (self._scheduler.modes if self._scheduler else [mode])
+        }
+
+        if self._scheduler is not None:
+            mode = self._scheduler.choose(raw_data.n_times, n_channels, n_devices)
+
+        start = time.perf_counter()
+        processed_data = self._cleaner.clean(raw=raw_data, mode=mode, events=events)
+        elapsed = time.perf_counter() - start
+
+        if self._scheduler is not None:
+            self._scheduler.update(mode, raw_data.n_times, n_channels[mode], elapsed)
+
+        self._cleaning[device] = (mode, elapsed)
+        self._model.logger.info(f"Cleaned {device} with {mode} in {elapsed:.2f} s")
+
+        return processed_data
+
+    def streamed(
+        self, device: str, raw_data: mne.io.Raw, events: np.ndarray
+    ) -> mne.io.RawArray:
+        """Takes the current trials of a device from the streaming denoiser output
+
+        Args:
+            device (str): User device name
+            raw_data (mne.io.Raw): Resampled user raw data built from the LSL buffers
+            events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
+
+        Returns:
+            processed_data (mne.io.RawArray): Denoised data on the sample grid of
+                `raw_data`, zero outside the trials, None if the stream does not cover them
+        """
+        if self._denoiser is None or device not in self._origins or not len(events):
+            return None
+
+        sfreq = raw_data.info["sfreq"]
+        samples = events[:, 0] - raw_data.first_samp
+        low = max(int(samples.min()) + int(round(self._params["tmin"] * sfreq)), 0)
+        high = min(
+            int(samples.max()) + int(round(self._params["tmax"] * sfreq)) + 1,
+            raw_data.n_times,
+        )
+
+        # Positions of the raw samples in the device's own sample indices
+        start, times = self._origins[device]
+        if times is None:
+            positions = (
+                start + np.arange(low, high) * self._ingestion.sfreq[device] / sfreq
+            )
+        else:
+            positions = self._aligner.positions(
+                device, times[0] + np.arange(low, high) / sfreq
+            )
+
+        denoised = self._denoiser.denoised(device, positions)
+        if denoised is None:
+            return None
+
+        data = np.zeros((len(self._denoiser.channels), raw_data.n_times))
+        data[:, low:high] = denoised
+
+        info = mne.create_info(self._denoiser.channels, sfreq=sfreq, ch_types="eeg")
+        return mne.io.RawArray(
+            data, info, first_samp=raw_data.first_samp, verbose=False
+        )
+
+    def archive_block(
+        self,
+        device: str,
+        processed_data: mne.io.Raw,
+        events: np.ndarray,
+        epochs: np.ndarray,
+    ) -> None:
+        """Adds the cleaned epochs of the current block to the session archive
+
+        Only epochs are archived from the cleaned data: outside them it can hold
+        zeros, after the last full BiLSTM segment or between streamed trials.
+
+        Args:
+            device (str): User device name
+            processed_data (mne.io.Raw): Cleaned data
+            events (np.ndarray): Events of the current block the epochs were cut around
+            epochs (np.ndarray): Epoched data with shape (n_events, n_channels, n_times)
+        """
+        index = self._event_index[device]
+        block = index.n_blocks - 1 if self._block is None else self._block
+        trials = index.trials[index.select(block)]
+
+        sfreq = processed_data.info["sfreq"]
+        kept = self.kept_events(processed_data, events)
+
+        self._archive.append_epochs(
+            device,
+            epochs,
+            sfreq=sfreq,
+            tmin=self._params["tmin"],
+            ch_names=self._params["channels_list"],
+            blocks=np.full(kept.sum(), block),
+            trials=trials[kept],
+        )
+
+    def check_quality(
+        self, device: str, raw_data: mne.io.Raw, events: np.ndarray
+    ) -> bool:
+        """Runs the quality gate on the uncleaned epochs of the current block
 
         Args:
+            device (str): User device name
+            raw_data (mne.io.Raw): User raw data before cleaning
             events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
+
+        Returns:
+            usable (bool): False if the device has too few good epochs to be cleaned
         """
-        current_events = events[-N_TRIALS:]
+        if self._gate is None:
+            return True
 
-        return current_events
+        report = self._gate.assess(
+            self.get_epochs(raw_data, events, detrend=1), sfreq=raw_data.info["sfreq"]
+        )
+        self._quality[device] = report
+
+        self._model.logger.info(
+            f"Quality gate for {device}: {int(report['good'].sum())} good epochs, "
+            f"failed {QualityGate.summary(report)}"
+        )
+        if not report["usable"]:
+            self._model.logger.error(f"Skipping {device}: too few usable epochs")
+
+        return report["usable"]
+
+    def good_epochs(self, subjects: list, data: list) -> np.ndarray:
+        """Combines the quality gate decisions of both participants
+
+        Args:
+            subjects (list): Device names of the pair
+            data (list): Epoched data of the pair
+
+        Returns:
+            good (np.ndarray): Mask of epochs that passed the gate for both participants
+        """
+        good = np.ones(len(data[0]), dtype=bool)
+
+        for subject, epochs in zip(subjects, data):
+            report = self._quality.get(subject)
+            if report is not None and len(report["good"]) == len(epochs) == len(good):
+                good &= report["good"]
+
+        return good
+
+    def cleaning_summary(self, subjects: list) -> tuple:
+        """Summarises the cleaning modes used for a pair and the time they took
+
+        Args:
+            subjects (list): Device names of the pair
+
+        Returns:
+            modes (list): Mode each device was cleaned with, "skipped" for uncleaned devices
+            elapsed (float): Total cleaning time of the pair in seconds
+        """
+        cleaning = [
+            self._cleaning.get(subject, ("skipped", 0.0)) for subject in subjects
+        ]
+
+        return [mode for mode, _ in cleaning], sum(elapsed for _, elapsed in cleaning)
+
+    def quality_flags(self, subjects: list) -> str:
+        """Summarises the quality gate decisions of a pair for the results file
+
+        Args:
+            subjects (list): Device names of the pair
+
+        Returns:
+            flags (str): Failed checks per participant, e.g. "user_1: ptp=1,flat=0,..."
+        """
+        flags = []
+
+        for subject in subjects:
+            report = self._quality.get(subject)
+            if report is not None:
+                usable = "" if report["usable"] else ", unusable"
+                flags.append(
+                    f"{self._params['users'][subject]}: {QualityGate.summary(report)}{usable}"
+                )
+
+        return "; ".join(flags)
 
     def get_full_epochs(
         self,
@@ -133,23 +535,9 @@ class Synchronization:
             events (np.ndarray): The identity and timing of experimental events, around which the epochs were created.
             ev_id (dict): Event dictionary
         """
+        raw_data.filter(l_freq=1, h_freq=None, verbose=False)
 
-        self._all_epochs.append(
-            {
-                device: mne.Epochs(
-                    raw_data.filter(l_freq=1, h_freq=None, verbose=False),
-                    events,
-                    event_id=ev_id,
-                    tmin=self._params["tmin"],
-                    tmax=self._params["tmax"],
-                    baseline=None,
-                    preload=True,
-                    verbose=False,
-                    picks=self._params["channels_list"],
-                    detrend=1,
-                )
-            }
-        )
+        self._all_epochs.append({device: self.get_epochs(raw_data, events, detrend=1)})
 
     def epoch_data(self) -> None:
         """Creates epochs from raw MNE data"""
@@ -158,38 +546,49 @@ class Synchronization:
             return None
 
         self._evs = []
+        self._events = {}
 
-        for raw_sub in self._mne_data:
-            for device, raw_data in raw_sub.items():
-                raw_data = raw_data.resample(256)
-                events, ev_id = mne.events_from_annotations(
-                    raw_data, event_id=self._params["event_dict"], verbose=False
-                )
+        if self._scheduler is not None:
+            self._scheduler.start_block()
 
-                if events is not None:
-                    current_events = self.get_current_events(events)
+        for index, raw_sub in enumerate(self._mne_data):
+            for device, raw_data in raw_sub.items():
+                raw_data = raw_data.resample(RESAMPLE_FREQ)
+                current_events, events = self.get_events(device, raw_data)
+                ev_id = self._params["event_dict"]
+
+                if len(current_events) and self._archive is not None:
+                    self._archive.append_continuous(device, "raw", raw_data)
+                    self._archive.set_events(device, self._event_index[device])
+
+                if len(current_events):
+                    # Events of the epochs actually cut, so labels match the data
+                    self._events[device] = (
+                        current_events[self.kept_events(raw_data, current_events)],
+                        events[self.kept_events(raw_data, events)],
+                        ev_id,
+                        raw_data.info["sfreq"],
+                    )
+
+                    if not self.check_quality(device, raw_data, current_events):
+                        self._current_epochs.append({device: None})
+                        self.get_full_epochs(device, raw_data, events, ev_id)
+                        continue
 
                     try:
-                        processed_data = self._cleaner.clean(
-                            raw=raw_data,
-                            mode=self._params["cleaning_mode"],
-                            events=current_events,
-                        )
-                        self._current_epochs.append(
-                            {
-                                device: mne.Epochs(
-                                    processed_data,
-                                    events=current_events,
-                                    event_id=ev_id,
-                                    tmin=self._params["tmin"],
-                                    tmax=self._params["tmax"],
-                                    baseline=None,
-                                    preload=True,
-                                    verbose=False,
-                                    picks=self._params["channels_list"],
-                                )
-                            }
+                        processed_data = self.clean(
+                            device,
+                            raw_data,
+                            current_events,
+                            n_devices=len(self._mne_data) - index,
                         )
+                        epochs = self.get_epochs(processed_data, current_events)
+                        self._current_epochs.append({device: epochs})
+
+                        if self._archive is not None:
+                            self.archive_block(
+                                device, processed_data, current_events, epochs
+                            )
 
                     finally:
                         self.get_full_epochs(device, raw_data, events, ev_id)
@@ -204,11 +603,16 @@ class Synchronization:
 
         self._model.logger.info("Ending data processing process")
 
-    def hilbert_tranform(self, data: np.ndarray) -> np.ndarray:
+    @staticmethod
+    def hilbert_tranform(
+        data: np.ndarray, sfreq: float = None, band: tuple = None
+    ) -> np.ndarray:
         """Computes analytic signal using Hilbert transform
 
         Args:
             data (np.ndarray): Data to compute analytic signal from
+            sfreq (float): Sampling frequency of the data
+            band (tuple): Frequency band the analytic signal is limited to
 
         Returns:
             complex_signal (np.ndarray): analytic signal for inter-personal brain sync calculations
@@ -224,24 +628,67 @@ class Synchronization:
 
         data_array = np.array([data[participant] for participant in range(2)])
 
-        hilb = signal.hilbert(data_array)
+        hilb = analytic_signal(data_array, sfreq=sfreq, band=band)
         complex_signal.append(hilb)
 
         complex_signal = np.moveaxis(np.array(complex_signal), [0], [3])
 
         return complex_signal
 
-    def calculate_sync(self, epochs: mne.Epochs, parameter: str) -> float:
+    @staticmethod
+    def as_array(epochs: Any) -> np.ndarray:
+        """Returns target epochs as an array, accepting both arrays and mne.Epochs
+
+        Args:
+            epochs (Any): Epoched data as np.ndarray or mne.Epochs
+
+        Returns:
+            data (np.ndarray): Epoched data with shape (n_events, n_channels, n_times)
+        """
+        if isinstance(epochs, mne.BaseEpochs):
+            return epochs["target"].get_data()
+
+        return epochs
+
+    def cached(self, stage: str, compute, data: np.ndarray, **params) -> np.ndarray:
+        """Returns the result of a stage from the cache, computing it on a miss
+
+        Args:
+            stage (str): Stage name, part of the cache key
+            compute (callable): Computes the stage result without arguments
+            data (np.ndarray): Epoched data the stage works on
+            params: Other inputs of the stage, part of the cache key
+
+        Returns:
+            result (np.ndarray): Stage result
+        """
+        if self._cache is None:
+            return compute()
+
+        key = ArrayCache.key(data, stage=stage, **params)
+
+        return self._cache.get_or_compute(key, compute)
+
+    def calculate_sync(
+        self,
+        epochs: list,
+        parameter: str,
+        mode: str = None,
+        frequencies: dict = None,
+    ) -> float:
         """Calculates synchronization value
 
         Args:
-            epochs (mne.Epochs): Epoched EEG data
+            epochs (list): Epoched EEG data of both participants
             parameter (str): Synchronization parameter
+            mode (str): Cleaning modes of the epochs, part of the cache key
+            frequencies (dict): Frequency band the analytic signal is limited to, part of the cache key
 
         Returns:
             inter_sync (float): inter-personal brain sync value
         """
         self._model.logger.info("Starting synchronization calculation process")
+        self._significance = {}
 
         try:
             assert len(epochs[0]) == len(
@@ -250,8 +697,25 @@ class Synchronization:
         except AssertionError:
             return None
 
-        values = self.hilbert_tranform(data=np.array(epochs))
-        result = analyses.compute_sync(values, parameter, epochs_average=True)
+        frequencies = self._params["freq_bands"] if frequencies is None else frequencies
+        band = frequencies["freq_bands"]
+
+        data = np.array(epochs)
+        values = self.cached(
+            "hilbert",
+            lambda: self.hilbert_tranform(data=data, sfreq=RESAMPLE_FREQ, band=band),
+            data,
+            band=band,
+            mode=mode,
+        )
+        result = self.cached(
+            "sync",
+            lambda: analyses.compute_sync(values, parameter, epochs_average=True),
+            data,
+            band=band,
+            parameter=parameter,
+            mode=mode,
+        )
 
         inter_values = result[:, 0:2, 2:4]
 
@@ -260,6 +724,13 @@ class Synchronization:
 
         inter_sync = np.round(((AM + GM) / 2), 2)
 
+        if self._surrogates is not None and parameter in ("coh", "plv"):
+            self._significance = self._surrogates.run(values[:, :, :, 0], parameter)
+            self._model.logger.info(
+                f"Surrogate test: p = {self._significance['p_value']:.4f}, "
+                f"null 95th percentile {self._significance['null_95']:.2f}"
+            )
+
         self._model.logger.info("Ending synchronization calculation process")
 
         return inter_sync
@@ -268,14 +739,14 @@ class Synchronization:
         self,
         parameter: str = "coh",
         frequencies: dict = None,
-        epochs: mne.Epochs = None,
+        epochs: list = None,
     ) -> float:
         """Returns synchronization calculations and writes results to file
 
         Args:
             parameter (str): Synchronization parameter
             frequencies (dict): Frequency bands over which perform calculations
-            epochs (mne.Epochs): Epoched MNE data
+            epochs (list): Epoched data per device, as arrays or mne.Epochs
             trial (int): Trial number
 
         Returns:
@@ -284,21 +755,16 @@ class Synchronization:
         epochs = self._concatenated_epochs if epochs is None else epochs
         frequencies = self._params["freq_bands"] if frequencies is None else frequencies
 
-        df = pd.DataFrame(
-            columns=[
-                "stimulus_frequency",
-                "trial_length",
-                "n_trials_per_block",
-                "n_blocks",
-                "users",
-                "channels",
-                "sampling_frequency",
-                "frequency_bands",
-                "subjects",
-                "parameter",
-                "synchronization_value",
-            ]
+        # Every batch reaches the store, including the ones flushed while appending
+        results = ResultsWriter(
+            f"../output/{EXP_NAME}",
+            on_flush=(
+                partial(ResultsStore(RESULTS_DB).insert, exp_name=EXP_NAME)
+                if RECORD
+                else None
+            ),
         )
+        freq_low, freq_high = frequencies["freq_bands"]
 
         pairs = list(combinations(epochs, 2))
         for pair in pairs:
@@ -306,42 +772,80 @@ class Synchronization:
 
             subjects = [key for key in sub1.keys()] + [key for key in sub2.keys()]
 
+            modes, elapsed = self.cleaning_summary(subjects)
+
             try:
-                subjects_data = [value["target"] for value in sub1.values()] + [
-                    value["target"] for value in sub2.values()
+                subjects_data = [
+                    self.as_array(value) for value in [*sub1.values(), *sub2.values()]
                 ]
 
-                sync = self.calculate_sync(epochs=subjects_data, parameter=parameter)
+                sync = None
+                if any(data is None for data in subjects_data):
+                    good = np.zeros(0, dtype=bool)
+                else:
+                    good = self.good_epochs(subjects, subjects_data)
+
+                if good.sum() < 2:
+                    # Sync measures need at least two epochs to average over
+                    self._significance = {}
+                    self._model.logger.error(
+                        f"Skipping {' and '.join(subjects)}: "
+                        f"{int(good.sum())} good epochs, at least 2 are needed"
+                    )
+                else:
+                    subjects_data = [data[good] for data in subjects_data]
+                    sync = self.calculate_sync(
+                        epochs=subjects_data,
+                        parameter=parameter,
+                        mode=",".join(modes),
+                        frequencies=frequencies,
+                    )
                 self._sync_list.append(sync)
 
                 self._model.logger.info(f"Calculated synchronization value: {sync}")
 
                 if RECORD:
-                    self._model.logger.info("Writing results to file")
-                    df.loc[len(df.index)] = [
-                        FLICKER_FREQ,
-                        TRIAL_LEN,
-                        N_TRIALS,
-                        N_BLOCKS,
-                        self._params["users"],
-                        CHANNELS_LIST,
-                        SAMPLING_FREQ,
-                        self._params["freq_bands"],
-                        f"{self._params['users'][subjects[0]]} vs {self._params['users'][subjects[1]]}",
-                        parameter,
-                        sync,
-                    ]
+                    results.append(
+                        date=expInfo["date"],
+                        stimulus_frequency=FLICKER_FREQ,
+                        trial_length=TRIAL_LEN,
+                        n_trials_per_block=N_TRIALS,
+                        n_blocks=N_BLOCKS,
+                        channels=",".join(CHANNELS_LIST),
+                        sampling_frequency=SAMPLING_FREQ,
+                        freq_low=freq_low,
+                        freq_high=freq_high,
+                        subject_1=self._params["users"][subjects[0]],
+                        subject_2=self._params["users"][subjects[1]],
+                        cleaning_mode=(
+                            "scheduled"
+                            if self._scheduler
+                            else self._params["cleaning_mode"]
+                        ),
+                        cleaning_mode_1=modes[0],
+                        cleaning_mode_2=modes[1],
+                        processing_time=elapsed,
+                        latency_budget=(
+                            self._scheduler.budget if self._scheduler else None
+                        ),
+                        parameter=parameter,
+                        synchronization_value=sync,
+                        p_value=self._significance.get("p_value"),
+                        null_median=self._significance.get("null_median"),
+                        null_95=self._significance.get("null_95"),
+                        n_epochs=int(good.sum()),
+                        n_epochs_rejected=int((~good).sum()),
+                        quality_flags=self.quality_flags(subjects),
+                    )
             except KeyError as e:
                 self._model.logger.error(f"Error: {e}")
                 continue
 
-        if RECORD:
-            self._model.logger.info("Exporting results' file")
-            filename = f"../output/{EXP_NAME}.csv"
+        if self._cache is not None:
+            self._model.logger.info(f"Sync cache: {self._cache.stats()}")
 
-            if not os.path.isfile(filename):
-                df.to_csv(filename, index=False)
-            else:
-                df.to_csv(filename, mode="a", header=False, index=False)
+        if RECORD:
+            self._model.logger.info("Writing results to file")
+            results.flush()
 
         return self._sync_list
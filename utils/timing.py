@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class FrameTimer:
+    """Records per-frame flip timestamps and stimulus visibility for one trial"""
+
+    def __init__(self, frame_rate: float, max_duration: float) -> None:
+        """Initializes frame timer with preallocated buffers
+
+        Args:
+            frame_rate (float): Expected monitor refresh rate in Hz
+            max_duration (float): Longest trial duration in seconds
+        """
+        self.frame_rate = frame_rate
+        self.capacity = int(np.ceil(max_duration * frame_rate * 2)) + 1
+
+        self._flip_times = np.empty(self.capacity, dtype=np.float64)
+        self._visible = np.empty(self.capacity, dtype=np.int8)
+        self._n_frames = 0
+
+    def reset(self) -> None:
+        """Clears recorded frames before a new trial"""
+        self._n_frames = 0
+
+    def record(self, flip_time: float, visible: int = -1) -> None:
+        """Records one flip
+
+        Args:
+            flip_time (float): Timestamp returned by `win.flip()`
+            visible (int): 1 if the stimulus was drawn, 0 if hidden, -1 if not running
+        """
+        if self._n_frames >= self.capacity:
+            return
+
+        self._flip_times[self._n_frames] = flip_time
+        self._visible[self._n_frames] = visible
+        self._n_frames += 1
+
+    def stats(self, flicker_freq: float = None) -> dict:
+        """Computes frame timing statistics for the recorded trial
+
+        Args:
+            flicker_freq (float): Configured flicker frequency in Hz
+
+        Returns:
+            stats (dict): Frame count, interval, jitter, dropped frames and effective flicker frequency
+        """
+        flip_times = self._flip_times[: self._n_frames]
+        visible = self._visible[: self._n_frames]
+        intervals = np.diff(flip_times)
+
+        expected = 1 / self.frame_rate
+        stats = {
+            "n_frames": int(self._n_frames),
+            "frame_interval_mean": np.nan,
+            "frame_interval_std": np.nan,
+            "frame_interval_max": np.nan,
+            "dropped_frames": 0,
+            "flicker_freq_target": flicker_freq,
+            "flicker_freq_effective": np.nan,
+        }
+
+        if len(intervals):
+            stats["frame_interval_mean"] = float(np.mean(intervals))
+            stats["frame_interval_std"] = float(np.std(intervals))
+            stats["frame_interval_max"] = float(np.max(intervals))
+
+            late = intervals > 1.5 * expected
+            stats["dropped_frames"] = int(
+                np.sum(np.round(intervals[late] / expected) - 1)
+            )
+
+        # Stimulus onsets are hidden -> visible transitions while the stimulus is running
+        onsets = np.flatnonzero((visible[1:] == 1) & (visible[:-1] == 0)) + 1
+        if len(onsets) > 1:
+            span = flip_times[onsets[-1]] - flip_times[onsets[0]]
+            stats["flicker_freq_effective"] = float((len(onsets) - 1) / span)
+
+        return stats
+
+
+def flicker_schedule(
+    frame_rate: float, flicker_freq: float, duration: float, waveform: str = "square"
+) -> tuple:
+    """Precomputes stimulus opacity and on/off state for every frame of a flicker period
+
+    The phase advances by `flicker_freq / frame_rate` cycles per frame, so any
+    flicker frequency is reproduced on average, including ones that are not an
+    integer divisor of the refresh rate. The stimulus is on during the first half
+    of each cycle for both waveforms, since a sampled sine rarely reaches zero.
+
+    Args:
+        frame_rate (float): Measured monitor refresh rate in Hz
+        flicker_freq (float): Flicker frequency in Hz
+        duration (float): Stimulus duration in seconds
+        waveform (str): "square" for on/off flicker, "sine" for sampled sinusoidal luminance
+
+    Returns:
+        schedule (np.ndarray): Opacity in [0, 1] for each frame since stimulus onset
+        visible (np.ndarray): 1 for frames in the on half of the cycle, 0 otherwise
+    """
+    n_frames = int(np.ceil(duration * frame_rate)) + 1
+    phase = np.mod(np.arange(n_frames) * (flicker_freq / frame_rate), 1.0)
+    visible = phase < 0.5
+
+    if waveform == "square":
+        schedule = visible
+    elif waveform == "sine":
+        schedule = 0.5 * (1 + np.cos(2 * np.pi * phase))
+    else:
+        raise ValueError(f"Unknown flicker waveform '{waveform}'")
+
+    return schedule.astype(np.float32), visible.astype(np.int8)
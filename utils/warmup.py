@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from hypyp import analyses
+
+from utils.processing import load_model
+from utils.synchronization import Synchronization
+
+
+class Warmup:
+    """Prepares heavy processing resources in the background while the instructions are shown"""
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        model_path: str,
+        sfreqs: list,
+        n_channels: int = 2,
+        n_trials: int = 4,
+        segment_len: int = 2,
+    ) -> None:
+        """Initializes warm-up stage
+
+        Args:
+            logger (logging.Logger): The logger object for logging information, errors, etc.
+            model_path (str): Path to the BiLSTM model used for cleaning
+            sfreqs (list): Sampling frequencies of the processed data, the highest one is used
+                in the dummy sync
+            n_channels (int): Number of channels per participant in the dummy sync
+            n_trials (int): Number of trials per participant in the dummy sync
+            segment_len (int): BiLSTM input segment length in seconds
+        """
+        self._logger = logger
+        self._model_path = model_path
+        self._sfreqs = sfreqs
+        self._n_channels = n_channels
+        self._n_trials = n_trials
+        self._segment_len = segment_len
+
+        self.timings: dict[str, float] = {}
+
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+
+    def start(self) -> None:
+        """Starts the warm-up in a background thread"""
+        self._logger.info("Starting warm-up process")
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until the warm-up has finished
+
+        Args:
+            timeout (float): Maximum number of seconds to wait, None waits until done
+
+        Returns:
+            done (bool): True if the warm-up has finished
+        """
+        if self._thread.ident is None:
+            return False
+
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        """Runs every warm-up step, logging failures without stopping the experiment"""
+        for name, step in (
+            ("model", self._load_model),
+            ("sync", self._dummy_sync),
+        ):
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self._logger.error(f"Warm-up step '{name}' failed: {e}")
+                continue
+            self.timings[name] = time.perf_counter() - start
+
+        self._logger.info(f"Ending warm-up process: {self.timings}")
+
+    def _load_model(self) -> None:
+        """Loads the cleaning model and traces its prediction graph"""
+        model = load_model(self._model_path)
+        n_samples = model.input_shape[1]
+        model.predict(np.zeros((1, n_samples, 1), dtype=np.float32), verbose=0)
+
+    def _dummy_sync(self) -> None:
+        """Runs one synchronization calculation on synthetic data"""
+        sfreq = max(self._sfreqs)
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal(
+            (2, self._n_trials, self._n_channels, int(sfreq) * self._segment_len)
+        )
+
+        values = Synchronization.hilbert_tranform(data=data)
+        analyses.compute_sync(values, "coh", epochs_average=True)